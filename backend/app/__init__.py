@@ -1,7 +1,16 @@
 from fastapi import FastAPI
 
-from app.api import chat, emergency
-from app.services.neo4j_client import close_neo4j_driver
+from app.api import admin, chat, emergency, metrics
+from app.config import get_settings
+from app.services.deepseek_client import (
+    close_async_deepseek_client,
+    get_async_deepseek_client,
+)
+from app.services.neo4j_client import (
+    close_async_neo4j_driver,
+    close_neo4j_driver,
+    start_neo4j_keepalive,
+)
 
 
 def create_app() -> FastAPI:
@@ -11,8 +20,14 @@ def create_app() -> FastAPI:
     已注册的路由：
     - GET /health  ->  "ok"
     - POST /api/chat  ->  聊天接口
+    - POST /api/chat/stream  ->  流式聊天接口（SSE）
+    - POST /api/chat/batch  ->  批量聊天接口
     - POST /api/emergency/check  ->  紧急症状检测接口
     - POST /api/emergency/batch-check  ->  批量紧急症状检测接口
+    - POST /api/emergency/batch-check/stream  ->  流式批量紧急症状检测接口（NDJSON）
+    - GET /api/admin/resilience  ->  断路器与重试预算状态
+    - POST /api/admin/graph/invalidate  ->  图谱增量更新后按疾病失效答案缓存
+    - GET /metrics  ->  Prometheus 文本格式的指标
     """
     app = FastAPI(
         title="HongZhizhu Medical Assistant API",
@@ -28,6 +43,10 @@ def create_app() -> FastAPI:
     app.include_router(chat.router)
     # 注册紧急症状检测路由
     app.include_router(emergency.router)
+    # 注册运维管理路由
+    app.include_router(admin.router)
+    # 注册指标接口
+    app.include_router(metrics.router)
 
     # 应用启动时检查路径配置
     @app.on_event("startup")
@@ -52,11 +71,29 @@ def create_app() -> FastAPI:
             logger.error("请检查 red_spider 目录是否在仓库根目录下")
         logger.info("=" * 60)
 
+        # 预热 DeepSeek 连接池：提前完成 TLS 握手，首个 LLM 兜底请求无需再建连
+        settings = get_settings()
+        if settings.deepseek_api_key and settings.deepseek_prewarm:
+            await get_async_deepseek_client().warmup()
+
+        # Neo4j 保活：Aura 会回收空闲连接，定期 ping 避免首个查询重新建连
+        start_neo4j_keepalive()
+
     # 应用关闭时清理资源
     @app.on_event("shutdown")
     async def shutdown_event() -> None:
         """应用关闭时清理 Neo4j 连接等资源。"""
+        # Red_Spider 若已初始化，先停止其后台任务（内存镜像刷新等），再关闭共享驱动
+        try:
+            from app.services.red_spider_service import aclose_red_spider
+        except ImportError:
+            pass
+        else:
+            await aclose_red_spider()
+
+        await close_async_neo4j_driver()
         close_neo4j_driver()
+        await close_async_deepseek_client()
 
     return app
 
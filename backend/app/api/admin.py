@@ -0,0 +1,78 @@
+"""
+运维管理接口。
+
+- GET /api/admin/resilience  断路器与重试预算的当前状态
+- POST /api/admin/graph/invalidate  图谱增量更新后按疾病失效答案缓存（需要 ADMIN_TOKEN）
+"""
+
+from __future__ import annotations
+
+import hmac
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import get_settings
+from app.services.red_spider_service import ainvalidate_graph_answers
+from app.services.resilience import resilience_snapshot
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.get("/resilience")
+async def resilience_status() -> Dict[str, Any]:
+    """
+    返回各依赖断路器与进程级重试预算的状态。
+
+    响应示例：
+    {
+        "breakers": {
+            "deepseek": {
+                "state": "open",               // closed / open / half_open
+                "consecutive_failures": 5,
+                "opened_count": 1,
+                "rejected": 12,                // 熔断期间被快速拒绝的调用数
+                "retry_in_seconds": 21.5       // 距离进入半开状态的秒数（仅 open 时）
+            },
+            "neo4j": {...}
+        },
+        "retry_budget": {"tokens": 3.4, "retries": 17, "exhausted": 6}
+    }
+
+    断路器在首次被使用时创建，尚未调用过的依赖不会出现在 breakers 中。
+    """
+    return resilience_snapshot()
+
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """
+    运维写接口的鉴权：请求头 X-Admin-Token 必须与配置的 ADMIN_TOKEN 一致。
+    未配置 ADMIN_TOKEN 时接口视为关闭，返回 404。
+    """
+    expected = get_settings().admin_token
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+
+@router.post("/graph/invalidate", dependencies=[Depends(require_admin_token)])
+async def invalidate_graph(diseases: List[str]) -> Dict[str, Any]:
+    """
+    知识图谱增量更新后，失效涉及这些疾病的答案缓存。
+
+    需要请求头 X-Admin-Token（与 ADMIN_TOKEN 一致）；未配置 ADMIN_TOKEN 时返回 404。
+    请求体为疾病名称数组，通常由 build_medicalgraph.py --incremental --notify-url 调用：
+    ["感冒", "肺炎"]
+
+    响应示例：
+    {"invalidated": 3, "mirror_reloaded": false}
+
+    GRAPH_BACKEND=mirror 时先重新加载内存镜像（mirror_reloaded 为 true），再失效缓存；
+    并发请求共用同一次加载，GRAPH_RELOAD_MIN_INTERVAL（默认 30 秒）内不重复加载。
+    """
+    return await ainvalidate_graph_answers(diseases)
+
+
+__all__ = ["router"]
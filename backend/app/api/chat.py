@@ -1,18 +1,36 @@
 """
-聊天接口：POST /api/chat
+聊天接口：
+- POST /api/chat         一次性返回完整答案
+- POST /api/chat/stream  以 Server-Sent Events 流式推送答案
+- POST /api/chat/batch   一次回答多个问题
 
 接收用户问题，调用 Red_Spider 服务，返回结构化响应。
+
+三个接口均支持请求头 X-Request-Timeout（秒）指定本次请求的时间预算，
+未指定时使用 REQUEST_TIMEOUT（批量为 CHAT_BATCH_TIMEOUT），超时返回已有的最佳答案。
+请求头 X-Debug-Trace: 1 时在响应中附带本次请求的追踪（各阶段 span 与耗时）。
 """
 
 from __future__ import annotations
 
+import json
 import logging
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
 
-from app.models import ChatRequest, ChatResponse, ChatResponseData, ErrorInfo
-from app.services.red_spider_service import chat_once
+from app.config import get_settings
+from app.models import (
+    ChatBatchRequest,
+    ChatBatchResponse,
+    ChatRequest,
+    ChatResponse,
+    ChatResponseData,
+    ErrorInfo,
+)
+from app.services.red_spider_service import achat_batch, achat_once, astream_once
+from app.utils.emergency import detect_emergency_keywords, get_emergency_message
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +38,11 @@ router = APIRouter(prefix="/api", tags=["chat"])
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest) -> ChatResponse:
+async def chat_endpoint(
+    request: ChatRequest,
+    x_request_timeout: Optional[float] = Header(default=None),
+    x_debug_trace: Optional[str] = Header(default=None),
+) -> ChatResponse:
     """
     处理用户提问，返回 AI 回答。
 
@@ -36,13 +58,179 @@ async def chat_endpoint(request: ChatRequest) -> ChatResponse:
         "data": {
             "answer": "感冒的典型症状包括...",
             "sections": [...],
-            "source": "kg" | "deepseek" | "unknown",
-            "elapsed_ms": 1234
+            "source": "kg" | "deepseek" | "system",
+            "elapsed_ms": 1234,
+            "trace": {...}  // 仅在 X-Debug-Trace 开启时返回
         }
     }
     """
     question = request.question.strip() if request.question else ""
 
+    precheck = _precheck(question)
+    if precheck is not None:
+        return precheck
+
+    try:
+        # 调用 Red_Spider 服务（异步版本，不阻塞事件循环）
+        result: ChatResponseData = await achat_once(
+            question,
+            timeout=_request_timeout(x_request_timeout),
+            debug=_debug_enabled(x_debug_trace),
+        )
+
+        return ChatResponse(
+            status="ok",
+            data=result,
+        )
+
+    except Exception as exc:
+        logger.exception(f"处理问题时发生异常：{question[:50]}...")
+        return ChatResponse(
+            status="error",
+            error=ErrorInfo(
+                code="internal_error",
+                message=f"服务器内部错误：{str(exc)}",
+            ),
+        )
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    x_request_timeout: Optional[float] = Header(default=None),
+    x_debug_trace: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """
+    流式问答接口（Server-Sent Events）。
+
+    请求体与 /api/chat 相同，响应为 text/event-stream，依次推送：
+
+        event: section   知识图谱答案，每个问题类型的查询返回后立即推送一段
+        data: {"content": "感冒的症状包括: ..."}
+
+        event: token     回退到 DeepSeek 时，逐段推送生成的文本
+        data: {"content": "建议"}
+
+        event: done      结束标记
+        data: {"source": "kg" | "deepseek" | "mixed" | "unknown", "elapsed_ms": 1234}
+              X-Debug-Trace 开启时另含 "trace"
+
+    空问题 / 高危症状 / 内部错误分别以 error / emergency / error 事件推送
+    一条与 /api/chat 相同结构的 ChatResponse 后结束。
+    超时时若已推送部分回答，追加一段截断提示后推送 done。
+    """
+    question = request.question.strip() if request.question else ""
+    timeout = _request_timeout(x_request_timeout)
+    debug = _debug_enabled(x_debug_trace)
+
+    async def event_stream() -> AsyncIterator[str]:
+        precheck = _precheck(question)
+        if precheck is not None:
+            yield _sse(precheck.status, precheck.model_dump())
+            return
+
+        try:
+            async for event in astream_once(question, timeout=timeout, debug=debug):
+                name = event.pop("event")
+                yield _sse(name, event)
+        except Exception as exc:
+            logger.exception(f"流式处理问题时发生异常：{question[:50]}...")
+            error = ChatResponse(
+                status="error",
+                error=ErrorInfo(
+                    code="internal_error",
+                    message=f"服务器内部错误：{str(exc)}",
+                ),
+            )
+            yield _sse("error", error.model_dump())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # 关闭反向代理（如 Nginx）的响应缓冲，保证逐段到达客户端
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch_endpoint(
+    request: ChatBatchRequest,
+    x_request_timeout: Optional[float] = Header(default=None),
+    x_debug_trace: Optional[str] = Header(default=None),
+) -> ChatBatchResponse:
+    """
+    批量问答接口，适用于离线评测与合作方集成。
+
+    请求体：
+    {
+        "questions": ["感冒的症状是什么？", "糖尿病吃什么药", "感冒的症状是什么？"]
+    }
+
+    响应：results 与 questions 一一对应，每一项与 /api/chat 的响应结构相同，
+    data.source 为 "kg" / "deepseek"，data.elapsed_ms 为从批量开始到该问题得到答案的耗时。
+
+    处理方式：
+    - 空问题 / 高危症状按 /api/chat 的规则逐条返回
+    - 相同问题只回答一次
+    - 可由知识图谱回答的问题合并成一条图谱查询
+    - 其余问题交给 DeepSeek，并发数受 CHAT_BATCH_CONCURRENCY 限制
+    - 整批共享一个时间预算，超时时尚未回答的问题返回缓存中的图谱答案或超时提示
+    - X-Debug-Trace 开启时，整批的追踪在顶层 trace 字段返回
+    """
+    settings = get_settings()
+    max_size = settings.chat_batch_max_size
+    if len(request.questions) > max_size:
+        raise HTTPException(status_code=413, detail=f"单次最多提交 {max_size} 个问题")
+
+    questions = [q.strip() if q else "" for q in request.questions]
+    prechecks = [_precheck(question) for question in questions]
+    to_answer = [q for q, precheck in zip(questions, prechecks) if precheck is None]
+    traces: List[Dict[str, Any]] = []
+
+    try:
+        answers = await achat_batch(
+            to_answer,
+            timeout=_request_timeout(
+                x_request_timeout,
+                default=settings.chat_batch_timeout,
+                maximum=max(settings.request_timeout_max, settings.chat_batch_timeout),
+            ),
+            trace_sink=traces if _debug_enabled(x_debug_trace) else None,
+        )
+    except Exception as exc:
+        logger.exception(f"批量处理 {len(to_answer)} 个问题时发生异常")
+        answers = {question: exc for question in to_answer}
+
+    results: List[ChatResponse] = []
+    for question, precheck in zip(questions, prechecks):
+        if precheck is not None:
+            results.append(precheck)
+            continue
+
+        answer = answers.get(question)
+        if isinstance(answer, ChatResponseData):
+            results.append(ChatResponse(status="ok", data=answer))
+        else:
+            results.append(
+                ChatResponse(
+                    status="error",
+                    error=ErrorInfo(
+                        code="internal_error",
+                        message=f"服务器内部错误：{str(answer)}",
+                    ),
+                )
+            )
+
+    return ChatBatchResponse(results=results, trace=traces[0] if traces else None)
+
+
+def _precheck(question: str) -> Optional[ChatResponse]:
+    """
+    空问题与高危症状检查，命中时返回应直接响应的 ChatResponse，否则返回 None。
+    """
     # 空问题检查
     if not question:
         return ChatResponse(
@@ -53,36 +241,48 @@ async def chat_endpoint(request: ChatRequest) -> ChatResponse:
             ),
         )
 
-    # 高危症状关键词检测（前端已做一层，后端再加固）
-    emergency_keywords = ["胸痛", "呼吸困难", "大量出血", "昏迷", "休克", "猝死"]
-    if any(keyword in question for keyword in emergency_keywords):
-        logger.warning(f"检测到高危症状关键词：{question}")
+    # 高危症状关键词检测（前端已做一层，后端再加固）：仅 critical 级别直接拦截
+    is_emergency, matched_keywords = detect_emergency_keywords(question, min_severity="critical")
+    if is_emergency:
+        logger.warning(f"检测到高危症状关键词：{matched_keywords}, 问题：{question[:50]}...")
         return ChatResponse(
             status="emergency",
             data=ChatResponseData(
-                answer="⚠️ 紧急提示：检测到严重症状，请立即拨打120或前往急诊！",
+                answer=get_emergency_message(matched_keywords),
                 source="system",
             ),
         )
 
-    try:
-        # 调用 Red_Spider 服务
-        result: ChatResponseData = chat_once(question)
+    return None
 
-        return ChatResponse(
-            status="ok",
-            data=result,
-        )
 
-    except Exception as exc:
-        logger.exception(f"处理问题时发生异常：{question[:50]}...")
-        return ChatResponse(
-            status="error",
-            error=ErrorInfo(
-                code="internal_error",
-                message=f"服务器内部错误：{str(exc)}",
-            ),
-        )
+def _request_timeout(
+    header_value: Optional[float],
+    default: Optional[float] = None,
+    maximum: Optional[float] = None,
+) -> Optional[float]:
+    """
+    本次请求的时间预算（秒）：优先使用请求头 X-Request-Timeout（不超过上限），
+    未指定或非正数时使用默认值。返回 None 表示不限时。
+    """
+    settings = get_settings()
+    default = settings.request_timeout if default is None else default
+    maximum = settings.request_timeout_max if maximum is None else maximum
+
+    timeout = default
+    if header_value is not None and header_value > 0:
+        timeout = min(header_value, maximum) if maximum > 0 else header_value
+    return timeout if timeout > 0 else None
+
+
+def _debug_enabled(header_value: Optional[str]) -> bool:
+    """请求头 X-Debug-Trace 为 1 / true / yes 时返回追踪。"""
+    return (header_value or "").strip().lower() in ("1", "true", "yes")
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """编码一条 SSE 消息。"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 __all__ = ["router"]
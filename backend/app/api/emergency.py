@@ -6,11 +6,17 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-from typing import List
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 
+from app.config import get_settings
 from app.models import ChatRequest, ChatResponse, ChatResponseData, ErrorInfo
 from app.utils.emergency import detect_emergency_keywords, get_emergency_message
 
@@ -104,29 +110,160 @@ async def batch_check_emergency(questions: List[str]) -> dict:
         ]
     }
     """
-    results = []
-
-    for question in questions:
-        if not question or not question.strip():
-            results.append(
-                {
-                    "question": question,
-                    "is_emergency": False,
-                    "matched_keywords": [],
-                }
-            )
-            continue
-
-        is_emergency, matched_keywords = detect_emergency_keywords(question)
-        results.append(
-            {
-                "question": question,
-                "is_emergency": is_emergency,
-                "matched_keywords": matched_keywords,
-            }
+    max_size = get_settings().emergency_batch_max_size
+    if len(questions) > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次最多检测 {max_size} 条，请分批提交或使用 /api/emergency/batch-check/stream",
         )
 
+    results = [_check_one(question) for question in questions]
     return {"results": results}
 
 
+@router.post("/emergency/batch-check/stream")
+async def batch_check_emergency_stream(request: Request) -> StreamingResponse:
+    """
+    流式批量检测（NDJSON），用于导入的大批量消息分诊。
+
+    请求体：application/x-ndjson，每行一个问题，可以是 JSON 字符串、
+    {"question": "..."} 对象或纯文本：
+
+        "我有点头痛"
+        {"question": "胸痛，呼吸困难"}
+        感冒了
+
+    响应：application/x-ndjson，边读边算，每行一个结果（index 为请求中的行号，从 0 开始）：
+
+        {"index": 0, "question": "我有点头痛", "is_emergency": false, "matched_keywords": []}
+        {"index": 1, "question": "胸痛，呼吸困难", "is_emergency": true, "matched_keywords": ["胸痛", "呼吸困难"]}
+
+    超过 emergency_max_question_bytes 字节的行不检测，该行输出 {"index": ..., "error": {...}}；
+    超过 emergency_batch_max_size 条后输出一行 {"error": {...}} 并结束。
+    请求体与结果均按块处理，内存占用与批量大小无关。
+    """
+    settings = get_settings()
+    max_size = settings.emergency_batch_max_size
+    chunk_size = settings.emergency_batch_chunk_size
+    max_line_bytes = settings.emergency_max_question_bytes
+    # 相同问题直接复用结果；有界 LRU，避免去重表随批量增长
+    seen: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    dedupe_size = settings.emergency_batch_dedupe_size
+
+    async def result_stream() -> AsyncIterator[str]:
+        try:
+            async for block in check_stream():
+                yield block
+        except ClientDisconnect:
+            # 读取请求体期间客户端断开：不再输出，直接结束
+            logger.info("流式批量检测：客户端已断开")
+
+    async def check_stream() -> AsyncIterator[str]:
+        index = 0
+        buffer: List[str] = []
+        async for question in _iter_ndjson_questions(request, max_line_bytes):
+            if index >= max_size:
+                error = {"code": "batch_too_large", "message": f"单次最多检测 {max_size} 条"}
+                buffer.append(json.dumps({"error": error}, ensure_ascii=False) + "\n")
+                break
+
+            if question is None:
+                error = {"code": "question_too_long", "message": f"单个问题不能超过 {max_line_bytes} 字节"}
+                result = {"error": error}
+            else:
+                result = seen.get(question)
+                if result is None:
+                    result = _check_one(question)
+                    seen[question] = result
+                    if len(seen) > dedupe_size:
+                        seen.popitem(last=False)
+                else:
+                    seen.move_to_end(question)
+
+            buffer.append(json.dumps({"index": index, **result}, ensure_ascii=False) + "\n")
+            index += 1
+
+            # 每块输出一次并让出事件循环，避免长批量独占 worker
+            if len(buffer) >= chunk_size:
+                yield "".join(buffer)
+                buffer.clear()
+                await asyncio.sleep(0)
+
+        # 请求体已读完（再检查断开不会吞掉请求体）；客户端已断开时不再输出剩余结果
+        if buffer and not await request.is_disconnected():
+            yield "".join(buffer)
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+def _check_one(question: str) -> Dict[str, Any]:
+    """检测单个问题，返回批量接口的结果结构。"""
+    if not question or not question.strip():
+        return {
+            "question": question,
+            "is_emergency": False,
+            "matched_keywords": [],
+        }
+
+    is_emergency, matched_keywords = detect_emergency_keywords(question)
+    return {
+        "question": question,
+        "is_emergency": is_emergency,
+        "matched_keywords": matched_keywords,
+    }
+
+
+async def _iter_ndjson_questions(request: Request, max_line_bytes: int) -> AsyncIterator[Optional[str]]:
+    """
+    逐行解析流式请求体，只在内存中保留当前未读完的一行。
+
+    超过 max_line_bytes 字节的行产出 None（调用方输出该行的错误），其余内容读到换行前直接丢弃，
+    单行占用的内存不超过 max_line_bytes。
+    """
+    pending = bytearray()
+    too_long = False
+    async for chunk in request.stream():
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            if too_long or len(pending) + end - start > max_line_bytes:
+                yield None
+            else:
+                pending += chunk[start:end]
+                question, ok = _parse_line(pending)
+                if ok:
+                    yield question
+            pending.clear()
+            too_long = False
+            start = end + 1
+        if not too_long:
+            if len(pending) + len(chunk) - start > max_line_bytes:
+                too_long = True
+                pending.clear()
+            else:
+                pending += chunk[start:]
+    if too_long:
+        yield None
+        return
+    question, ok = _parse_line(pending)
+    if ok:
+        yield question
+
+
+def _parse_line(line: bytearray) -> Tuple[str, bool]:
+    """解析一行 NDJSON；空行返回 ("", False)，非 JSON 的行按纯文本处理。"""
+    text = line.decode("utf-8", errors="replace").strip()
+    if not text:
+        return "", False
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return text, True
+    if isinstance(value, dict):
+        value = value.get("question", "")
+    return value if isinstance(value, str) else str(value), True
+
+
 __all__ = ["router"]
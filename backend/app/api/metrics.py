@@ -0,0 +1,39 @@
+"""
+指标接口：
+- GET /metrics  Prometheus 文本格式的进程内指标
+
+包括请求与各阶段耗时直方图、答案来源计数、缓存命中、重试与断路器状态、
+Neo4j 连接池使用情况等，详见 app/services/metrics.py。
+"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """
+    返回 Prometheus 文本格式的指标，例如：
+
+        # HELP redspider_stage_duration_seconds Red_Spider per-stage latency (...).
+        # TYPE redspider_stage_duration_seconds histogram
+        redspider_stage_duration_seconds_bucket{stage="classify",le="0.0005"} 120
+        ...
+        redspider_answers_total{source="kg"} 87
+        redspider_neo4j_pool_connections{driver="async",state="in_use"} 2
+
+    Red_Spider 尚未初始化时只包含与其无关的指标。
+    """
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
+__all__ = ["router"]
@@ -27,11 +27,78 @@ class Settings(BaseModel):
         "DEEPSEEK_BASE_URL",
         "https://api.deepseek.com",
     )
+    deepseek_model: str = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+    # 单次请求超时（秒）与最大重试次数
+    deepseek_timeout: float = float(os.getenv("DEEPSEEK_TIMEOUT", "15"))
+    deepseek_max_retries: int = int(os.getenv("DEEPSEEK_MAX_RETRIES", "2"))
+    # 异步客户端共享的 HTTP 连接池：最大连接数 / 空闲连接保活时长（秒）
+    deepseek_pool_size: int = int(os.getenv("DEEPSEEK_POOL_SIZE", "20"))
+    deepseek_keepalive_expiry: float = float(os.getenv("DEEPSEEK_KEEPALIVE_EXPIRY", "60"))
+    # 启动时是否预热 TLS 连接
+    deepseek_prewarm: bool = os.getenv("DEEPSEEK_PREWARM", "true").lower() in ("1", "true", "yes")
+
+    # LLM 回复持久化缓存（SQLite，多个 uvicorn worker 共享）
+    # Render 上如需跨重新部署保留，请将路径指向挂载的持久化磁盘（如 /var/data/...）
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+    llm_cache_max_mb: int = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+    llm_cache_ttl: float = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+    # 相同问题的并发请求是否合并为一次调用（single-flight）
+    chat_coalesce_enabled: bool = os.getenv("CHAT_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # 批量问答：单次最多问题数 / 回退到 DeepSeek 时的最大并发数
+    chat_batch_max_size: int = int(os.getenv("CHAT_BATCH_MAX_SIZE", "100"))
+    chat_batch_concurrency: int = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+
+    # 请求时间预算（秒）：覆盖 分类 → 图谱查询 → DeepSeek 全流程，超时返回已有的最佳答案；<= 0 表示不限时
+    # 客户端可通过请求头 X-Request-Timeout 指定，但不超过 request_timeout_max
+    request_timeout: float = float(os.getenv("REQUEST_TIMEOUT", "20"))
+    request_timeout_max: float = float(os.getenv("REQUEST_TIMEOUT_MAX", "60"))
+    # 批量问答的默认时间预算（整批共享）
+    chat_batch_timeout: float = float(os.getenv("CHAT_BATCH_TIMEOUT", "120"))
+
+    # 请求追踪导出：JSONL 文件路径（留空不导出）/ 只导出耗时不低于该值（毫秒）的请求
+    trace_export_path: str = os.getenv("TRACE_EXPORT_PATH", "")
+    trace_slow_ms: float = float(os.getenv("TRACE_SLOW_MS", "1000"))
+
+    # 高危症状批量检测：单次最多条数 / 流式接口每块输出条数 / 去重表容量 / 流式接口单行最大字节数
+    emergency_batch_max_size: int = int(os.getenv("EMERGENCY_BATCH_MAX_SIZE", "100000"))
+    emergency_batch_chunk_size: int = int(os.getenv("EMERGENCY_BATCH_CHUNK_SIZE", "256"))
+    emergency_batch_dedupe_size: int = int(os.getenv("EMERGENCY_BATCH_DEDUPE_SIZE", "4096"))
+    emergency_max_question_bytes: int = int(os.getenv("EMERGENCY_MAX_QUESTION_BYTES", "8192"))
+
+    # 断路器（DeepSeek / Neo4j 各一个）：连续失败次数阈值 / 打开后的冷却时间（秒）/ 半开时的探测请求数
+    breaker_failure_threshold: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    breaker_recovery_timeout: float = float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+    breaker_half_open_max_calls: int = int(os.getenv("BREAKER_HALF_OPEN_MAX_CALLS", "1"))
+    # 进程级重试预算：重试量最多为请求量的 ratio 倍，另每秒补充 min_per_second 次
+    retry_budget_ratio: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+    retry_budget_min_per_second: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))
 
     # Neo4j 相关配置（当前本地默认值来自 Neo4j 安装说明）
     neo4j_uri: str = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     neo4j_user: str = os.getenv("NEO4J_USER", "neo4j")
     neo4j_password: str = os.getenv("NEO4J_PASSWORD", "neo4j")
+    # 连接池（后端与 red_spider 共用同一组驱动）：
+    # 最大连接数 / 借连接的最长等待（秒）/ 单条连接最长存活（秒，应小于 Aura 的空闲回收时间）
+    neo4j_max_pool_size: int = int(os.getenv("NEO4J_MAX_POOL_SIZE", "20"))
+    neo4j_acquisition_timeout: float = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "10"))
+    neo4j_max_connection_lifetime: float = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1800"))
+    # 空闲超过该时长（秒）的连接借出前先检查存活；负数表示不检查
+    neo4j_liveness_check_timeout: float = float(os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT", "30"))
+    # 保活 ping 间隔（秒），<= 0 关闭
+    neo4j_keepalive_interval: float = float(os.getenv("NEO4J_KEEPALIVE_INTERVAL", "240"))
+    # 图谱读路径后端（与 red_spider_base/config.py 共用同一个环境变量）：neo4j / mirror / sqlite；
+    # sqlite 时不访问 Neo4j，也不启动保活
+    graph_backend: str = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+
+    # 运维写接口（POST /api/admin/graph/invalidate）的共享令牌，请求头 X-Admin-Token；
+    # 留空时该接口不可用（返回 404）
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+    # 图谱缓存失效时重新加载内存镜像的最小间隔（秒）：间隔内的重复请求只失效缓存，
+    # 镜像由后台的版本检查刷新
+    graph_reload_min_interval: float = float(os.getenv("GRAPH_RELOAD_MIN_INTERVAL", "30"))
 
 
 @lru_cache(maxsize=1)
@@ -6,11 +6,21 @@ Pydantic 数据模型聚合入口。
     from app.models import ChatRequest, ChatResponse, ChatResponseData
 """
 
-from .chat import ChatRequest, ChatResponse, ChatResponseData, AnswerSection, ErrorInfo
+from .chat import (
+    AnswerSection,
+    ChatBatchRequest,
+    ChatBatchResponse,
+    ChatRequest,
+    ChatResponse,
+    ChatResponseData,
+    ErrorInfo,
+)
 
 __all__ = [
     "ChatRequest",
     "ChatResponse",
+    "ChatBatchRequest",
+    "ChatBatchResponse",
     "ChatResponseData",
     "AnswerSection",
     "ErrorInfo",
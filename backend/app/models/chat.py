@@ -6,7 +6,7 @@
 
 from __future__ import annotations
 
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -47,14 +47,18 @@ class ChatResponseData(BaseModel):
         default=None,
         description="可选的分段答案列表，前端可按卡片形式展示",
     )
-    source: Literal["kg", "deepseek", "mixed", "unknown"] = Field(
+    source: Literal["kg", "deepseek", "mixed", "system", "unknown"] = Field(
         default="unknown",
-        description="答案主要来源：规则+知识图谱 / DeepSeek / 混合 / 未知",
+        description="答案主要来源：规则+知识图谱 / DeepSeek / 混合 / 系统提示 / 未知",
     )
     elapsed_ms: Optional[int] = Field(
         default=None,
         description="从后端视角统计的处理耗时（毫秒）",
     )
+    trace: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="请求追踪（各阶段 span 与耗时），仅在请求头 X-Debug-Trace 开启时返回",
+    )
 
 
 class ErrorInfo(BaseModel):
@@ -71,3 +75,23 @@ class ChatResponse(BaseModel):
     data: Optional[ChatResponseData] = None
     error: Optional[ErrorInfo] = None
 
+
+
+class ChatBatchRequest(BaseModel):
+    """
+    /api/chat/batch 的请求体。
+    """
+
+    questions: List[str] = Field(..., description="待回答的问题列表，相同问题只回答一次")
+
+
+class ChatBatchResponse(BaseModel):
+    """
+    /api/chat/batch 的响应：results 与请求中的 questions 一一对应。
+    """
+
+    results: List[ChatResponse]
+    trace: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="整批请求的追踪，仅在请求头 X-Debug-Trace 开启时返回",
+    )
@@ -6,18 +6,36 @@ DeepSeek API 客户端封装。
 - 重试机制
 - 错误处理
 - 日志记录
+
+- DeepSeekClient：同步客户端，供脚本 / 命令行使用
+- AsyncDeepSeekClient：基于 AsyncOpenAI 的异步客户端，进程内共享一个
+  keep-alive 连接池，退避使用 asyncio.sleep + 随机抖动，不阻塞事件循环；
+  成功的回复写入持久化缓存（见 llm_cache.py），重复问题直接返回
+
+两个客户端共用 "deepseek" 断路器与进程级重试预算（见 resilience.py）：
+断路器打开时不再发起请求，重试次数受预算限制。
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import random
 import time
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-from openai import OpenAI
-from openai._exceptions import APIError, APITimeoutError, RateLimitError
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from openai._exceptions import APIConnectionError, APIError, APITimeoutError, RateLimitError
 
 from app.config import get_settings
+from app.services.llm_cache import LLMResponseCache, get_llm_cache
+from app.services.red_spider_paths import BASE_DIR  # noqa: F401  red_spider_base 加入 sys.path
+from app.services.resilience import get_breaker, get_retry_budget
+from app.utils.exceptions import CircuitOpenError
+
+# 与 red_spider 共用：单次尝试超时的计算，以及“被请求预算截短的超时”的判断
+from request_deadline import DeadlineExceeded, attempt_timeout, raise_if_deadline_limited  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +44,47 @@ DEFAULT_TIMEOUT = 15.0  # 秒
 DEFAULT_MAX_RETRIES = 2  # 最大重试次数
 DEFAULT_RETRY_DELAY = 1.0  # 重试延迟（秒）
 
+# 断路器名称
+BREAKER_NAME = "deepseek"
+
+DEFAULT_SYSTEM_PROMPT = (
+    "你是一个非常专业且贴心的中文医疗问答助手，"
+    "需要结合医学常识和生活建议，给出温和、易懂的回答。"
+)
+
+
+def build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+    """组装 OpenAI 兼容的 messages 列表。"""
+    return [
+        {"role": "system", "content": system_prompt or DEFAULT_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def should_retry(
+    attempt: int,
+    max_retries: int,
+    delay: float = 0.0,
+    deadline: Optional[float] = None,
+) -> bool:
+    """
+    还有剩余重试次数，且进程级重试预算允许时才重试。
+    给定请求截止时间 deadline（time.monotonic() 绝对值）时，退避 delay 秒后已无剩余时间则不再重试。
+    """
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return False
+    return attempt < max_retries and get_retry_budget().try_retry()
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_RETRY_DELAY) -> float:
+    """
+    指数退避 + 随机抖动（equal jitter）：
+    第 attempt 次重试等待 [base*2^attempt / 2, base*2^attempt] 秒，
+    避免多个并发请求在同一时刻集中重试。
+    """
+    delay = base * (2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
 
 class DeepSeekClient:
     """
@@ -84,6 +143,7 @@ class DeepSeekClient:
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
+        deadline: Optional[float] = None,
     ) -> str:
         """
         调用 DeepSeek 生成回复，带重试和错误处理。
@@ -96,6 +156,8 @@ class DeepSeekClient:
             系统提示词，如果不提供则使用默认医疗助手提示。
         temperature : float
             生成温度，默认 0.7。
+        deadline : Optional[float]
+            请求截止时间（time.monotonic() 绝对值）：每次尝试的超时不超过剩余时间。
 
         返回
         ----
@@ -104,35 +166,37 @@ class DeepSeekClient:
 
         异常
         ----
-        不会抛出异常，所有错误都会被捕获并返回友好的错误信息。
+        DeadlineExceeded：给定 deadline 且超时是由请求预算造成的（不计入熔断）。
+        其余错误都会被捕获并返回友好的错误信息。
         """
         if not prompt or not prompt.strip():
             return ""
 
-        default_system = (
-            "你是一个非常专业且贴心的中文医疗问答助手，"
-            "需要结合医学常识和生活建议，给出温和、易懂的回答。"
-        )
-        system_content = system_prompt or default_system
-
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt},
-        ]
+        messages = build_messages(prompt, system_prompt)
 
+        breaker = get_breaker(BREAKER_NAME)
+        get_retry_budget().record_request()
         last_error: Optional[Exception] = None
 
         # 重试逻辑
         for attempt in range(self.max_retries + 1):
+            # 熔断中直接返回，不再等待超时
+            if not breaker.allow():
+                logger.warning("DeepSeek 断路器打开，跳过调用")
+                return "抱歉，DeepSeek 服务暂时不可用，请稍后重试。"
+
             try:
                 start_time = time.perf_counter()
+                limit = attempt_timeout(self.timeout, deadline)
 
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
                     stream=False,
+                    timeout=limit,
                 )
+                breaker.record_success()
 
                 elapsed = time.perf_counter() - start_time
                 logger.info(
@@ -148,28 +212,45 @@ class DeepSeekClient:
                     return f"解析 DeepSeek 响应时出错：{str(e)}"
 
             except APITimeoutError as e:
+                # 被请求预算截短的超时不说明服务不可用，不计入熔断
+                raise_if_deadline_limited(self.timeout, limit, deadline, e)
                 last_error = e
+                breaker.record_failure()
                 logger.warning(
                     f"DeepSeek API 超时 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
                 )
-                if attempt < self.max_retries:
-                    time.sleep(DEFAULT_RETRY_DELAY * (attempt + 1))  # 指数退避
+                delay = backoff_delay(attempt)
+                if should_retry(attempt, self.max_retries, delay, deadline):
+                    time.sleep(delay)
                     continue
                 return "抱歉，DeepSeek 服务响应超时，请稍后重试。"
 
             except RateLimitError as e:
                 last_error = e
+                breaker.record_failure()
                 logger.warning(
                     f"DeepSeek API 限流 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
                 )
-                if attempt < self.max_retries:
+                if should_retry(attempt, self.max_retries):
                     # 限流时等待更长时间
-                    wait_time = DEFAULT_RETRY_DELAY * (2 ** (attempt + 1))
+                    wait_time = backoff_delay(attempt + 1)
                     logger.info(f"等待 {wait_time:.1f}s 后重试...")
                     time.sleep(wait_time)
                     continue
                 return "抱歉，DeepSeek 服务当前请求过于频繁，请稍后再试。"
 
+            except APIConnectionError as e:
+                # 连接失败（DNS / 拒绝连接 / 断开），与超时一样可以重试
+                last_error = e
+                breaker.record_failure()
+                logger.warning(
+                    f"DeepSeek API 连接失败 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                if should_retry(attempt, self.max_retries):
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                return "抱歉，DeepSeek 服务暂时无法连接，请稍后重试。"
+
             except APIError as e:
                 last_error = e
                 logger.error(
@@ -177,18 +258,23 @@ class DeepSeekClient:
                 )
                 # API 错误通常不需要重试（除非是临时性错误）
                 if "500" in str(e) or "503" in str(e):  # 服务器错误，可以重试
-                    if attempt < self.max_retries:
-                        time.sleep(DEFAULT_RETRY_DELAY * (attempt + 1))
+                    breaker.record_failure()
+                    if should_retry(attempt, self.max_retries):
+                        time.sleep(backoff_delay(attempt))
                         continue
+                else:
+                    # 请求本身有误（4xx），服务是可达的
+                    breaker.record_success()
                 return f"调用 DeepSeek 服务时出错：{str(e)}"
 
             except Exception as e:
                 last_error = e
+                breaker.record_failure()
                 logger.exception(
                     f"DeepSeek API 调用发生未知异常 (尝试 {attempt + 1}/{self.max_retries + 1})"
                 )
-                if attempt < self.max_retries:
-                    time.sleep(DEFAULT_RETRY_DELAY)
+                if should_retry(attempt, self.max_retries):
+                    time.sleep(backoff_delay(attempt))
                     continue
                 return f"调用 DeepSeek 服务时发生未知错误：{str(e)}"
 
@@ -197,4 +283,361 @@ class DeepSeekClient:
         return "抱歉，DeepSeek 服务暂时不可用，请稍后重试。"
 
 
-__all__ = ["DeepSeekClient", "DEFAULT_TIMEOUT", "DEFAULT_MAX_RETRIES"]
+class AsyncDeepSeekClient:
+    """
+    异步 DeepSeek API 客户端。
+
+    与 DeepSeekClient 行为一致（超时、重试、友好错误信息），区别在于：
+    - 底层使用 AsyncOpenAI + 共享的 httpx.AsyncClient 连接池，
+      同一进程内的所有 LLM 调用复用 keep-alive 连接，只需一次 TLS 握手
+    - 重试退避使用 asyncio.sleep 并加入随机抖动
+    - 支持启动时预热连接（warmup）
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        cache: Optional[LLMResponseCache] = None,
+    ) -> None:
+        settings = get_settings()
+
+        self.api_key = api_key or settings.deepseek_api_key
+        self.base_url = base_url or settings.deepseek_base_url
+        self.model = model or settings.deepseek_model
+        self.timeout = timeout if timeout is not None else settings.deepseek_timeout
+        self.max_retries = (
+            max_retries if max_retries is not None else settings.deepseek_max_retries
+        )
+        self.pool_size = pool_size or settings.deepseek_pool_size
+        self.cache = cache
+
+        if not self.api_key:
+            raise ValueError(
+                "未提供 DeepSeek API Key。\n"
+                "请在初始化时传入 api_key，或在环境变量中设置 DEEPSEEK_API_KEY。"
+            )
+
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=settings.deepseek_keepalive_expiry,
+            ),
+            timeout=self.timeout,
+        )
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=0,  # 我们自己实现重试逻辑
+            http_client=self._http_client,
+        )
+
+        logger.info(
+            f"已初始化异步 DeepSeek 客户端，模型：{self.model}, 超时：{self.timeout}s, "
+            f"连接池：{self.pool_size}"
+        )
+
+    async def warmup(self) -> None:
+        """
+        预热连接：发起一次轻量请求（列出模型），提前完成 DNS 解析与 TLS 握手，
+        使第一个真实请求直接复用连接池中的 keep-alive 连接。失败只记录日志。
+        """
+        start_time = time.perf_counter()
+        try:
+            await self.client.models.list()
+        except Exception as e:
+            logger.warning(f"DeepSeek 连接预热失败（不影响后续请求）：{e}")
+            return
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"DeepSeek 连接预热完成，耗时: {elapsed:.2f}s")
+
+    async def chat(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """
+        异步调用 DeepSeek 生成回复，带重试和错误处理。
+
+        参数与返回值同 DeepSeekClient.chat。
+        配置了持久化缓存时，先查缓存，成功生成的回复会写回缓存。
+        缓存未命中且断路器打开时抛出 CircuitOpenError，其余错误返回友好提示。
+        deadline 为请求截止时间（time.monotonic() 绝对值）：每次尝试的超时不超过剩余时间，
+        剩余时间不足以退避重试时直接返回；被预算截短的尝试超时时抛出 DeadlineExceeded，
+        不计入熔断。
+        """
+        if not prompt or not prompt.strip():
+            return ""
+
+        messages = build_messages(prompt, system_prompt)
+        cache_key = self._cache_key(prompt, messages)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info("DeepSeek 回复命中持久化缓存")
+                return cached
+
+        breaker = get_breaker(BREAKER_NAME)
+        get_retry_budget().record_request()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            # 熔断中快速失败，由调用方（Red_Spider）给出降级答案
+            breaker.check()
+
+            try:
+                start_time = time.perf_counter()
+                limit = attempt_timeout(self.timeout, deadline)
+
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=False,
+                    timeout=limit,
+                )
+                breaker.record_success()
+
+                elapsed = time.perf_counter() - start_time
+                logger.info(
+                    f"DeepSeek API 调用成功 (尝试 {attempt + 1}/{self.max_retries + 1}), "
+                    f"耗时: {elapsed:.2f}s"
+                )
+
+                try:
+                    content = response.choices[0].message.content or ""
+                except (AttributeError, IndexError, KeyError) as e:
+                    logger.warning(f"解析 DeepSeek 响应失败：{e}, 原始响应：{response}")
+                    return f"解析 DeepSeek 响应时出错：{str(e)}"
+
+                if cache_key is not None and content:
+                    await asyncio.to_thread(self.cache.set, cache_key, content)
+                return content
+
+            except APITimeoutError as e:
+                # 被请求预算截短的超时不说明服务不可用，不计入熔断
+                raise_if_deadline_limited(self.timeout, limit, deadline, e)
+                last_error = e
+                breaker.record_failure()
+                logger.warning(
+                    f"DeepSeek API 超时 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                delay = backoff_delay(attempt)
+                if should_retry(attempt, self.max_retries, delay, deadline):
+                    await asyncio.sleep(delay)
+                    continue
+                return "抱歉，DeepSeek 服务响应超时，请稍后重试。"
+
+            except RateLimitError as e:
+                last_error = e
+                breaker.record_failure()
+                logger.warning(
+                    f"DeepSeek API 限流 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                # 限流时等待更长时间
+                wait_time = backoff_delay(attempt + 1)
+                if should_retry(attempt, self.max_retries, wait_time, deadline):
+                    logger.info(f"等待 {wait_time:.1f}s 后重试...")
+                    await asyncio.sleep(wait_time)
+                    continue
+                return "抱歉，DeepSeek 服务当前请求过于频繁，请稍后再试。"
+
+            except APIConnectionError as e:
+                # 连接失败（DNS / 拒绝连接 / 断开），与超时一样可以重试
+                last_error = e
+                breaker.record_failure()
+                logger.warning(
+                    f"DeepSeek API 连接失败 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                delay = backoff_delay(attempt)
+                if should_retry(attempt, self.max_retries, delay, deadline):
+                    await asyncio.sleep(delay)
+                    continue
+                return "抱歉，DeepSeek 服务暂时无法连接，请稍后重试。"
+
+            except APIError as e:
+                last_error = e
+                logger.error(
+                    f"DeepSeek API 错误 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                if "500" in str(e) or "503" in str(e):  # 服务器错误，可以重试
+                    breaker.record_failure()
+                    delay = backoff_delay(attempt)
+                    if should_retry(attempt, self.max_retries, delay, deadline):
+                        await asyncio.sleep(delay)
+                        continue
+                else:
+                    breaker.record_success()
+                return f"调用 DeepSeek 服务时出错：{str(e)}"
+
+            except Exception as e:
+                last_error = e
+                breaker.record_failure()
+                logger.exception(
+                    f"DeepSeek API 调用发生未知异常 (尝试 {attempt + 1}/{self.max_retries + 1})"
+                )
+                delay = backoff_delay(attempt)
+                if should_retry(attempt, self.max_retries, delay, deadline):
+                    await asyncio.sleep(delay)
+                    continue
+                return f"调用 DeepSeek 服务时发生未知错误：{str(e)}"
+
+        logger.error(f"DeepSeek API 调用失败，已重试 {self.max_retries + 1} 次，最后错误：{last_error}")
+        return "抱歉，DeepSeek 服务暂时不可用，请稍后重试。"
+
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        以流式方式（stream=True）调用 DeepSeek，逐段产出生成的文本。
+        deadline 的含义同 chat，约束每次尝试的超时与是否重试；
+        被预算截短的尝试超时时抛出 DeadlineExceeded（已产出部分内容时由调用方截断），不计入熔断。
+
+        只有在尚未产出任何内容时才会重试（连接失败、限流等）；
+        一旦已经向调用方推送了部分内容，出错时只追加一条错误提示并结束，
+        避免重复输出。断路器打开时（尚未产出任何内容）抛出 CircuitOpenError，
+        其余错误不会抛出异常。
+        """
+        if not prompt or not prompt.strip():
+            return
+
+        messages = build_messages(prompt, system_prompt)
+        cache_key = self._cache_key(prompt, messages)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        breaker = get_breaker(BREAKER_NAME)
+        get_retry_budget().record_request()
+
+        for attempt in range(self.max_retries + 1):
+            breaker.check()
+            emitted = False
+            parts: List[str] = []
+            try:
+                start_time = time.perf_counter()
+                limit = attempt_timeout(self.timeout, deadline)
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                    timeout=limit,
+                )
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not emitted:
+                            breaker.record_success()
+                            logger.info(
+                                f"DeepSeek 流式首个 token 耗时: "
+                                f"{time.perf_counter() - start_time:.2f}s"
+                            )
+                        emitted = True
+                        parts.append(delta)
+                        yield delta
+
+                if not emitted:
+                    breaker.record_success()
+                if cache_key is not None and parts:
+                    await asyncio.to_thread(self.cache.set, cache_key, "".join(parts))
+                return
+
+            except Exception as e:
+                if isinstance(e, APITimeoutError):
+                    raise_if_deadline_limited(self.timeout, limit, deadline, e)
+                breaker.record_failure()
+                logger.warning(
+                    f"DeepSeek 流式调用失败 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                if emitted:
+                    yield "\n（回答生成中断，请稍后重试）"
+                    return
+                delay = backoff_delay(attempt)
+                if should_retry(attempt, self.max_retries, delay, deadline):
+                    await asyncio.sleep(delay)
+                    continue
+                if isinstance(e, RateLimitError):
+                    yield "抱歉，DeepSeek 服务当前请求过于频繁，请稍后再试。"
+                elif isinstance(e, APITimeoutError):
+                    yield "抱歉，DeepSeek 服务响应超时，请稍后重试。"
+                else:
+                    yield "抱歉，DeepSeek 服务暂时不可用，请稍后重试。"
+                return
+
+    def _cache_key(self, prompt: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(prompt, self.model, messages[0]["content"])
+
+    async def aclose(self) -> None:
+        """关闭底层连接池。"""
+        await self.client.close()
+        await self._http_client.aclose()
+
+
+# 全局异步客户端实例（懒加载），整个进程共享同一个连接池
+_async_deepseek_client: Optional[AsyncDeepSeekClient] = None
+
+
+def get_async_deepseek_client() -> AsyncDeepSeekClient:
+    """
+    获取全局 AsyncDeepSeekClient 实例（懒加载单例模式）。
+
+    异常
+    ----
+    ValueError
+        如果未配置 DEEPSEEK_API_KEY。
+    """
+    global _async_deepseek_client
+
+    if _async_deepseek_client is None:
+        _async_deepseek_client = AsyncDeepSeekClient(cache=get_llm_cache())
+    return _async_deepseek_client
+
+
+async def close_async_deepseek_client() -> None:
+    """关闭全局异步客户端，通常在应用 shutdown 时调用。"""
+    global _async_deepseek_client
+
+    if _async_deepseek_client is not None:
+        try:
+            await _async_deepseek_client.aclose()
+            logger.info("DeepSeek 异步客户端已关闭")
+        except Exception as e:
+            logger.warning(f"关闭 DeepSeek 异步客户端时发生异常：{e}")
+        finally:
+            _async_deepseek_client = None
+
+
+__all__ = [
+    "DeepSeekClient",
+    "AsyncDeepSeekClient",
+    "get_async_deepseek_client",
+    "close_async_deepseek_client",
+    "build_messages",
+    "backoff_delay",
+    "should_retry",
+    "attempt_timeout",
+    "CircuitOpenError",
+    "DeadlineExceeded",
+    "DEFAULT_TIMEOUT",
+    "DEFAULT_MAX_RETRIES",
+    "DEFAULT_SYSTEM_PROMPT",
+]
@@ -0,0 +1,278 @@
+"""
+LLM 回复持久化缓存。
+
+DeepSeek 兜底调用是整条链路中最慢（秒级）、成本最高的一步，
+而大量兜底问题在不同用户之间逐字重复（如“最近总是失眠怎么办”）。
+本模块将生成结果保存在本地 SQLite 文件中：
+
+- 键：规范化后的问题 + 模型名 + 系统提示词 的 SHA-256
+- 值：zstd 压缩（未安装 zstandard 时退回 zlib）后的回复文本
+- WAL 模式：多个 uvicorn worker 进程可同时读取，写入互不阻塞读取
+- 每条记录单独的 TTL，总大小超过上限时按最近访问时间淘汰
+- 进程重启 / 重新部署后依然有效（路径需位于持久化磁盘上）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 每写入多少条记录检查一次总大小
+EVICT_CHECK_INTERVAL = 64
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses (expires_at);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """规范化问题文本：全角/半角统一（NFKC）、去首尾空白、合并连续空白。"""
+    text = unicodedata.normalize("NFKC", prompt or "")
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class LLMResponseCache:
+    """
+    基于 SQLite（WAL 模式）的 LLM 回复缓存。
+
+    所有方法都是同步阻塞的（本地磁盘 I/O，通常亚毫秒级），
+    异步调用方应通过 asyncio.to_thread 调用。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        ttl: float,
+    ) -> None:
+        """
+        参数
+        ----
+        path : str
+            SQLite 数据库文件路径，所在目录不存在时自动创建。
+        max_bytes : int
+            压缩后回复的总大小上限（字节），超过后按最近访问时间淘汰。
+        ttl : float
+            默认的条目有效期（秒）。
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.codec = "zstd" if zstandard is not None else "zlib"
+
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        # 命中统计（仅当前进程）
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+        logger.info(f"LLM 回复缓存已启用：{path}（压缩：{self.codec}）")
+
+    # 每个线程使用独立连接（sqlite3 连接不能跨线程共享）
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(prompt: str, model: str, system_prompt: str) -> str:
+        raw = json.dumps(
+            [normalize_prompt(prompt), model, system_prompt or ""],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _compress(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return zlib.compress(data, 6)
+
+    @staticmethod
+    def _decompress(value: bytes, codec: str) -> Optional[str]:
+        if codec == "zstd":
+            if zstandard is None:
+                return None
+            return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+        if codec == "zlib":
+            return zlib.decompress(value).decode("utf-8")
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        """查询未过期的缓存回复，未命中返回 None。"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, codec FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            text = self._decompress(row[0], row[1])
+            if text is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"读取 LLM 回复缓存失败：{e}")
+            return None
+
+        self.hits += 1
+        return text
+
+    def set(self, key: str, text: str, ttl: Optional[float] = None) -> None:
+        """写入一条回复，ttl 不传时使用默认有效期。"""
+        if not text:
+            return
+
+        now = time.time()
+        value = self._compress(text)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, value, codec, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, value, self.codec, len(value), now, now + (ttl or self.ttl), now),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入 LLM 回复缓存失败：{e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % EVICT_CHECK_INTERVAL == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        清理过期条目；若总大小仍超过上限，按最近访问时间从旧到新淘汰。
+        返回删除的条目数。
+        """
+        try:
+            conn = self._connect()
+            deleted = conn.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                overflow = total - self.max_bytes
+                freed = 0
+                keys = []
+                for key, size in conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+                ):
+                    keys.append((key,))
+                    freed += size
+                    if freed >= overflow:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+                deleted += len(keys)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"清理 LLM 回复缓存失败：{e}")
+            return 0
+
+        if deleted:
+            logger.info(f"LLM 回复缓存淘汰 {deleted} 条记录")
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        except sqlite3.Error:
+            count, total = 0, 0
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "codec": self.codec,
+        }
+
+
+# 全局缓存实例（懒加载）；未启用或初始化失败时为 None
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_initialized = False
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    获取全局 LLM 回复缓存实例。
+
+    未启用（LLM_CACHE_ENABLED=false）或数据库文件无法打开时返回 None，
+    此时调用方直接请求 DeepSeek，不影响正常功能。
+    """
+    global _llm_cache, _llm_cache_initialized
+
+    if not _llm_cache_initialized:
+        _llm_cache_initialized = True
+        settings = get_settings()
+        if settings.llm_cache_enabled:
+            try:
+                _llm_cache = LLMResponseCache(
+                    path=settings.llm_cache_path,
+                    max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+                    ttl=settings.llm_cache_ttl,
+                )
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"LLM 回复缓存初始化失败，已禁用：{e}")
+                _llm_cache = None
+
+    return _llm_cache
+
+
+__all__ = ["LLMResponseCache", "get_llm_cache", "normalize_prompt"]
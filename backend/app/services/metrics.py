@@ -0,0 +1,352 @@
+"""
+进程内指标注册表，以 Prometheus 文本格式（0.0.4）输出，供 GET /metrics 抓取。
+
+- Counter / Histogram：由业务代码直接累加（请求耗时、各阶段耗时、答案来源）
+- 采集函数（collector）：抓取时才读取的瞬时值，如断路器状态、重试次数、
+  Neo4j 连接池使用情况、缓存命中数等，避免在热路径上重复计数
+
+各阶段耗时由 Red_Spider 的 observer 钩子上报（见 RedSpiderObserver），
+red_spider 代码无法导入 app.*，因此以注入对象的方式接入。
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶（秒）：覆盖分类（微秒级）到 DeepSeek 长回答（数十秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+# 采集结果中的一条样本：(指标名, 标签, 值)
+Sample = Tuple[str, Dict[str, str], float]
+# 采集函数返回 [(指标名, 类型, 说明, 样本列表), ...]
+MetricFamily = Tuple[str, str, str, List[Sample]]
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    """只增不减的计数器，可带标签。"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            (self.name, dict(zip(self.labelnames, key)), value)
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram:
+    """累积分桶直方图（输出 _bucket / _sum / _count），可带标签。"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # {标签值: [各分桶计数（非累积，最后一个为 +Inf）, 总和]}
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+
+        samples: List[Sample] = []
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    (self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+                )
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """指标注册表：保存 Counter / Histogram 与采集函数，render() 输出文本格式。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        families: List[MetricFamily] = [
+            (m.name, m.type, m.documentation, m.samples()) for m in metrics
+        ]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                # 单个采集函数出错不影响其余指标
+                logger.warning(f"指标采集失败（{getattr(collector, '__name__', collector)}）：{e}")
+
+        lines: List[str] = []
+        for name, metric_type, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取进程级共享的指标注册表。"""
+    return _registry
+
+
+# ---------------------------------------------------------------------------
+# 业务指标
+# ---------------------------------------------------------------------------
+REQUEST_DURATION = _registry.histogram(
+    "redspider_request_duration_seconds",
+    "Whole request latency, by endpoint (chat / stream / batch).",
+    ("endpoint",),
+)
+STAGE_DURATION = _registry.histogram(
+    "redspider_stage_duration_seconds",
+    "Red_Spider per-stage latency (classify / parser_main / search_main / llm).",
+    ("stage",),
+)
+ANSWERS = _registry.counter(
+    "redspider_answers_total",
+    "Answers by source: kg (graph hit), deepseek (LLM fallback), degraded, deadline.",
+    ("source",),
+)
+
+
+class RedSpiderObserver:
+    """
+    注入给 Red_Spider 的观察者：
+    - observe(stage, seconds)：记录一个阶段的耗时
+    - increment(event)：记录一个事件（答案来源等）
+    """
+
+    def observe(self, stage: str, seconds: float) -> None:
+        STAGE_DURATION.observe(seconds, stage=stage)
+
+    def increment(self, event: str) -> None:
+        ANSWERS.inc(source=event)
+
+
+def observe_request(endpoint: str, seconds: float) -> None:
+    """记录一次完整请求的耗时。"""
+    REQUEST_DURATION.observe(seconds, endpoint=endpoint)
+
+
+# ---------------------------------------------------------------------------
+# 抓取时读取的指标
+# ---------------------------------------------------------------------------
+_BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _collect_resilience() -> List[MetricFamily]:
+    from app.services.resilience import resilience_snapshot
+
+    snapshot = resilience_snapshot()
+    budget = snapshot["retry_budget"]
+    breakers = snapshot["breakers"]
+    return [
+        (
+            "redspider_retries_total",
+            "counter",
+            "Retries granted by the process-wide retry budget.",
+            [("redspider_retries_total", {}, budget["retries"])],
+        ),
+        (
+            "redspider_retry_budget_exhausted_total",
+            "counter",
+            "Retries refused because the retry budget was exhausted.",
+            [("redspider_retry_budget_exhausted_total", {}, budget["exhausted"])],
+        ),
+        (
+            "redspider_retry_budget_tokens",
+            "gauge",
+            "Retry tokens currently available.",
+            [("redspider_retry_budget_tokens", {}, budget["tokens"])],
+        ),
+        (
+            "redspider_circuit_breaker_state",
+            "gauge",
+            "Circuit breaker state (0 closed, 1 half_open, 2 open).",
+            [
+                ("redspider_circuit_breaker_state", {"dependency": name},
+                 _BREAKER_STATE_VALUES.get(b["state"], 0))
+                for name, b in sorted(breakers.items())
+            ],
+        ),
+        (
+            "redspider_circuit_breaker_rejected_total",
+            "counter",
+            "Calls rejected while the circuit breaker was open.",
+            [
+                ("redspider_circuit_breaker_rejected_total", {"dependency": name}, b["rejected"])
+                for name, b in sorted(breakers.items())
+            ],
+        ),
+        (
+            "redspider_circuit_breaker_opened_total",
+            "counter",
+            "Times the circuit breaker has opened.",
+            [
+                ("redspider_circuit_breaker_opened_total", {"dependency": name}, b["opened_count"])
+                for name, b in sorted(breakers.items())
+            ],
+        ),
+    ]
+
+
+def _collect_neo4j_pool() -> List[MetricFamily]:
+    from app.services.neo4j_client import neo4j_pool_stats
+
+    samples: List[Sample] = []
+    for driver, stats in sorted(neo4j_pool_stats().items()):
+        for state in ("in_use", "idle"):
+            samples.append(
+                ("redspider_neo4j_pool_connections", {"driver": driver, "state": state}, stats[state])
+            )
+    return [
+        (
+            "redspider_neo4j_pool_connections",
+            "gauge",
+            "Neo4j connection pool connections by state (sync / async driver).",
+            samples,
+        )
+    ]
+
+
+def _collect_llm_cache() -> List[MetricFamily]:
+    from app.services import llm_cache
+
+    # 只读取已初始化的缓存，抓取指标不触发缓存数据库的创建
+    cache: Optional[llm_cache.LLMResponseCache] = llm_cache._llm_cache
+    if cache is None:
+        return []
+    return [
+        (
+            "redspider_llm_cache_requests_total",
+            "counter",
+            "Persistent LLM response cache lookups by result.",
+            [
+                ("redspider_llm_cache_requests_total", {"result": "hit"}, cache.hits),
+                ("redspider_llm_cache_requests_total", {"result": "miss"}, cache.misses),
+            ],
+        )
+    ]
+
+
+_registry.register_collector(_collect_resilience)
+_registry.register_collector(_collect_neo4j_pool)
+_registry.register_collector(_collect_llm_cache)
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文本格式输出全部指标。"""
+    return _registry.render()
+
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "MetricFamily",
+    "Sample",
+    "RedSpiderObserver",
+    "get_metrics_registry",
+    "observe_request",
+    "render_metrics",
+    "DEFAULT_BUCKETS",
+]
@@ -2,31 +2,83 @@
 Neo4j 数据库访问封装。
 
 提供统一的 Neo4j 查询接口，方便后续迁移到云端数据库时只需修改连接配置。
+
+进程内只保留一组驱动（同步 + 异步），连接池参数统一由 Settings 配置；
+red_spider 的 AnswerSearcher 通过注入复用这里的驱动，不再自建连接池。
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from contextlib import contextmanager
 from typing import Any, Dict, List, Optional
 
-from neo4j import GraphDatabase, Driver, Session
-from neo4j.exceptions import ServiceUnavailable, TransientError
+from neo4j import AsyncDriver, AsyncGraphDatabase, GraphDatabase, Driver, Session
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
 
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.services.resilience import get_breaker, get_retry_budget
 
 logger = logging.getLogger(__name__)
 
+# 断路器名称：run_query 与注入给 red_spider 的 AnswerSearcher 共用
+BREAKER_NAME = "neo4j"
+# 视为数据库不可用（计入熔断）的错误类型
+OUTAGE_ERRORS = (ServiceUnavailable, SessionExpired, TransientError, OSError)
+
 # 全局驱动实例（懒加载）
 _neo4j_driver: Optional[Driver] = None
-
-
-def get_neo4j_driver() -> Driver:
+_async_neo4j_driver: Optional[AsyncDriver] = None
+# 保活任务：定期 ping，避免 Aura 回收空闲连接后首个查询重新建连
+_keepalive_task: Optional["asyncio.Task[None]"] = None
+
+
+def _driver_kwargs(settings: Settings) -> Dict[str, Any]:
+    """同步 / 异步驱动共用的连接参数（认证 + 连接池配置）。"""
+    if not settings.neo4j_uri:
+        raise ValueError("Neo4j URI 未配置，请设置 NEO4J_URI 环境变量")
+
+    if not settings.neo4j_user or not settings.neo4j_password:
+        raise ValueError("Neo4j 认证信息未配置，请设置 NEO4J_USER 和 NEO4J_PASSWORD 环境变量")
+
+    # 根据URI方案决定是否设置encrypted参数
+    # neo4j+s:// 和 neo4j+ssc:// 已经包含加密信息，不能设置encrypted参数
+    # bolt:// 和 neo4j:// 可以使用encrypted参数
+    uri = settings.neo4j_uri
+    is_encrypted_uri = uri.startswith("neo4j+s://") or uri.startswith("neo4j+ssc://") or \
+                      uri.startswith("bolt+s://") or uri.startswith("bolt+ssc://")
+
+    kwargs: Dict[str, Any] = {
+        "uri": uri,
+        "auth": (settings.neo4j_user, settings.neo4j_password),
+        "max_connection_pool_size": settings.neo4j_max_pool_size,
+        "connection_acquisition_timeout": settings.neo4j_acquisition_timeout,
+        "max_connection_lifetime": settings.neo4j_max_connection_lifetime,
+    }
+    # 空闲超过该时长的连接在借出前先做存活检查（None 表示不检查）
+    if settings.neo4j_liveness_check_timeout >= 0:
+        kwargs["liveness_check_timeout"] = settings.neo4j_liveness_check_timeout
+    if not is_encrypted_uri:
+        # 非加密URI方案，可以设置encrypted参数
+        # 本地开发通常不需要加密，云端可能需要
+        kwargs["encrypted"] = False
+    return kwargs
+
+
+def get_neo4j_driver(verify: bool = True) -> Driver:
     """
     获取全局 Neo4j 驱动实例（懒加载单例模式）。
 
     首次调用时会根据配置创建驱动，后续调用直接返回已有实例。
 
+    参数
+    ----
+    verify : bool
+        首次创建时是否立即执行 RETURN 1 验证连接。注入给 red_spider 时传 False，
+        Neo4j 暂时不可用不影响机器人初始化（与驱动本身的懒连接行为一致）。
+
     返回
     ----
     Driver
@@ -43,41 +95,16 @@ def get_neo4j_driver() -> Driver:
 
     if _neo4j_driver is None:
         settings = get_settings()
-
-        if not settings.neo4j_uri:
-            raise ValueError("Neo4j URI 未配置，请设置 NEO4J_URI 环境变量")
-
-        if not settings.neo4j_user or not settings.neo4j_password:
-            raise ValueError("Neo4j 认证信息未配置，请设置 NEO4J_USER 和 NEO4J_PASSWORD 环境变量")
+        kwargs = _driver_kwargs(settings)
 
         try:
-            # 根据URI方案决定是否设置encrypted参数
-            # neo4j+s:// 和 neo4j+ssc:// 已经包含加密信息，不能设置encrypted参数
-            # bolt:// 和 neo4j:// 可以使用encrypted参数
-            uri = settings.neo4j_uri
-            is_encrypted_uri = uri.startswith("neo4j+s://") or uri.startswith("neo4j+ssc://") or \
-                              uri.startswith("bolt+s://") or uri.startswith("bolt+ssc://")
-            
-            if is_encrypted_uri:
-                # 加密URI方案，不设置encrypted参数（驱动会自动处理）
-                _neo4j_driver = GraphDatabase.driver(
-                    uri,
-                    auth=(settings.neo4j_user, settings.neo4j_password),
-                )
-            else:
-                # 非加密URI方案，可以设置encrypted参数
-                # 本地开发通常不需要加密，云端可能需要
-                _neo4j_driver = GraphDatabase.driver(
-                    uri,
-                    auth=(settings.neo4j_user, settings.neo4j_password),
-                    encrypted=False,
-                )
+            _neo4j_driver = GraphDatabase.driver(**kwargs)
 
             # 验证连接
-            with _neo4j_driver.session() as session:
-                session.run("RETURN 1").data()
-
-            logger.info(f"Neo4j 连接成功：{settings.neo4j_uri}")
+            if verify:
+                with _neo4j_driver.session() as session:
+                    session.run("RETURN 1").data()
+                logger.info(f"Neo4j 连接成功：{settings.neo4j_uri}")
 
         except ServiceUnavailable as e:
             logger.error(f"无法连接到 Neo4j 数据库：{e}")
@@ -107,6 +134,111 @@ def close_neo4j_driver() -> None:
             _neo4j_driver = None
 
 
+def get_async_neo4j_driver() -> AsyncDriver:
+    """
+    获取全局 Neo4j 异步驱动实例（懒加载，不主动验证连接）。
+
+    供异步读路径（AnswerSearcher）使用，连接池参数与同步驱动相同。
+    """
+    global _async_neo4j_driver
+
+    if _async_neo4j_driver is None:
+        _async_neo4j_driver = AsyncGraphDatabase.driver(**_driver_kwargs(get_settings()))
+    return _async_neo4j_driver
+
+
+async def close_async_neo4j_driver() -> None:
+    """停止保活任务并关闭异步驱动，通常在应用 shutdown 时调用。"""
+    global _async_neo4j_driver
+
+    await stop_neo4j_keepalive()
+    if _async_neo4j_driver is not None:
+        try:
+            await _async_neo4j_driver.close()
+            logger.info("Neo4j 异步驱动已关闭")
+        except Exception as e:
+            logger.warning(f"关闭 Neo4j 异步驱动时发生异常：{e}")
+        finally:
+            _async_neo4j_driver = None
+
+
+async def _keepalive_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with get_async_neo4j_driver().session() as session:
+                result = await session.run("RETURN 1")
+                await result.consume()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 保活失败不影响服务，下次查询时驱动会自行重连
+            logger.warning(f"Neo4j 保活 ping 失败：{e}")
+
+
+def start_neo4j_keepalive() -> None:
+    """
+    启动保活任务：每隔 neo4j_keepalive_interval 秒执行一次 RETURN 1。
+
+    Aura 会断开长时间空闲的连接，保活让池中至少有一条连接保持可用；
+    间隔应小于 Aura 的空闲断开时间。间隔 <= 0 或使用 SQLite 图谱（GRAPH_BACKEND=sqlite）时不启动。
+    """
+    global _keepalive_task
+
+    settings = get_settings()
+    interval = settings.neo4j_keepalive_interval
+    if settings.graph_backend == "sqlite":
+        return
+    if interval <= 0 or (_keepalive_task is not None and not _keepalive_task.done()):
+        return
+    _keepalive_task = asyncio.create_task(_keepalive_loop(interval))
+
+
+async def stop_neo4j_keepalive() -> None:
+    """停止保活任务。"""
+    global _keepalive_task
+
+    if _keepalive_task is not None:
+        _keepalive_task.cancel()
+        try:
+            await _keepalive_task
+        except asyncio.CancelledError:
+            pass
+        _keepalive_task = None
+
+
+def _pool_counts(driver: Any) -> Optional[Dict[str, int]]:
+    # 驱动未公开连接池状态，这里读取内部属性 _pool.connections（{地址: 连接队列}），
+    # 驱动版本变化导致结构不符时返回 None，而不是让指标接口报错
+    try:
+        connections = driver._pool.connections
+        in_use = idle = 0
+        for queue in list(connections.values()):
+            for connection in list(queue):
+                if connection.in_use:
+                    in_use += 1
+                else:
+                    idle += 1
+    except Exception:
+        return None
+    return {"in_use": in_use, "idle": idle}
+
+
+def neo4j_pool_stats() -> Dict[str, Dict[str, int]]:
+    """
+    已创建驱动的连接池使用情况：{"sync" / "async": {"in_use": n, "idle": n}}。
+    尚未创建的驱动或无法读取内部状态时不出现在结果中；不会触发驱动创建。
+    """
+    stats: Dict[str, Dict[str, int]] = {}
+    for name, driver in (("sync", _neo4j_driver), ("async", _async_neo4j_driver)):
+        if driver is None:
+            continue
+        counts = _pool_counts(driver)
+        if counts is not None:
+            stats[name] = counts
+    return stats
+
+
 @contextmanager
 def get_neo4j_session():
     """
@@ -162,12 +294,17 @@ def run_query(
         parameters = {}
 
     last_error: Optional[Exception] = None
+    breaker = get_breaker(BREAKER_NAME)
+    get_retry_budget().record_request()
 
     for attempt in range(max_retries + 1):
+        # 熔断中直接抛出 CircuitOpenError，不再等待连接超时
+        breaker.check()
         try:
             with get_neo4j_session() as session:
                 result = session.run(cypher, parameters)
                 data = result.data()
+                breaker.record_success()
 
                 logger.debug(
                     f"Neo4j 查询成功 (尝试 {attempt + 1}/{max_retries + 1}): "
@@ -178,17 +315,21 @@ def run_query(
 
         except TransientError as e:
             last_error = e
+            breaker.record_failure()
             logger.warning(
                 f"Neo4j 查询遇到临时错误 (尝试 {attempt + 1}/{max_retries + 1}): {e}"
             )
-            if attempt < max_retries:
-                import time
-
+            if attempt < max_retries and get_retry_budget().try_retry():
                 time.sleep(0.5 * (attempt + 1))  # 简单退避
                 continue
             raise
 
         except Exception as e:
+            # 连接类错误计入熔断；语句错误等说明数据库可达
+            if isinstance(e, OUTAGE_ERRORS):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
             logger.error(f"Neo4j 查询发生异常：{e}, Cypher: {cypher[:100]}...")
             raise
 
@@ -265,6 +406,11 @@ def test_connection() -> bool:
 __all__ = [
     "get_neo4j_driver",
     "close_neo4j_driver",
+    "get_async_neo4j_driver",
+    "close_async_neo4j_driver",
+    "start_neo4j_keepalive",
+    "stop_neo4j_keepalive",
+    "neo4j_pool_stats",
     "get_neo4j_session",
     "run_query",
     "run_queries",
@@ -4,144 +4,55 @@
 目标：
 - 复用 `red_spider/red_spider_V2/Deepseek/robot.py` 中已经实现好的业务流程
 - 对外提供一个简单的函数：chat_once(question) -> ChatResponseData
+- 异步版本 achat_once(question)：供 FastAPI 路由使用，全程不阻塞事件循环
+- 流式版本 astream_once(question)：逐段产出答案，供 SSE 接口使用
+- 批量版本 achat_batch(questions)：合并图谱查询、并发调用 DeepSeek
+- 相同问题的并发请求合并为一次调用（single-flight），见 coalescing_stats()
+- 图谱增量更新后按疾病失效答案缓存：ainvalidate_graph_answers(diseases)
+- 以上函数均接受 timeout（秒）：请求的整体时间预算，经 request_deadline 传递到
+  图谱查询（Neo4j 事务超时）与 DeepSeek 调用（单次请求超时），超时返回已有的最佳答案
+- 每个请求在 tracing.start_trace 中执行，分类 / 解析 / 图谱查询 / LLM 各阶段记录为 span；
+  debug=True 时在响应中返回追踪，配置 TRACE_EXPORT_PATH 时慢请求追加写入 JSONL 文件
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import sys
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
+from app.config import get_settings
 from app.models import ChatResponseData
+from app.services.deepseek_client import get_async_deepseek_client
+from app.services.llm_cache import normalize_prompt
+from app.services.metrics import (
+    MetricFamily,
+    RedSpiderObserver,
+    get_metrics_registry,
+    observe_request,
+)
+from app.services.neo4j_client import (
+    BREAKER_NAME as NEO4J_BREAKER_NAME,
+    get_async_neo4j_driver,
+    get_neo4j_driver,
+)
+from app.services.resilience import get_breaker
 
-# ---------------------------------------------------------------------------
-# 将 Deepseek 版本的红蜘蛛机器人所在目录加入 sys.path，便于导入
-# 目录结构大致为：
-#   .../AIcodes/red_spider/red_spider_V2/Deepseek/robot.py
-# 当前文件路径为：
-#   .../AIcodes/red_spider/AI医疗助手/backend/app/services/red_spider_service.py
-# ---------------------------------------------------------------------------
-
-CURRENT_FILE = Path(__file__).resolve()
-# 目录层级说明（从当前文件开始向上）：
-#   本地开发：
-#     parents[0] -> services
-#     parents[1] -> app
-#     parents[2] -> backend
-#     parents[3] -> AI医疗助手
-#     parents[4] -> red_spider           ✅ 本地：red_spider 在 AI医疗助手 同级
-#   
-#   GitHub/Render 部署（rootDirectory: backend）：
-#     parents[0] -> services
-#     parents[1] -> app
-#     parents[2] -> backend
-#     parents[3] -> /opt/render/project (仓库根目录)
-#     red_spider/ 在 parents[3] 下
-#
-# 兼容两种结构：先尝试本地结构，再尝试 GitHub 结构，最后尝试 Render 结构
-REPO_ROOT = CURRENT_FILE.parents[3]  # 仓库根目录或 AI医疗助手 目录
-
-# 尝试本地结构：red_spider 在 AI医疗助手 同级
-RED_SPIDER_ROOT_LOCAL = CURRENT_FILE.parents[4] / "red_spider"
-# 尝试 GitHub 结构：red_spider 在仓库根目录
-RED_SPIDER_ROOT_GITHUB = REPO_ROOT / "red_spider"
-# 尝试 Render 结构：如果 backend 是 rootDirectory，red_spider 在仓库根目录
-RED_SPIDER_ROOT_RENDER = REPO_ROOT / "red_spider"
-
-# 选择存在的路径，按优先级尝试
-RED_SPIDER_ROOT = None
-candidates = [
-    ("本地结构", RED_SPIDER_ROOT_LOCAL),
-    ("GitHub/Render结构", RED_SPIDER_ROOT_GITHUB),
-    ("Render结构（备用）", RED_SPIDER_ROOT_RENDER),
-]
-
-for name, candidate in candidates:
-    deepseek_dir = candidate / "red_spider_V2" / "Deepseek"
-    if candidate.exists() and deepseek_dir.exists() and (deepseek_dir / "robot.py").exists():
-        RED_SPIDER_ROOT = candidate
-        break
-
-# 如果都不存在，使用 GitHub/Render 结构（默认），并记录详细错误信息
-if RED_SPIDER_ROOT is None:
-    RED_SPIDER_ROOT = RED_SPIDER_ROOT_GITHUB
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    # 收集详细的诊断信息
-    error_msg_parts = [
-        "=" * 60,
-        "❌ 未找到 red_spider 目录！",
-        "=" * 60,
-        f"当前文件: {CURRENT_FILE}",
-        f"当前工作目录: {Path.cwd()}",
-        f"仓库根目录 (parents[3]): {REPO_ROOT}",
-        f"仓库根目录是否存在: {REPO_ROOT.exists()}",
-        "",
-        "已尝试的路径:",
-    ]
-    
-    for name, candidate in candidates:
-        deepseek_dir = candidate / "red_spider_V2" / "Deepseek"
-        robot_file = deepseek_dir / "robot.py"
-        error_msg_parts.extend([
-            f"  [{name}]",
-            f"    路径: {candidate}",
-            f"    存在: {candidate.exists()}",
-            f"    Deepseek目录: {deepseek_dir}",
-            f"    Deepseek目录存在: {deepseek_dir.exists() if candidate.exists() else False}",
-            f"    robot.py: {robot_file}",
-            f"    robot.py存在: {robot_file.exists() if deepseek_dir.exists() else False}",
-            "",
-        ])
-    
-    # 列出仓库根目录下的所有文件和目录
-    if REPO_ROOT.exists():
-        try:
-            repo_contents = list(REPO_ROOT.iterdir())
-            error_msg_parts.extend([
-                f"仓库根目录 ({REPO_ROOT}) 下的内容:",
-                *[f"  - {item.name} ({'目录' if item.is_dir() else '文件'})" for item in repo_contents[:20]],
-                "" if len(repo_contents) <= 20 else f"  ... 还有 {len(repo_contents) - 20} 个项目",
-                "",
-            ])
-        except Exception as e:
-            error_msg_parts.append(f"无法列出仓库根目录内容: {e}")
-    
-    error_msg_parts.extend([
-        "=" * 60,
-        "解决方案:",
-        "1. 确保 red_spider 目录在 Git 仓库根目录下",
-        "2. 检查 .gitignore 是否排除了 red_spider 目录",
-        "3. 提交并推送 red_spider 目录到 GitHub",
-        "=" * 60,
-    ])
-    
-    error_msg = "\n".join(error_msg_parts)
-    logger.error(error_msg)
-    # 同时打印到控制台（在 Render 上可以看到）
-    print(error_msg)
-
-DEEPSEEK_DIR = RED_SPIDER_ROOT / "red_spider_V2" / "Deepseek"
+# red_spider 目录的定位与 sys.path 配置见 red_spider_paths（deepseek_client 也依赖它）
+from app.services.red_spider_paths import DEEPSEEK_DIR, RED_SPIDER_ROOT  # noqa: E402
 
-# 在启动时打印路径信息（便于调试）
 import logging
 logger = logging.getLogger(__name__)
-logger.info(
-    f"Red_Spider 路径配置:\n"
-    f"  RED_SPIDER_ROOT: {RED_SPIDER_ROOT}\n"
-    f"  DEEPSEEK_DIR: {DEEPSEEK_DIR}\n"
-    f"  DEEPSEEK_DIR 存在: {DEEPSEEK_DIR.exists()}\n"
-    f"  robot.py 存在: {(DEEPSEEK_DIR / 'robot.py').exists() if DEEPSEEK_DIR.exists() else False}"
-)
-
-if str(DEEPSEEK_DIR) not in sys.path:
-    sys.path.append(str(DEEPSEEK_DIR))
 
 try:
     # type: ignore[import]
     from robot import Red_Spider  # noqa: E402
+    # robot 导入时已将 red_spider_base 加入 sys.path
+    from request_deadline import DeadlineExceeded, deadline_scope, run_with_deadline  # noqa: E402
+    from tracing import Trace, annotate, current_trace, export_jsonl, start_trace  # noqa: E402
     logger.info("✅ 成功导入 Red_Spider")
 except ImportError as exc:  # pragma: no cover - 导入失败只在环境异常时出现
     import logging
@@ -179,6 +90,7 @@ except ImportError as exc:  # pragma: no cover - 导入失败只在环境异常
 
 
 _red_spider_instance: Optional["Red_Spider"] = None
+_red_spider_lock: Optional[asyncio.Lock] = None
 
 
 def get_red_spider() -> "Red_Spider":
@@ -192,13 +104,266 @@ def get_red_spider() -> "Red_Spider":
     global _red_spider_instance
     if _red_spider_instance is None:
         # flag='deepseek' 与原始脚本保持一致；model_path 仅为接口兼容占位
-        _red_spider_instance = Red_Spider(flag="deepseek", model_path="./pretrain_model")
+        # LLM 兜底统一经由进程内共享的 AsyncDeepSeekClient（复用同一个连接池）
+        # 图谱查询复用 neo4j_client 管理的驱动，整个进程只有一个 Neo4j 连接池
+        _red_spider_instance = Red_Spider(
+            flag="deepseek",
+            model_path="./pretrain_model",
+            llm_client=get_async_deepseek_client(),
+            neo4j_driver=get_neo4j_driver(verify=False),
+            neo4j_async_driver=get_async_neo4j_driver(),
+            graph_breaker=get_breaker(NEO4J_BREAKER_NAME),
+            observer=RedSpiderObserver(),
+        )
     return _red_spider_instance
 
 
-def chat_once(question: str) -> ChatResponseData:
+async def aget_red_spider() -> "Red_Spider":
+    """
+    get_red_spider 的异步版本。
+
+    首次实例化需要读取词典、构建 AC 自动机，耗时数秒，
+    放到线程池中执行，并用锁保证并发请求只初始化一次。
+    """
+
+    global _red_spider_lock
+    if _red_spider_instance is not None:
+        return _red_spider_instance
+
+    if _red_spider_lock is None:
+        _red_spider_lock = asyncio.Lock()
+    async with _red_spider_lock:
+        return await asyncio.to_thread(get_red_spider)
+
+
+async def aclose_red_spider() -> None:
+    """关闭 Red_Spider 持有的异步资源，通常在应用 shutdown 时调用。"""
+
+    if _red_spider_instance is not None:
+        await _red_spider_instance.aclose()
+
+
+# ---------------------------------------------------------------------------
+# single-flight：同一时刻相同（规范化后）的问题只调用一次 Red_Spider，
+# 其余并发请求等待同一个进行中的任务，拿到完全相同的结果（包括异常）。
+#
+# 共享任务不继承发起者的请求上下文：
+# - 不带截止时间，每个等待方在自己的剩余预算内等待（调用方用 run_with_deadline 包裹），
+#   超时只影响自己；最后一个等待方离开时取消共享任务，相当于以等待方中最晚的截止时间运行
+# - 各阶段 span 记录在共享任务自己的追踪里，完成后并入发起者的追踪
+# ---------------------------------------------------------------------------
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: "asyncio.Future[Tuple[Tuple[str, str], Trace]]") -> None:
+        self.future = future
+        self.waiters = 0
+
+
+_inflight: Dict[str, _Flight] = {}
+_coalescing_counters: Dict[str, int] = {"leaders": 0, "coalesced": 0}
+
+
+async def _run_shared(
+    key: str, call: Callable[[], Awaitable[Tuple[str, str]]]
+) -> Tuple[Tuple[str, str], Trace]:
+    with deadline_scope(None), start_trace("chat.shared", question=_question_digest(key)) as trace:
+        result = await call()
+    return result, trace
+
+
+async def _single_flight(
+    key: str, call: Callable[[], Awaitable[Tuple[str, str]]]
+) -> Tuple[str, str]:
+    flight = _inflight.get(key)
+    leader = flight is None
+    if leader:
+        _coalescing_counters["leaders"] += 1
+        flight = _inflight[key] = _Flight(asyncio.ensure_future(_run_shared(key, call)))
+
+        def _done(f: "asyncio.Future[Tuple[Tuple[str, str], Trace]]") -> None:
+            current = _inflight.get(key)
+            if current is not None and current.future is f:
+                del _inflight[key]
+            # 所有等待方都已离开时，取出异常避免 "exception was never retrieved" 警告
+            if not f.cancelled():
+                f.exception()
+
+        flight.future.add_done_callback(_done)
+    else:
+        _coalescing_counters["coalesced"] += 1
+        # 跟随者不执行各阶段，追踪中只有这一标记；各阶段 span 记录在发起者的追踪里
+        annotate(coalesced=True)
+
+    flight.waiters += 1
+    try:
+        # shield：某个等待方超时或断开连接（被取消）不会取消其他人共享的任务
+        result, shared_trace = await asyncio.shield(flight.future)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.future.done():
+            # 没有等待方了：移出 _inflight，随后到达的相同问题重新发起调用
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+            flight.future.cancel()
+
+    if leader:
+        trace = current_trace()
+        if trace is not None:
+            trace.spans.extend(shared_trace.spans)
+    return result
+
+
+def coalescing_stats() -> Dict[str, int]:
+    """
+    返回请求合并计数：
+    - leaders：实际调用 Red_Spider 的次数
+    - coalesced：被合并、直接等待进行中结果的请求数
+    - inflight：当前进行中的不同问题数
+    """
+    return {**_coalescing_counters, "inflight": len(_inflight)}
+
+
+# 进行中的镜像重新加载（并发的失效请求共用同一次加载）与上次加载结束的时间
+_mirror_reload: Optional["asyncio.Future[None]"] = None
+_mirror_reloaded_at = float("-inf")
+
+
+async def _areload_mirror(mirror: Any) -> bool:
+    """重新加载内存镜像；已有加载在进行时等待它，距上次加载不足最小间隔时跳过，返回是否已加载。"""
+
+    global _mirror_reload
+    if _mirror_reload is None:
+        if time.monotonic() - _mirror_reloaded_at < get_settings().graph_reload_min_interval:
+            return False
+
+        def _done(_: "asyncio.Future[None]") -> None:
+            global _mirror_reload, _mirror_reloaded_at
+            _mirror_reload = None
+            _mirror_reloaded_at = time.monotonic()
+
+        _mirror_reload = asyncio.ensure_future(asyncio.to_thread(mirror.load))
+        _mirror_reload.add_done_callback(_done)
+    await asyncio.shield(_mirror_reload)
+    return True
+
+
+async def ainvalidate_graph_answers(diseases: List[str]) -> Dict[str, Any]:
+    """
+    图谱增量更新后按疾病失效答案缓存（build_medicalgraph.py --incremental --notify-url）。
+
+    GRAPH_BACKEND=mirror 时先重新加载内存镜像，否则失效后的请求会从旧快照回填缓存；
+    并发请求共用同一次加载，GRAPH_RELOAD_MIN_INTERVAL 内不重复加载。
+    重新加载失败或被跳过时仍然失效缓存，镜像由后台的版本检查稍后刷新。
+    """
+    bot = _red_spider_instance
+    if bot is None:
+        # 机器人尚未初始化，没有需要失效的缓存
+        return {"invalidated": 0, "mirror_reloaded": False}
+
+    reloaded = False
+    mirror = getattr(bot.searcher, "mirror", None)
+    if mirror is not None and mirror.loaded:
+        try:
+            reloaded = await _areload_mirror(mirror)
+        except Exception as e:
+            logger.warning(f"图谱内存镜像重新加载失败：{e}")
+
+    invalidated = bot.answer_cache.invalidate_entities(diseases)
+    logger.info(f"图谱更新：{len(diseases)} 个疾病，失效 {invalidated} 条答案缓存")
+    return {"invalidated": invalidated, "mirror_reloaded": reloaded}
+
+
+def _collect_metrics() -> List[MetricFamily]:
+    # 抓取 /metrics 时读取：请求合并计数，以及 Red_Spider 的答案缓存与推测执行计数（已初始化时）
+    stats = coalescing_stats()
+    families: List[MetricFamily] = [
+        (
+            "redspider_coalescing_requests_total",
+            "counter",
+            "Chat requests by single-flight role (leader called Red_Spider, coalesced waited).",
+            [
+                ("redspider_coalescing_requests_total", {"role": role}, stats[role])
+                for role in ("leaders", "coalesced")
+            ],
+        ),
+        (
+            "redspider_coalescing_inflight",
+            "gauge",
+            "Distinct questions currently in flight.",
+            [("redspider_coalescing_inflight", {}, stats["inflight"])],
+        ),
+    ]
+
+    bot = _red_spider_instance
+    if bot is None:
+        return families
+
+    cache = bot.answer_cache.stats()
+    families.append(
+        (
+            "redspider_answer_cache_requests_total",
+            "counter",
+            "Graph answer cache lookups by result (stale = expired answer served as fallback).",
+            [
+                ("redspider_answer_cache_requests_total", {"result": "hit"}, cache["hits"]),
+                ("redspider_answer_cache_requests_total", {"result": "miss"}, cache["misses"]),
+                ("redspider_answer_cache_requests_total", {"result": "stale"}, cache["stale_hits"]),
+            ],
+        )
+    )
+    families.append(
+        (
+            "redspider_speculative_llm_total",
+            "counter",
+            "Speculative LLM calls by outcome (started / used / cancelled).",
+            [
+                ("redspider_speculative_llm_total", {"outcome": outcome}, count)
+                for outcome, count in bot.speculation_stats.items()
+            ],
+        )
+    )
+    return families
+
+
+get_metrics_registry().register_collector(_collect_metrics)
+
+
+def _question_digest(question: str) -> str:
+    # 追踪中只记录问题的摘要，避免把用户的原始描述写入追踪文件
+    return hashlib.sha256(normalize_prompt(question).encode("utf-8")).hexdigest()[:16]
+
+
+def _should_export(trace: Trace) -> bool:
+    settings = get_settings()
+    return bool(settings.trace_export_path) and (trace.duration_ms or 0) >= settings.trace_slow_ms
+
+
+def _export_trace(trace: Trace) -> None:
+    """慢请求（不低于 TRACE_SLOW_MS）的追踪追加写入 TRACE_EXPORT_PATH。"""
+    if not _should_export(trace):
+        return
+    try:
+        export_jsonl(trace, get_settings().trace_export_path)
+    except OSError as e:
+        # 追踪导出失败不影响请求本身
+        logger.warning(f"写入追踪文件失败：{e}")
+
+
+async def _aexport_trace(trace: Trace) -> None:
+    # 写文件放到线程池中执行，不阻塞事件循环
+    if _should_export(trace):
+        await asyncio.to_thread(_export_trace, trace)
+
+
+def chat_once(
+    question: str, timeout: Optional[float] = None, debug: bool = False
+) -> ChatResponseData:
     """
     调用 Red_Spider 进行单轮问答，并包装为 ChatResponseData。
+
+    timeout 为请求时间预算（秒），同步路径下用于限制 Neo4j 事务超时；None 表示不限时。
+    debug 为 True 时在 data.trace 中返回各阶段的追踪。
     """
 
     if not question or not question.strip():
@@ -209,15 +374,163 @@ def chat_once(question: str) -> ChatResponseData:
 
     bot = get_red_spider()
     start = time.perf_counter()
-    answer_text = bot.chat_main(question)
-    elapsed_ms = int((time.perf_counter() - start) * 1000)
+    with start_trace("chat", question=_question_digest(question)) as trace:
+        with deadline_scope(timeout):
+            answer_text, source = bot.chat_detail(question)
+        annotate(source=source)
+    elapsed = time.perf_counter() - start
+    observe_request("chat", elapsed)
+    elapsed_ms = int(elapsed * 1000)
+
+    _export_trace(trace)
+
+    return ChatResponseData(
+        answer=answer_text,
+        source=source,
+        elapsed_ms=elapsed_ms,
+        trace=trace.to_dict() if debug else None,
+    )
+
+
+async def achat_once(
+    question: str, timeout: Optional[float] = None, debug: bool = False
+) -> ChatResponseData:
+    """
+    chat_once 的异步版本：调用 Red_Spider.achat_detail，
+    Neo4j 查询与 DeepSeek 调用期间让出事件循环。
+
+    合并到进行中调用的每个请求（包括发起者）都只等待自己的时间预算，超时时返回缓存中的
+    图谱答案或超时提示，不影响其他等待方；共享调用本身不受发起者时间预算的限制。
+    被合并的请求拿到发起者的答案与来源，其追踪只带 coalesced 标记，不含各阶段 span。
+    """
+
+    if not question or not question.strip():
+        return ChatResponseData(
+            answer="请先描述您的症状，例如：『发烧两天，体温38.5度』",
+            source="unknown",
+        )
+
+    bot = await aget_red_spider()
+    start = time.perf_counter()
+    with start_trace("chat", question=_question_digest(question)) as trace:
+        with deadline_scope(timeout):
+            try:
+                if get_settings().chat_coalesce_enabled:
+                    answer_text, source = await run_with_deadline(
+                        _single_flight(normalize_prompt(question), lambda: bot.achat_detail(question))
+                    )
+                else:
+                    answer_text, source = await bot.achat_detail(question)
+            except DeadlineExceeded:
+                annotate(deadline_exceeded=True)
+                answer_text, from_kg = bot.deadline_answer(bot.classifier.classify(question))
+                source = "kg" if from_kg else "system"
+        annotate(source=source)
+    elapsed = time.perf_counter() - start
+    observe_request("chat", elapsed)
+    elapsed_ms = int(elapsed * 1000)
+    await _aexport_trace(trace)
 
     return ChatResponseData(
         answer=answer_text,
-        source="unknown",  # 暂时无法精确区分 KG / DeepSeek，后续可在 Red_Spider 中增加标记
+        source=source,
         elapsed_ms=elapsed_ms,
+        trace=trace.to_dict() if debug else None,
     )
 
 
-__all__ = ["chat_once", "get_red_spider"]
+async def achat_batch(
+    questions: List[str],
+    timeout: Optional[float] = None,
+    trace_sink: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Union[ChatResponseData, BaseException]]:
+    """
+    批量问答：调用 Red_Spider.abatch_main，返回 {问题: 结果}，相同问题只回答一次。
+    单个问题失败时对应的值为异常，不影响其他问题。
+    elapsed_ms 为从批量开始到该问题得到答案的耗时；timeout 为整批共享的时间预算。
+    整批记录为一个追踪；传入 trace_sink 时把追踪字典追加到其中。
+    """
+
+    results: Dict[str, Union[ChatResponseData, BaseException]] = {}
+    if not questions:
+        return results
+
+    bot = await aget_red_spider()
+    start = time.perf_counter()
+    concurrency = get_settings().chat_batch_concurrency
+    sources: Dict[str, int] = {}
+    with start_trace("batch", questions=len(questions)) as trace:
+        with deadline_scope(timeout):
+            async for question, answer_text, source, error in bot.abatch_main(questions, concurrency):
+                if error is not None:
+                    results[question] = error
+                    continue
+                sources[source] = sources.get(source, 0) + 1
+                results[question] = ChatResponseData(
+                    answer=answer_text,
+                    source=source,
+                    elapsed_ms=int((time.perf_counter() - start) * 1000),
+                )
+        annotate(sources=sources)
+    observe_request("batch", time.perf_counter() - start)
+    await _aexport_trace(trace)
+    if trace_sink is not None:
+        trace_sink.append(trace.to_dict())
+    return results
+
+
+async def astream_once(
+    question: str, timeout: Optional[float] = None, debug: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式单轮问答，逐个产出事件字典：
+    - {"event": "section", "content": ...}：知识图谱的一段答案
+    - {"event": "token", "content": ...}：DeepSeek 生成的文本片段
+    - {"event": "done", "source": ..., "elapsed_ms": ...}：结束标记；
+      source 为 "kg" / "deepseek"，两者都有时为 "mixed"；debug 为 True 时附带 trace
+    """
+
+    start = time.perf_counter()
+    kinds = set()
+
+    with start_trace("stream", question=_question_digest(question or "")) as trace:
+        if question and question.strip():
+            bot = await aget_red_spider()
+            with deadline_scope(timeout):
+                async for kind, text in bot.astream_main(question):
+                    kinds.add(kind)
+                    yield {"event": kind, "content": text}
+
+        if kinds == {"section"}:
+            source = "kg"
+        elif kinds == {"token"}:
+            source = "deepseek"
+        else:
+            source = "mixed" if kinds else "unknown"
+        annotate(source=source)
+
+    elapsed = time.perf_counter() - start
+    observe_request("stream", elapsed)
+    await _aexport_trace(trace)
+    done: Dict[str, Any] = {
+        "event": "done",
+        "source": source,
+        "elapsed_ms": int(elapsed * 1000),
+    }
+    if debug:
+        done["trace"] = trace.to_dict()
+    yield done
+
+
+__all__ = [
+    "chat_once",
+    "achat_once",
+    "astream_once",
+    "achat_batch",
+    "coalescing_stats",
+    "ainvalidate_graph_answers",
+    "get_red_spider",
+    "aget_red_spider",
+    "aclose_red_spider",
+]
 
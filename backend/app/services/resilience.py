@@ -0,0 +1,247 @@
+"""
+依赖调用的弹性控制：断路器 + 进程级重试预算。
+
+- CircuitBreaker：每个外部依赖（DeepSeek / Neo4j）一个。连续失败达到阈值后打开，
+  打开期间请求直接失败（不再等待超时与重试）；冷却时间过后进入半开状态，
+  只放行少量探测请求，探测成功则关闭，失败则重新打开。
+- RetryBudget：整个进程共享的重试额度。每个请求存入 ratio 个令牌，每次重试消耗 1 个，
+  依赖大面积故障时重试总量不超过正常请求量的 ratio 倍，避免重试风暴拖垮 worker。
+
+两者都是线程安全的：同步客户端（线程池中执行）与异步客户端共用同一组实例。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.utils.exceptions import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    连续失败计数型断路器。
+
+    参数
+    ----
+    name : str
+        依赖名称，用于日志与状态展示。
+    failure_threshold : int
+        连续失败多少次后打开。
+    recovery_timeout : float
+        打开后经过多少秒进入半开状态。
+    half_open_max_calls : int
+        半开状态下同时放行的探测请求数。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_at = 0.0
+        self._rejected = 0
+        self._opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        # 调用方需持有锁
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """是否放行本次调用；半开状态下占用一个探测名额。"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN:
+                # 探测请求被取消等情况下不会回报结果，超过冷却时间后重新放行探测
+                now = time.monotonic()
+                probe_expired = now - self._probe_at >= self.recovery_timeout
+                if self._probes >= self.half_open_max_calls and probe_expired:
+                    self._probes = 0
+                if self._probes < self.half_open_max_calls:
+                    self._probes += 1
+                    self._probe_at = now
+                    return True
+            self._rejected += 1
+            return False
+
+    def check(self) -> None:
+        """allow() 的抛异常版本：不放行时抛出 CircuitOpenError。"""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = CLOSED
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._opened_count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in: Optional[float] = None
+            if state == OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened_count": self._opened_count,
+                "rejected": self._rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+
+class RetryBudget:
+    """
+    进程级重试预算（令牌桶）。
+
+    参数
+    ----
+    ratio : float
+        每个请求存入的令牌数，即重试量占请求量的最大比例。
+    min_per_second : float
+        每秒额外补充的令牌数，保证低流量时也能重试。
+    max_tokens : float
+        令牌上限，避免空闲一段时间后积攒过多重试额度。
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        max_tokens: float = 10.0,
+    ) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+
+        self._lock = threading.Lock()
+        self._tokens = max_tokens
+        self._updated_at = time.monotonic()
+        self._retries = 0
+        self._exhausted = 0
+
+    def _refill(self, amount: float = 0.0) -> None:
+        # 调用方需持有锁
+        now = time.monotonic()
+        amount += (now - self._updated_at) * self.min_per_second
+        self._updated_at = now
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+
+    def record_request(self) -> None:
+        """记录一次首次尝试（非重试）。"""
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_retry(self) -> bool:
+        """申请一次重试额度；额度不足时返回 False，调用方应放弃重试。"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self._retries += 1
+                return True
+            self._exhausted += 1
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {
+                "tokens": round(self._tokens, 2),
+                "retries": self._retries,
+                "exhausted": self._exhausted,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_retry_budget: Optional[RetryBudget] = None
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取（首次调用时创建）指定依赖的断路器，参数来自 Settings。"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=settings.breaker_failure_threshold,
+                recovery_timeout=settings.breaker_recovery_timeout,
+                half_open_max_calls=settings.breaker_half_open_max_calls,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def get_retry_budget() -> RetryBudget:
+    """获取进程级共享的重试预算。"""
+    global _retry_budget
+
+    with _breakers_lock:
+        if _retry_budget is None:
+            settings = get_settings()
+            _retry_budget = RetryBudget(
+                ratio=settings.retry_budget_ratio,
+                min_per_second=settings.retry_budget_min_per_second,
+            )
+        return _retry_budget
+
+
+def resilience_snapshot() -> Dict[str, Any]:
+    """所有断路器与重试预算的当前状态，供管理接口展示。"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {
+        "breakers": {name: breaker.snapshot() for name, breaker in breakers.items()},
+        "retry_budget": get_retry_budget().snapshot(),
+    }
+
+
+__all__ = [
+    "CircuitBreaker",
+    "RetryBudget",
+    "get_breaker",
+    "get_retry_budget",
+    "resilience_snapshot",
+    "CLOSED",
+    "OPEN",
+    "HALF_OPEN",
+]
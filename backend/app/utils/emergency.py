@@ -2,11 +2,17 @@
 紧急症状检测工具。
 
 提供高危症状关键词检测和紧急提示消息生成功能。
+
+检测由 EmergencyDetector 完成：关键词编译进 Aho-Corasick 自动机，单次扫描即可得到
+全部命中，耗时与关键词数量无关；关键词紧跟在否定词之后（如“没有胸痛”）时不计为命中。
+/api/chat 与 /api/emergency/* 共用同一个实例。
 """
 
 from __future__ import annotations
 
-from typing import List, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import ahocorasick
 
 # 高危症状关键词列表（可根据实际需求扩展）
 EMERGENCY_KEYWORDS: List[str] = [
@@ -44,8 +50,144 @@ EMERGENCY_KEYWORDS: List[str] = [
     "烧伤",
 ]
 
+# 严重程度：critical 表示需立即急救，/api/chat 命中时直接拦截；其余关键词为 high
+SEVERITY_LEVELS: Tuple[str, ...] = ("high", "critical")
+
+EMERGENCY_SEVERITY: Dict[str, str] = {
+    keyword: "high" for keyword in EMERGENCY_KEYWORDS
+}
+EMERGENCY_SEVERITY.update(
+    {
+        keyword: "critical"
+        for keyword in [
+            "胸痛",
+            "心跳骤停",
+            "猝死",
+            "呼吸困难",
+            "窒息",
+            "呼吸骤停",
+            "大量出血",
+            "大出血",
+            "昏迷",
+            "休克",
+            "意识丧失",
+            "过敏性休克",
+        ]
+    }
+)
+
+# 否定词：只有紧跟在关键词之前（中间最多有空白）时才生效。
+# 漏报比误报代价大，这里只收录明确表示“没有该症状”的词，不复用问句分类的 deny.txt
+# （其中的“非”“不”“少”“注意”等会把“非常胸痛”“不小心烧伤”误判为否定）
+NEGATION_WORDS: Tuple[str, ...] = (
+    "没有",
+    "没",
+    "无",
+    "未",
+    "不是",
+    "并无",
+    "并没有",
+    "否认",
+    "未见",
+    "从未",
+)
+
+# 以否定词结尾、但本身不表示否定的组合词：如“是不是胸痛”是疑问，仍然计为命中
+NEGATION_EXCLUSIONS: Tuple[str, ...] = (
+    "是不是",
+    "是否",
+    "有没有",
+    "有无",
+    "毫无预兆",
+)
+
+
+class EmergencyHit(NamedTuple):
+    keyword: str
+    severity: str
+    start: int
+    end: int
+
+
+class EmergencyDetector:
+    """
+    编译后的高危症状检测器。
+
+    参数
+    ----
+    keywords : Dict[str, str]
+        关键词 -> 严重程度。
+    negation_words : Iterable[str]
+        否定词，紧跟在关键词之前时该关键词不计为命中。
+    exclusions : Iterable[str]
+        以否定词结尾、但不表示否定的组合词。
+    """
 
-def detect_emergency_keywords(text: str) -> Tuple[bool, List[str]]:
+    def __init__(
+        self,
+        keywords: Dict[str, str],
+        negation_words: Iterable[str] = NEGATION_WORDS,
+        exclusions: Iterable[str] = NEGATION_EXCLUSIONS,
+    ) -> None:
+        self.negation_words = tuple(word.lower() for word in negation_words)
+        self.exclusions = tuple(word.lower() for word in exclusions)
+        # 判断否定只需看关键词之前的这么多个字符
+        self._lookbehind = max((len(w) for w in self.negation_words + self.exclusions), default=0)
+        self.automaton = ahocorasick.Automaton()
+        for keyword, severity in keywords.items():
+            self.automaton.add_word(keyword.lower(), (keyword, severity))
+        self.automaton.make_automaton()
+
+    def detect(self, text: str) -> List[EmergencyHit]:
+        """
+        扫描文本，返回未被否定的高危关键词命中（按出现位置排序，
+        重叠时只保留最长的一个，如“过敏性休克”不再单独报告“休克”）。
+        """
+        if not text:
+            return []
+
+        text_lower = text.lower()
+        hits: List[EmergencyHit] = []
+        for end_idx, (word, severity) in self.automaton.iter(text_lower):
+            start = end_idx - len(word) + 1
+            if not self._negated(text_lower, start):
+                hits.append(EmergencyHit(word, severity, start, end_idx + 1))
+
+        # 最左最长、互不重叠
+        hits.sort(key=lambda h: (h.start, -h.end))
+        resolved: List[EmergencyHit] = []
+        cursor = 0
+        for hit in hits:
+            if hit.start >= cursor:
+                resolved.append(hit)
+                cursor = hit.end
+        return resolved
+
+    def _negated(self, text: str, start: int) -> bool:
+        prefix = text[:start].rstrip()
+        if not prefix:
+            return False
+        prefix = prefix[-self._lookbehind:]
+        if any(prefix.endswith(word) for word in self.exclusions):
+            return False
+        return any(prefix.endswith(word) for word in self.negation_words)
+
+
+_detector: Optional[EmergencyDetector] = None
+
+
+def get_emergency_detector() -> EmergencyDetector:
+    """返回全局共享的检测器实例（首次调用时编译）。"""
+    global _detector
+    if _detector is None:
+        _detector = EmergencyDetector(EMERGENCY_SEVERITY)
+    return _detector
+
+
+def detect_emergency_keywords(
+    text: str,
+    min_severity: str = "high",
+) -> Tuple[bool, List[str]]:
     """
     检测文本中是否包含高危症状关键词。
 
@@ -53,6 +195,8 @@ def detect_emergency_keywords(text: str) -> Tuple[bool, List[str]]:
     ----
     text : str
         待检测的文本（通常是用户输入的问题）。
+    min_severity : str
+        只统计不低于该严重程度的关键词（"high" / "critical"）。
 
     返回
     ----
@@ -62,12 +206,11 @@ def detect_emergency_keywords(text: str) -> Tuple[bool, List[str]]:
     if not text or not text.strip():
         return False, []
 
-    text_lower = text.lower()
+    level = SEVERITY_LEVELS.index(min_severity)
     matched_keywords: List[str] = []
-
-    for keyword in EMERGENCY_KEYWORDS:
-        if keyword in text or keyword.lower() in text_lower:
-            matched_keywords.append(keyword)
+    for hit in get_emergency_detector().detect(text):
+        if SEVERITY_LEVELS.index(hit.severity) >= level and hit.keyword not in matched_keywords:
+            matched_keywords.append(hit.keyword)
 
     return len(matched_keywords) > 0, matched_keywords
 
@@ -101,6 +244,12 @@ def get_emergency_message(matched_keywords: List[str]) -> str:
 
 __all__ = [
     "EMERGENCY_KEYWORDS",
+    "EMERGENCY_SEVERITY",
+    "SEVERITY_LEVELS",
+    "EmergencyDetector",
+    "EmergencyHit",
+    "get_emergency_detector",
+    "load_deny_words",
     "detect_emergency_keywords",
     "get_emergency_message",
 ]
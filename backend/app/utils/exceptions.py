@@ -46,8 +46,20 @@ class ValidationError(MedicalAssistantException):
         self.field = field
 
 
+class CircuitOpenError(MedicalAssistantException):
+    """依赖服务熔断中（断路器打开），请求被快速拒绝。"""
+
+    def __init__(self, dependency: str) -> None:
+        super().__init__(
+            f"{dependency} 暂时不可用（熔断中），请稍后重试",
+            code=f"circuit_open_{dependency}",
+        )
+        self.dependency = dependency
+
+
 __all__ = [
     "MedicalAssistantException",
+    "CircuitOpenError",
     "ConfigurationError",
     "DatabaseConnectionError",
     "APIError",
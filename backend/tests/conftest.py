@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# 测试直接导入 app 包；不访问真实的 DeepSeek
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DEEPSEEK_API_KEY", "test")
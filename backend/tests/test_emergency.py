@@ -0,0 +1,40 @@
+"""高危症状检测的否定判断回归测试。"""
+
+import pytest
+
+from app.utils.emergency import detect_emergency_keywords
+
+# 含有易被误判为否定的组合词（非常 / 是不是 / 不小心 / 少量 / 注意），必须计为命中
+NOT_NEGATED = [
+    ("非常胸痛", "胸痛"),
+    ("突然非常严重的胸痛", "胸痛"),
+    ("是不是胸痛", "胸痛"),
+    ("孩子不小心烧伤了", "烧伤"),
+    ("少量出血后昏迷", "昏迷"),
+    ("注意到呼吸困难", "呼吸困难"),
+]
+
+
+@pytest.mark.parametrize("question,keyword", NOT_NEGATED)
+def test_compounds_are_not_negation(question, keyword):
+    assert detect_emergency_keywords(question) == (True, [keyword])
+
+
+@pytest.mark.parametrize("question,keyword", [q for q in NOT_NEGATED if q[1] != "烧伤"])
+def test_compounds_are_not_negation_critical(question, keyword):
+    # /api/chat 只拦截 critical 级别（烧伤为 high）
+    assert detect_emergency_keywords(question, min_severity="critical") == (True, [keyword])
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["没有胸痛", "无胸痛", "未见昏迷", "不是呼吸困难", "并没有 胸痛", "否认胸痛"],
+)
+def test_direct_negation(question):
+    assert detect_emergency_keywords(question) == (False, [])
+
+
+def test_negation_only_applies_right_before_keyword():
+    # 否定词与关键词之间隔了其他字符，仍计为命中
+    assert detect_emergency_keywords("没有发烧但是胸痛") == (True, ["胸痛"])
+    assert detect_emergency_keywords("没有明显胸痛") == (True, ["胸痛"])
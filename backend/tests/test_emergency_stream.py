@@ -0,0 +1,46 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import emergency
+from app.config import get_settings
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(emergency.router)
+    return TestClient(app)
+
+
+def _post(lines, chunk_bytes=7):
+    body = "\n".join(lines).encode("utf-8")
+
+    def chunks():
+        for i in range(0, len(body), chunk_bytes):
+            yield body[i:i + chunk_bytes]
+
+    response = _client().post(
+        "/api/emergency/batch-check/stream",
+        content=chunks(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_results_in_order():
+    results = _post(['"我有点头痛"', '{"question": "胸痛，呼吸困难"}', "", "感冒了"])
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert [r["is_emergency"] for r in results] == [False, True, False]
+
+
+def test_overlong_line_is_rejected_without_buffering():
+    limit = get_settings().emergency_max_question_bytes
+    results = _post(["胸痛", "x" * (limit + 1), "感冒了"], chunk_bytes=1024)
+    assert results[0]["is_emergency"] is True
+    assert results[1] == {
+        "index": 1,
+        "error": {"code": "question_too_long", "message": f"单个问题不能超过 {limit} 字节"},
+    }
+    assert results[2]["question"] == "感冒了"
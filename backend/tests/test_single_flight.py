@@ -0,0 +1,60 @@
+import asyncio
+
+from app.services import red_spider_service as service
+from request_deadline import DeadlineExceeded, deadline_scope, remaining, run_with_deadline
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_shared_call_ignores_leader_deadline():
+    seen = []
+
+    async def call():
+        seen.append(remaining())
+        await asyncio.sleep(0.2)
+        return "答案", "deepseek"
+
+    async def waiter(timeout):
+        with deadline_scope(timeout):
+            return await run_with_deadline(service._single_flight("q-deadline", call))
+
+    async def main():
+        leader = asyncio.ensure_future(waiter(0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(waiter(5))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = _run(main())
+    # 发起者自己超时，共享调用不带截止时间，跟随者照常拿到结果
+    assert isinstance(leader, DeadlineExceeded)
+    assert follower == ("答案", "deepseek")
+    assert seen == [None]
+    assert "q-deadline" not in service._inflight
+
+
+def test_shared_call_cancelled_when_all_waiters_leave():
+    async def main():
+        state = {"cancelled": False}
+
+        async def call():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            return "答案", "deepseek"
+
+        async def waiter():
+            with deadline_scope(0.05):
+                return await run_with_deadline(service._single_flight("q-cancel", call))
+
+        results = await asyncio.gather(waiter(), waiter(), return_exceptions=True)
+        await asyncio.sleep(0)
+        return results, state["cancelled"]
+
+    results, was_cancelled = _run(main())
+    assert all(isinstance(r, DeadlineExceeded) for r in results)
+    assert was_cancelled
+    assert "q-cancel" not in service._inflight
@@ -1,15 +1,21 @@
+import asyncio
 import os
 import sys
-from typing import Optional
-
-from deepsk import DS_RedSpider
+from typing import AsyncIterator, Optional
 
 # 为了能在 Deepseek 模块中统一调用其它模型，这里适当调整 sys.path
 CURRENT_DIR = os.path.dirname(__file__)              # .../red_spider_V2/Deepseek
 V2_ROOT = os.path.dirname(CURRENT_DIR)               # .../red_spider_V2
+BASE_DIR = os.path.join(os.path.dirname(V2_ROOT), "red_spider_base")
 
 if V2_ROOT not in sys.path:
     sys.path.append(V2_ROOT)
+# red_spider_base：请求追踪（tracing）等公共模块
+if os.path.isdir(BASE_DIR) and BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from deepsk import DS_RedSpider
+from tracing import span, traced
 
 try:
     from gpt_module.gpt2 import GPT2_RedSpider
@@ -33,7 +39,13 @@ class ChatGPT:
     - flag='deepseek'  → 使用 DS_RedSpider（DeepSeek 大模型 API）
     """
 
-    def __init__(self, flag: str = "deepseek", model_path: str = "./pretrain_model", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        flag: str = "deepseek",
+        model_path: str = "./pretrain_model",
+        api_key: Optional[str] = None,
+        client=None,
+    ):
         """
         参数
         ----
@@ -49,6 +61,9 @@ class ChatGPT:
             本地模型父目录路径，例如 "./pretrain_model"。
         api_key : str or None
             DeepSeek 的 API Key；如果不传，则从环境变量 DEEPSEEK_API_KEY 读取。
+        client : 可选
+            仅 flag='deepseek' 时生效：外部共享的异步 DeepSeek 客户端，
+            异步调用经由它发出，整个进程复用同一个连接池。
         """
         self.flag = flag
 
@@ -86,9 +101,9 @@ class ChatGPT:
         elif flag == "deepseek":
             # 如果外部没有显式传入 api_key，则让 DS_RedSpider 使用其默认逻辑
             if api_key is None:
-                self.generator = DS_RedSpider()
+                self.generator = DS_RedSpider(client=client)
             else:
-                self.generator = DS_RedSpider(api_key=api_key)
+                self.generator = DS_RedSpider(api_key=api_key, client=client)
 
         else:
             raise ValueError(
@@ -96,8 +111,27 @@ class ChatGPT:
                 f"支持的选项：'gpt2', 'yuyuan', 'intern', 'qwen', 'qwen1.5B', 'deepseek'"
             )
 
+    @traced("llm")
     def chat(self, prompt: str) -> str:
         res = self.generator.chat(prompt)
         return res
 
+    @traced("llm")
+    async def achat(self, prompt: str, deadline: Optional[float] = None) -> str:
+        # DeepSeek 等 API 型生成器提供原生异步接口；
+        # 本地模型推理是阻塞的 CPU/GPU 计算，放到线程池中执行
+        # deadline：请求截止时间（time.monotonic() 绝对值），API 型生成器据此缩短单次请求超时
+        if hasattr(self.generator, "achat"):
+            return await self.generator.achat(prompt, deadline=deadline)
+        return await asyncio.to_thread(self.generator.chat, prompt)
+
+    async def astream(self, prompt: str, deadline: Optional[float] = None) -> AsyncIterator[str]:
+        # 支持流式的生成器逐段产出；其余生成器一次性产出完整回复
+        if hasattr(self.generator, "astream"):
+            with span("llm", stream=True):
+                async for delta in self.generator.astream(prompt, deadline=deadline):
+                    yield delta
+            return
+        yield await self.achat(prompt, deadline=deadline)
+
 
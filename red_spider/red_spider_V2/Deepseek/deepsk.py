@@ -1,7 +1,16 @@
 import os
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
 
-from openai import OpenAI
+from openai import APITimeoutError, AsyncOpenAI, OpenAI
+
+# 单次请求超时与 backend 共用 red_spider_base/request_deadline 中的实现
+# （调用方需先把 red_spider_base 加入 sys.path，见 chat_gpt.py）
+from request_deadline import attempt_timeout, raise_if_deadline_limited
+
+SYSTEM_PROMPT = "你是一个非常专业且贴心的中文医疗问答助手，需要结合医学常识和生活建议，给出温和、易懂的回答。"
+
+# 单次请求超时（秒），与 backend 的 DEEPSEEK_TIMEOUT 一致
+DEFAULT_TIMEOUT = float(os.getenv("DEEPSEEK_TIMEOUT", "15"))
 
 
 class DS_RedSpider:
@@ -17,6 +26,8 @@ class DS_RedSpider:
         api_key: Optional[str] = None,
         base_url: str = "https://api.deepseek.com",
         model: str = "deepseek-chat",
+        client=None,
+        timeout: float = DEFAULT_TIMEOUT,
     ) -> None:
         """
         参数
@@ -29,9 +40,15 @@ class DS_RedSpider:
             DeepSeek 的 API Base URL，默认为 "https://api.deepseek.com"。
         model : str
             使用的 DeepSeek 模型名称，默认 "deepseek-chat"。
+        client : 可选
+            外部注入的共享异步客户端（需提供 `async chat(prompt, system_prompt=...)`，
+            例如 backend 的 AsyncDeepSeekClient）。传入后 achat 经由该客户端调用，
+            复用其连接池、超时与重试策略，不再单独创建 AsyncOpenAI。
+        timeout : float
+            自建客户端的单次请求超时（秒），默认读取环境变量 DEEPSEEK_TIMEOUT（15 秒）。
         """
-        # 优先使用传入的 api_key，否则从环境变量读取
-        api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
+        # 优先使用传入的 api_key，其次是共享客户端的 api_key，最后从环境变量读取
+        api_key = api_key or getattr(client, "api_key", None) or os.getenv("DEEPSEEK_API_KEY")
         if not api_key:
             raise ValueError(
                 "未提供 DeepSeek API Key。\n"
@@ -39,11 +56,31 @@ class DS_RedSpider:
                 "或在环境变量中设置 DEEPSEEK_API_KEY。"
             )
 
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
-        self.model = model
+        self.timeout = timeout
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
+        # 异步客户端：供 FastAPI 等异步调用方使用；有共享客户端时直接复用
+        self.shared_client = client
+        self.async_client = (
+            None
+            if client is not None
+            else AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
+        )
+        self.model = getattr(client, "model", None) or model
 
         print(f"已初始化 DeepSeek 客户端，使用模型：{self.model}")
 
+    def build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            },
+        ]
+
     def chat(self, prompt: str) -> str:
         """
         调用 DeepSeek 生成回复。
@@ -55,25 +92,79 @@ class DS_RedSpider:
             response = self.client.chat.completions.create(
                 model=self.model,
                 # 如需使用推理增强模型，可切换为 "deepseek-reasoner"
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一个非常专业且贴心的中文医疗问答助手，需要结合医学常识和生活建议，给出温和、易懂的回答。",
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    },
-                ],
+                messages=self.build_messages(prompt),
                 stream=False,
             )
         except Exception as e:
             return f"调用 DeepSeek 接口失败：{e}"
 
+        return self._extract_content(response)
+
+    async def achat(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """
+        chat 的异步版本，等待 DeepSeek 响应期间不阻塞事件循环。
+        deadline 为请求截止时间（time.monotonic() 绝对值），单次请求超时不会超过剩余时间。
+        """
+        if not prompt:
+            return ""
+
+        if self.shared_client is not None:
+            return await self.shared_client.chat(
+                prompt, system_prompt=SYSTEM_PROMPT, deadline=deadline
+            )
+
+        limit = attempt_timeout(self.timeout, deadline)
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self.build_messages(prompt),
+                stream=False,
+                timeout=limit,
+            )
+        except APITimeoutError as e:
+            # 因请求截止时间缩短导致的超时抛出 DeadlineExceeded，由调用方按超时处理
+            raise_if_deadline_limited(self.timeout, limit, deadline, e)
+            return f"调用 DeepSeek 接口失败：{e}"
+        except Exception as e:
+            return f"调用 DeepSeek 接口失败：{e}"
+
+        return self._extract_content(response)
+
+    async def astream(self, prompt: str, deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        以流式方式（stream=True）调用 DeepSeek，逐段产出生成的文本。
+        """
+        if not prompt:
+            return
+
+        if self.shared_client is not None:
+            async for delta in self.shared_client.stream(
+                prompt, system_prompt=SYSTEM_PROMPT, deadline=deadline
+            ):
+                yield delta
+            return
+
+        limit = attempt_timeout(self.timeout, deadline)
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self.build_messages(prompt),
+                stream=True,
+                timeout=limit,
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except APITimeoutError as e:
+            raise_if_deadline_limited(self.timeout, limit, deadline, e)
+            yield f"调用 DeepSeek 接口失败：{e}"
+        except Exception as e:
+            yield f"调用 DeepSeek 接口失败：{e}"
+
+    @staticmethod
+    def _extract_content(response) -> str:
         # 兼容 OpenAI 风格返回
         try:
             return response.choices[0].message.content
         except Exception:
             return str(response)
-
-
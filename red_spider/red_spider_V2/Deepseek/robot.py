@@ -1,7 +1,9 @@
+import asyncio
 import os
 import sys
 import time
-from typing import Optional
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
 
 from chat_gpt import ChatGPT
 
@@ -36,8 +38,26 @@ if os.path.isdir(BASE_DIR) and BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
 from question_classifier import QuestionClassifier
-from question_parser import QuestionPaser
+from question_parser import QUESTION_TYPE_RELS, QuestionPaser
 from answer_search import AnswerSearcher
+from answer_cache import AnswerCache
+from config import ANSWER_CACHE_STALE_TIMEOUT, SPECULATIVE_LLM
+from request_deadline import (
+    DEADLINE_MESSAGE,
+    TRUNCATED_NOTE,
+    DeadlineExceeded,
+    aiter_with_deadline,
+    get_deadline,
+    run_with_deadline,
+)
+
+T = TypeVar("T")
+
+# 降级答案：LLM 不可用（熔断 / 出错）时，用知识图谱中与问句疾病相关的信息兜底
+DEGRADED_PREFIX = "（AI 生成服务暂时不可用，以下为知识图谱中的相关信息，仅供参考）"
+DEGRADED_MESSAGE = "抱歉，AI 医疗助手当前繁忙，请稍后重试。如症状严重，请及时就医。"
+# 超时答案：请求时间预算用完时，用缓存中问句疾病的图谱信息兜底
+DEADLINE_PREFIX = "（回答超时，以下为知识图谱中的相关信息，仅供参考）"
 
 
 class Red_Spider:
@@ -45,9 +65,24 @@ class Red_Spider:
     红蜘蛛 V2 综合问答机器人（使用 DeepSeek 大模型 API）：
     - 首选使用规则+知识图谱（分类 → 解析 → Neo4j 检索）
     - 如果任一阶段失败，则回退到生成式模型（DeepSeek）
+    - 图谱答案按分类结果缓存（AnswerCache），相同意图的问句跳过解析与 Neo4j 查询
+    - 异步路径下 LLM 不可用时，用问句中疾病的图谱信息给出降级答案
+    - 异步路径受请求时间预算（request_deadline）约束，超时时返回已有的最佳答案
+    - 可选的推测执行（speculative）：分类置信度低时图谱查询与 LLM 调用并行
+    - 可选的观察者（observer）：上报各阶段耗时与答案来源，供外部统计指标
     """
 
-    def __init__(self, flag: str = "deepseek", model_path: Optional[str] = None):
+    def __init__(
+        self,
+        flag: str = "deepseek",
+        model_path: Optional[str] = None,
+        llm_client=None,
+        neo4j_driver=None,
+        neo4j_async_driver=None,
+        graph_breaker=None,
+        speculative: Optional[bool] = None,
+        observer=None,
+    ):
         # 1: 问题分类器
         print("初始化 QuestionClassifier ......")
         self.classifier = QuestionClassifier()
@@ -58,13 +93,35 @@ class Red_Spider:
 
         # 3: 答案搜索器
         print("初始化 AnswerSearcher ......")
-        self.searcher = AnswerSearcher()
+        # neo4j_driver / neo4j_async_driver 为外部共享的驱动（如 backend 统一管理的连接池）
+        # graph_breaker 为外部的 Neo4j 断路器，打开时图谱查询快速失败
+        self.searcher = AnswerSearcher(
+            driver=neo4j_driver,
+            async_driver=neo4j_async_driver,
+            breaker=graph_breaker,
+        )
+        self.answer_cache = AnswerCache()
 
         # 4: 生成回复模块（LLM，使用 DeepSeek）
         print("初始化 ChatGPT (生成式模块, DeepSeek) ......")
         # Deepseek/chat_gpt.py 中的 ChatGPT 期望 flag='deepseek'
-        # api_key 默认从环境变量 DEEPSEEK_API_KEY 读取
-        self.generator = ChatGPT(flag=flag, model_path=model_path or "./pretrain_model")
+        # api_key 默认从环境变量 DEEPSEEK_API_KEY 读取；
+        # llm_client 为外部共享的异步客户端（如 backend 的 AsyncDeepSeekClient）
+        self.generator = ChatGPT(
+            flag=flag,
+            model_path=model_path or "./pretrain_model",
+            client=llm_client,
+        )
+
+        # 5: 推测执行开关（默认读取环境变量 SPECULATIVE_LLM）及计数：
+        # started 发起次数 / used 采用 LLM 结果次数 / cancelled 因图谱有答案而取消次数
+        self.speculative = SPECULATIVE_LLM if speculative is None else speculative
+        self.speculation_stats = {"started": 0, "used": 0, "cancelled": 0}
+
+        # 6: 观察者（如 backend 的指标采集），需提供：
+        # - observe(stage, seconds)：阶段耗时，stage 为 classify / parser_main / search_main / llm
+        # - increment(event)：答案来源，event 为 kg / deepseek / degraded / deadline
+        self.observer = observer
 
         # 开幕词
         self.answer = "您好, 我是红蜘蛛AI助理（DeepSeek 版）, 希望可以帮到您, 祝您身体安康, 快乐常伴~"
@@ -76,27 +133,434 @@ class Red_Spider:
         1) 使用规则+知识图谱查询
         2) 任一阶段失败则回退到生成式模型（DeepSeek）
         """
+        return self.chat_detail(sentence)[0]
+
+    def chat_detail(self, sentence: str) -> Tuple[str, str]:
+        """
+        与 chat_main 相同，额外返回答案来源："kg"（知识图谱）/ "deepseek"（生成式模型）。
+        """
         # 1: 首先进行问题分类
-        res_classify = self.classifier.classify(sentence)
+        res_classify = self._classify(sentence)
 
         # 如果无法分类到症状、食品、药品等相关问题上，则进入 LLM 生成
         if not res_classify:
-            return self.generator.chat(sentence)
+            return self._chat_llm(sentence)
+
+        # 2 + 3: 解析成 neo4j 查询语句并查询图谱（优先命中答案缓存）
+        # 解析失败（没有有效 Cypher）或查询不到答案时, 返回生成式模型的回复
+        final_answers = self.search_kg(res_classify)
+        if not final_answers:
+            return self._chat_llm(sentence)
+        self._notify("kg")
+        return "\n".join(final_answers), "kg"
 
-        # 2: 对分类后的问题进行解析, 组装成 neo4j 查询语句
-        res_sql = self.parser.parser_main(res_classify)
+    def _chat_llm(self, sentence: str) -> Tuple[str, str]:
+        with self._timed("llm"):
+            answer = self.generator.chat(sentence)
+        self._notify("deepseek")
+        return answer, "deepseek"
 
-        # 解析失败（没有有效 Cypher），同样进入生成模型回复逻辑
+    # ---- 观察者钩子 ----
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        # 记录 with 块耗时；被取消的调用（如推测执行被取消）不计入
+        if self.observer is None:
+            yield
+            return
+        start = time.perf_counter()
+        cancelled = False
+        try:
+            yield
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                self.observer.observe(stage, time.perf_counter() - start)
+
+    async def _atimed(self, stage: str, aw: Awaitable[T]) -> T:
+        with self._timed(stage):
+            return await aw
+
+    def _notify(self, event: str) -> None:
+        if self.observer is not None:
+            self.observer.increment(event)
+
+    def _classify(self, sentence: str) -> Dict[str, Any]:
+        with self._timed("classify"):
+            return self.classifier.classify(sentence)
+
+    def _parse(self, res_classify: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._timed("parser_main"):
+            return self.parser.parser_main(res_classify)
+
+    def _allm(self, sentence: str) -> Awaitable[str]:
+        return self._atimed("llm", self.generator.achat(sentence, deadline=get_deadline()))
+
+    def search_kg(self, res_classify: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        根据分类结果查询知识图谱答案，带缓存。
+
+        返回 None 表示解析不出有效查询；返回列表（可能为空）为图谱答案。
+        缓存过期时重新查询，若 Neo4j 不可用则返回过期答案兜底。
+        """
+        key = self.answer_cache.make_key(res_classify)
+        cached, fresh = self.answer_cache.get(key)
+        if fresh:
+            return cached
+
+        res_sql = self._parse(res_classify)
         if not res_sql:
-            return self.generator.chat(sentence)
+            return None
 
-        # 3: 利用查询语句, 调用答案搜索器查询 neo4j, 得到最终答案
-        final_answers = self.searcher.search_main(res_sql)
+        try:
+            with self._timed("search_main"):
+                final_answers = self.searcher.search_main(res_sql)
+        except Exception:
+            if cached is None:
+                raise
+            self.answer_cache.record_stale_hit()
+            return cached
 
-        # 无法查询到相关答案时, 则返回生成式模型的回复, 否则将若干答案分行返回
-        if not final_answers:
-            return self.generator.chat(sentence)
-        return "\n".join(final_answers)
+        self.answer_cache.set(key, final_answers)
+        return final_answers
+
+    async def asearch_kg(self, res_classify: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        search_kg 的异步版本（stale-while-revalidate）：
+        缓存过期时发起重新查询，若在 ANSWER_CACHE_STALE_TIMEOUT 内未返回或查询失败，
+        先返回过期答案，重新查询在后台继续并在完成后刷新缓存。
+        """
+        key = self.answer_cache.make_key(res_classify)
+        cached, fresh = self.answer_cache.get(key)
+        if fresh:
+            return cached
+
+        res_sql = self._parse(res_classify)
+        if not res_sql:
+            return None
+
+        refresh = asyncio.ensure_future(self._arefresh_kg(key, res_sql))
+        if cached is None:
+            return await refresh
+
+        # 后台刷新失败时取出异常，避免 "Task exception was never retrieved" 警告
+        refresh.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            return await asyncio.wait_for(asyncio.shield(refresh), ANSWER_CACHE_STALE_TIMEOUT)
+        except Exception:
+            self.answer_cache.record_stale_hit()
+            return cached
+
+    async def _arefresh_kg(self, key: Tuple, res_sql: List[Dict[str, Any]]) -> List[str]:
+        final_answers = await self._atimed("search_main", self.searcher.asearch_main(res_sql))
+        self.answer_cache.set(key, final_answers)
+        return final_answers
+
+    async def achat_main(self, sentence: str) -> str:
+        """
+        chat_main 的异步版本，流程见 achat_detail。
+        """
+        answer, _ = await self.achat_detail(sentence)
+        return answer
+
+    async def achat_detail(self, sentence: str) -> Tuple[str, str]:
+        """
+        chat_detail 的异步版本，流程与 chat_main 完全一致，返回 (答案, 来源)：
+        来源为 "kg" / "deepseek"，以及降级或超时且没有图谱答案时的 "system"。
+        分类与解析是纯 CPU 的轻量计算，直接执行；
+        Neo4j 查询与 LLM 调用均为异步 I/O，不会阻塞事件循环。
+        设置了请求截止时间时，任一阶段超时即返回缓存中的图谱答案（含过期答案）或超时提示。
+
+        开启推测执行且分类置信度低（见 is_weak_classification）时，LLM 调用与图谱查询同时发起，
+        图谱返回非空答案即取消 LLM 调用；否则直接等待已在进行中的 LLM 调用，
+        最坏耗时由“图谱 + LLM”降为两者中的较大值。
+        """
+        res_classify = self._classify(sentence)
+
+        speculative = None
+        if self.speculative and self.is_weak_classification(res_classify):
+            speculative = asyncio.ensure_future(self._allm(sentence))
+            # 被取消或未被采用时取出异常，避免 "Task exception was never retrieved" 警告
+            speculative.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.speculation_stats["started"] += 1
+
+        try:
+            return await self._achat_main(sentence, res_classify, speculative)
+        finally:
+            if speculative is not None and not speculative.done():
+                speculative.cancel()
+                self.speculation_stats["cancelled"] += 1
+
+    async def _achat_main(
+        self,
+        sentence: str,
+        res_classify: Dict[str, Any],
+        speculative: Optional["asyncio.Future[str]"] = None,
+    ) -> Tuple[str, str]:
+        if res_classify:
+            try:
+                final_answers = await run_with_deadline(self.asearch_kg(res_classify))
+            except DeadlineExceeded:
+                self._notify("deadline")
+                return self._with_source(self.deadline_answer(res_classify))
+            except Exception as exc:
+                # 图谱不可用时与解析失败一样，交给 LLM
+                print("知识图谱查询失败，回退到生成式模型：", exc)
+                final_answers = None
+            if final_answers:
+                self._notify("kg")
+                return "\n".join(final_answers), "kg"
+
+        if speculative is not None:
+            self.speculation_stats["used"] += 1
+            llm_call = speculative
+        else:
+            llm_call = self._allm(sentence)
+        try:
+            answer = await run_with_deadline(llm_call)
+        except DeadlineExceeded:
+            self._notify("deadline")
+            return self._with_source(self.deadline_answer(res_classify))
+        except Exception as exc:
+            print("生成式模型不可用，返回降级答案：", exc)
+            self._notify("degraded")
+            return self._with_source(await self.adegraded_answer(res_classify))
+        self._notify("deepseek")
+        return answer, "deepseek"
+
+    @staticmethod
+    def _with_source(result: Tuple[str, bool]) -> Tuple[str, str]:
+        # 降级 / 超时答案：(答案, 是否来自图谱) -> (答案, 来源)
+        answer, from_kg = result
+        return answer, ("kg" if from_kg else "system")
+
+    @staticmethod
+    def is_weak_classification(res_classify: Dict[str, Any]) -> bool:
+        """
+        分类置信度低：识别出了实体，但问句中没有任何疑问词。
+        此时问题类型只是按实体类型推断（如症状实体默认查疾病症状），图谱答案常常为空。
+        """
+        if not res_classify:
+            return False
+        spans = res_classify.get("spans", [])
+        return not any(span.get("kind") == "intent" for span in spans)
+
+    @staticmethod
+    def _neighbourhood(res_classify: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # 问句中疾病的全部关系（症状 / 饮食 / 药品）对应的分类结果
+        args = (res_classify or {}).get("args", {})
+        diseases = {word: ["disease"] for word, types in args.items() if "disease" in types}
+        if not diseases:
+            return None
+        return {"args": diseases, "question_types": list(QUESTION_TYPE_RELS)}
+
+    async def adegraded_answer(self, res_classify: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        LLM 不可用时的降级答案：查询问句中疾病在图谱中的全部关系（症状 / 饮食 / 药品），
+        优先使用答案缓存（含过期答案）。返回 (答案, 是否来自图谱)。
+        """
+        neighbourhood = self._neighbourhood(res_classify)
+        if neighbourhood:
+            try:
+                final_answers = await run_with_deadline(self.asearch_kg(neighbourhood))
+            except DeadlineExceeded:
+                return self.deadline_answer(res_classify)
+            except Exception:
+                final_answers = None
+            if final_answers:
+                return DEGRADED_PREFIX + "\n" + "\n".join(final_answers), True
+        return DEGRADED_MESSAGE, False
+
+    def deadline_answer(self, res_classify: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        请求时间预算用完时的答案：不再发起任何查询，只从答案缓存（含过期答案）中
+        取问句本身或其疾病关系的图谱答案。返回 (答案, 是否来自图谱)。
+        """
+        candidates = (
+            (res_classify, ""),
+            (self._neighbourhood(res_classify), DEADLINE_PREFIX + "\n"),
+        )
+        for candidate, prefix in candidates:
+            if not candidate:
+                continue
+            cached, fresh = self.answer_cache.get(self.answer_cache.make_key(candidate))
+            if cached:
+                if not fresh:
+                    self.answer_cache.record_stale_hit()
+                return prefix + "\n".join(cached), True
+        return DEADLINE_MESSAGE, False
+
+    async def astream_main(self, sentence: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        流式单轮对话，产出 (类型, 文本) 二元组：
+        - ("section", 文本)：知识图谱答案，每个 question_type 的查询一返回就产出
+        - ("token", 文本)：回退到 LLM 时，DeepSeek 流式生成的文本片段
+        请求时间预算用完时：已推送部分内容则追加截断提示后结束，否则给出超时答案。
+        """
+        res_classify = self._classify(sentence)
+        if res_classify:
+            key = self.answer_cache.make_key(res_classify)
+            cached, fresh = self.answer_cache.get(key)
+            res_sql = None if fresh else self._parse(res_classify)
+
+            final_answers: List[str] = []
+            if fresh:
+                final_answers = cached
+                for final_answer in final_answers:
+                    yield "section", final_answer
+            elif res_sql:
+                try:
+                    with self._timed("search_main"):
+                        async for final_answer in aiter_with_deadline(
+                            self.searcher.asearch_iter(res_sql)
+                        ):
+                            final_answers.append(final_answer)
+                            yield "section", final_answer
+                except DeadlineExceeded:
+                    self._notify("deadline")
+                    if not final_answers:
+                        answer, from_kg = self.deadline_answer(res_classify)
+                        yield ("section" if from_kg else "token"), answer
+                    return
+                except Exception:
+                    # 尚未推送任何内容时：持有过期答案则用过期答案兜底，否则交给 LLM
+                    if final_answers:
+                        raise
+                    if cached is not None:
+                        self.answer_cache.record_stale_hit()
+                        final_answers = cached
+                    for final_answer in final_answers:
+                        yield "section", final_answer
+                else:
+                    self.answer_cache.set(key, final_answers)
+
+            if final_answers:
+                self._notify("kg")
+                return
+
+        emitted = False
+        try:
+            with self._timed("llm"):
+                async for delta in aiter_with_deadline(
+                    self.generator.astream(sentence, deadline=get_deadline())
+                ):
+                    emitted = True
+                    yield "token", delta
+        except DeadlineExceeded:
+            self._notify("deadline")
+            if emitted:
+                yield "token", TRUNCATED_NOTE
+                return
+            answer, from_kg = self.deadline_answer(res_classify)
+            yield ("section" if from_kg else "token"), answer
+        except Exception:
+            if emitted:
+                raise
+            # 尚未推送任何内容时（如熔断），以降级答案代替
+            self._notify("degraded")
+            answer, from_kg = await self.adegraded_answer(res_classify)
+            yield ("section" if from_kg else "token"), answer
+        else:
+            self._notify("deepseek")
+
+    async def abatch_main(
+        self, sentences: List[str], concurrency: int = 8
+    ) -> AsyncIterator[Tuple[str, Optional[str], str, Optional[BaseException]]]:
+        """
+        批量问答，按完成顺序产出 (问句, 答案, 来源, 异常)，来源为 "kg" / "deepseek" / "system"：
+        1) 相同问句只回答一次，先全部分类，命中缓存的直接产出
+        2) 其余可由图谱回答的问句合并成一条查询，一次查完再按问句拆分
+        3) 剩下的问句交给 LLM，最多 concurrency 个并发
+        图谱查询失败时，有过期缓存的问句用过期答案兜底，其余改由 LLM 回答。
+        请求时间预算用完时，尚未回答的问句给出超时答案（见 deadline_answer）。
+        """
+        llm_sentences: List[str] = []
+        pending: Dict[str, Tuple[Tuple, List[Dict[str, Any]], Optional[List[str]]]] = {}
+
+        for sentence in dict.fromkeys(sentences):
+            res_classify = self._classify(sentence)
+            if not res_classify:
+                llm_sentences.append(sentence)
+                continue
+
+            key = self.answer_cache.make_key(res_classify)
+            cached, fresh = self.answer_cache.get(key)
+            res_sql = None if fresh else self._parse(res_classify)
+            if fresh and cached:
+                self._notify("kg")
+                yield sentence, "\n".join(cached), "kg", None
+            elif res_sql:
+                pending[sentence] = (key, res_sql, cached)
+            else:
+                llm_sentences.append(sentence)
+
+        if pending:
+            merged = self.parser.merge_sqls([res_sql for _, res_sql, _ in pending.values()])
+            try:
+                rows: Optional[List[List[Any]]] = await run_with_deadline(
+                    self._atimed("search_main", self.searcher.afetch_rows(merged))
+                )
+            except Exception:
+                rows = None
+
+            for sentence, (key, res_sql, cached) in pending.items():
+                if rows is None:
+                    final_answers = cached
+                    if cached is not None:
+                        self.answer_cache.record_stale_hit()
+                else:
+                    final_answers = [
+                        answer
+                        for sql_ in res_sql
+                        for answer in self.searcher.answers_from_rows(sql_, rows)
+                    ]
+                    self.answer_cache.set(key, final_answers)
+
+                if final_answers:
+                    self._notify("kg")
+                    yield sentence, "\n".join(final_answers), "kg", None
+                else:
+                    llm_sentences.append(sentence)
+
+        if not llm_sentences:
+            return
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def generate(sentence: str):
+            async with semaphore:
+                try:
+                    answer = await run_with_deadline(self._allm(sentence))
+                    self._notify("deepseek")
+                    return sentence, answer, "deepseek", None
+                except DeadlineExceeded:
+                    self._notify("deadline")
+                    answer, from_kg = self.deadline_answer(self._classify(sentence))
+                    return sentence, answer, ("kg" if from_kg else "system"), None
+                except Exception as exc:
+                    print("生成式模型不可用，返回降级答案：", exc)
+                    self._notify("degraded")
+                try:
+                    answer, from_kg = await self.adegraded_answer(
+                        self._classify(sentence)
+                    )
+                except Exception as exc:
+                    return sentence, None, "deepseek", exc
+                return sentence, answer, ("kg" if from_kg else "system"), None
+
+        tasks = [asyncio.ensure_future(generate(sentence)) for sentence in llm_sentences]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 调用方提前退出（如客户端断开）时取消尚未完成的 LLM 请求
+            for task in tasks:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        """释放异步资源（Neo4j AsyncDriver 等）。"""
+        await self.searcher.aclose()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import (
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_STALE_TTL,
+    ANSWER_CACHE_TTL,
+)
+
+
+# 知识图谱答案缓存：LRU 淘汰 + TTL 过期 + 过期答案兜底（stale-while-revalidate）
+class AnswerCache:
+    """
+    缓存 AnswerSearcher.search_main 的结果。
+
+    图谱查询结果只取决于（实体, 问题类型），图谱只有在重建时才会变化，
+    因此以规范化后的分类结果 res_classify 作为键：
+    “感冒的症状” 和 “感冒有什么症状” 分类结果相同，共享同一条缓存。
+
+    - 新鲜期（ttl）内直接命中，跳过问句解析与 Neo4j 查询
+    - 过了新鲜期但未超过最长保留时间（stale_ttl）的条目仍然保留，
+      重新查询失败或过慢时可作为兜底答案返回
+    """
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        stale_ttl: float = ANSWER_CACHE_STALE_TTL,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._data: "OrderedDict[Tuple, Tuple[List[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    # 规范化分类结果：实体及其类型、问题类型均排序，与问句措辞、词序无关
+    @staticmethod
+    def make_key(res_classify: Dict[str, Any]) -> Tuple:
+        args = res_classify.get("args", {})
+        entities = tuple(sorted((word, tuple(sorted(types))) for word, types in args.items()))
+        question_types = tuple(sorted(res_classify.get("question_types", [])))
+        return entities, question_types
+
+    # 查询缓存，返回 (答案列表, 是否新鲜)；未命中返回 (None, False)
+    def get(self, key: Tuple) -> Tuple[Optional[List[str]], bool]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None, False
+
+            answers, stored_at = item
+            age = now - stored_at
+            if age > self.stale_ttl:
+                del self._data[key]
+                self.misses += 1
+                return None, False
+
+            self._data.move_to_end(key)
+            if age > self.ttl:
+                self.misses += 1
+                return answers, False
+
+            self.hits += 1
+            return answers, True
+
+    def set(self, key: Tuple, answers: List[str]) -> None:
+        with self._lock:
+            self._data[key] = (list(answers), time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    # 记录一次“返回了过期答案”的兜底命中
+    def record_stale_hit(self) -> None:
+        with self._lock:
+            self.stale_hits += 1
+
+    # 删除涉及指定实体的条目（图谱增量更新后按疾病失效），返回删除的条目数
+    def invalidate_entities(self, names: Iterable[str]) -> int:
+        names = set(names)
+        if not names:
+            return 0
+        with self._lock:
+            stale = [
+                key for key in self._data
+                if any(word in names for word, _types in key[0])
+            ]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,28 +1,68 @@
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase, Query
 
-from config import NEO4J_CONFIG
+from config import GRAPH_BACKEND, NEO4J_CONFIG
+from graph_mirror import GraphMirror
+from graph_sqlite import SqliteGraph
+from question_parser import QUESTION_TYPE_RELS
+from request_deadline import DeadlineExceeded, expired, timeout_for
+from tracing import span, traced
+
+# 各问题类型的回复模板
+ANSWER_TEMPLATES: Dict[str, str] = {
+    # 查询疾病有哪些症状
+    "disease_symptom": "{}的症状包括: {}",
+    # 查询疾病建议吃的东西
+    "disease_food": "{}推荐饮食/食谱包括: {}",
+    # 查询疾病常用药品
+    "disease_drug": "{}常用/推荐药品包括: {}",
+}
 
 
 # 答案搜索的主类
 class AnswerSearcher:
-    def __init__(self) -> None:
+    def __init__(self, driver=None, async_driver=None, breaker=None) -> None:
         # 单个回答中最多展示的条目数
         self.num_limit = 10
-        # 复用和其他模块相同的 Neo4j 配置
-        self.driver = GraphDatabase.driver(**NEO4J_CONFIG)
+        # 可注入外部管理的驱动（如 backend 的共享连接池），注入的驱动由调用方负责关闭；
+        # 未注入时沿用原有行为，按 NEO4J_CONFIG 自建
+        self._owns_async_driver = async_driver is None
+        self.driver = driver if driver is not None else GraphDatabase.driver(**NEO4J_CONFIG)
+        # 异步驱动（未注入时懒加载），供 FastAPI 等异步调用方使用，避免阻塞事件循环
+        self._async_driver = async_driver
+        # 可选的断路器（需提供 check / record_success / record_failure），
+        # 打开时 Neo4j 查询直接抛出异常而不等待连接超时；内存镜像查询不受影响
+        self.breaker = breaker
+
+        # 可选的本地图谱，已加载时查询不经过 Neo4j：
+        # - GRAPH_BACKEND=mirror：内存镜像，后台加载，加载完成前回退到 Neo4j
+        # - GRAPH_BACKEND=sqlite：嵌入式 SQLite 图谱，文件不存在时回退到 Neo4j
+        self.mirror: Optional[GraphMirror] = None
+        self.sqlite_graph: Optional[SqliteGraph] = None
+        if GRAPH_BACKEND == "mirror":
+            self.mirror = GraphMirror(self.driver)
+            self.mirror.start()
+        elif GRAPH_BACKEND == "sqlite":
+            self.sqlite_graph = SqliteGraph()
+
+    @property
+    def async_driver(self):
+        if self._async_driver is None:
+            self._async_driver = AsyncGraphDatabase.driver(**NEO4J_CONFIG)
+        return self._async_driver
 
     # 执行 cypher 查询，并返回相应结果
+    @traced("search_main")
     def search_main(self, sqls: List[Dict[str, Any]]) -> List[str]:
         """
-        sqls 示例：
+        sqls 示例（由 QuestionPaser.parser_main 生成，一次请求一条参数化查询）：
         [
             {
-                "question_type": "disease_symptom",
-                "sql": ["MATCH ... RETURN m.name, r.name, n.name", ...]
-            },
-            ...
+                "question_types": ["disease_symptom", "disease_drug"],
+                "sql": "UNWIND $diseases AS name MATCH ... RETURN m.name, type(r), collect(n.name)",
+                "params": {"diseases": ["感冒"], "rel_types": ["has_symptom", "recommand_drug"]}
+            }
         ]
         """
         final_answers: List[str] = []
@@ -30,70 +70,133 @@ class AnswerSearcher:
         if not sqls:
             return final_answers
 
-        with self.driver.session() as session:
-            for sql_ in sqls:
-                question_type = sql_.get("question_type")
-                queries = sql_.get("sql", [])
-                if not queries:
-                    continue
+        for sql_ in sqls:
+            if not sql_.get("sql"):
+                continue
+            rows = self._local_rows(sql_)
+            if rows is None:
+                self._before_query()
+                try:
+                    with self.driver.session() as session:
+                        # values() 直接返回 [疾病, 关系类型, 目标名称列表]，不再逐行构造字典
+                        rows = session.run(self._query(sql_), sql_.get("params", {})).values()
+                except Exception as exc:
+                    self._after_query(False, exc)
+                    raise
+                self._after_query(True)
+            final_answers += self.answers_from_rows(sql_, rows)
 
-                answers: List[Dict[str, Any]] = []
+        return final_answers
 
-                # 遍历所有的查询 cypher，依次执行，并将结果逐个添加进列表中
-                for query in queries:
-                    ress = session.run(query).data()
-                    answers += ress
+    # search_main 的异步版本：使用 AsyncDriver 执行查询，不阻塞事件循环
+    async def asearch_main(self, sqls: List[Dict[str, Any]]) -> List[str]:
+        return [answer async for answer in self.asearch_iter(sqls)]
 
-                # 调用精准回复模板
-                final_answer = self.answer_prettify(question_type, answers)
-                if final_answer:
-                    final_answers.append(final_answer)
+    # 逐个 question_type 产出答案，便于流式推送
+    async def asearch_iter(self, sqls: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        if not sqls:
+            return
+
+        for sql_ in sqls:
+            if not sql_.get("sql"):
+                continue
+            rows = await self.afetch_rows(sql_)
+            for final_answer in self.answers_from_rows(sql_, rows):
+                yield final_answer
+
+    # 执行单条查询，返回 [疾病, 关系类型, 目标名称列表] 行（内存镜像优先）
+    async def afetch_rows(self, sql_: Dict[str, Any]) -> List[List[Any]]:
+        with span("search_main") as record:
+            rows = self._local_rows(sql_)
+            backend = GRAPH_BACKEND
+            if rows is None:
+                backend = "neo4j"
+                self._before_query()
+                try:
+                    async with self.async_driver.session() as session:
+                        result = await session.run(self._query(sql_), sql_.get("params", {}))
+                        rows = await result.values()
+                except Exception as exc:
+                    self._after_query(False, exc)
+                    raise
+                self._after_query(True)
+            if record is not None:
+                record["attrs"].update(backend=backend, rows=len(rows))
+        return rows
+
+    # 事务超时取请求剩余时间预算（见 request_deadline），由 Neo4j 服务端终止超时的查询
+    @staticmethod
+    def _query(sql_: Dict[str, Any]) -> Query:
+        return Query(sql_["sql"], timeout=timeout_for())
+
+    def _before_query(self) -> None:
+        # 预算已用完时不再发起查询（timeout=0 在 Neo4j 中表示不限时）
+        if expired():
+            raise DeadlineExceeded()
+        if self.breaker is not None:
+            self.breaker.check()
+
+    def _after_query(self, ok: bool, exc: Optional[BaseException] = None) -> None:
+        # 因请求预算用完而超时的查询不说明数据库不可用，不计入熔断
+        if exc is not None and expired():
+            raise DeadlineExceeded() from exc
+        if self.breaker is not None:
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    # 本地图谱（内存镜像 / SQLite）已加载时直接在进程内查询，返回与 Neo4j 相同结构的行；否则返回 None
+    def _local_rows(self, sql_: Dict[str, Any]) -> Optional[List[List[Any]]]:
+        local = self.mirror if self.mirror is not None else self.sqlite_graph
+        if local is None or not local.loaded:
+            return None
+        params = sql_.get("params", {})
+        return local.lookup(params.get("diseases", []), params.get("rel_types", []))
+
+    # 关闭自建的异步驱动（同步驱动沿用原有行为，由进程退出时回收；注入的驱动不在此关闭）
+    async def aclose(self) -> None:
+        if self.mirror is not None:
+            self.mirror.stop()
+        if self.sqlite_graph is not None:
+            self.sqlite_graph.close()
+        if self._owns_async_driver and self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+
+    # 将分组查询结果按 question_type 拆开，逐类调用回复模板
+    def answers_from_rows(self, sql_: Dict[str, Any], rows: List[List[Any]]) -> List[str]:
+        # {关系类型: {疾病: [目标名称, ...]}}
+        grouped: Dict[str, Dict[str, List[str]]] = {}
+        for disease, rel_type, names in rows:
+            grouped.setdefault(rel_type, {})[disease] = names
+
+        # 按问句中疾病出现的顺序输出
+        diseases = sql_.get("params", {}).get("diseases", [])
 
+        final_answers: List[str] = []
+        for question_type in sql_.get("question_types", []):
+            by_disease = grouped.get(QUESTION_TYPE_RELS.get(question_type), {})
+            answers = [(d, by_disease[d]) for d in diseases if d in by_disease]
+            final_answer = self.answer_prettify(question_type, answers)
+            if final_answer:
+                final_answers.append(final_answer)
         return final_answers
 
     # 根据对应的 question_type，调用相应的回复模板
-    def answer_prettify(self, question_type: str, answers: List[Dict[str, Any]]) -> str:
-        if not answers:
+    # answers: [(疾病名称, [症状/食物/药品名称, ...]), ...]
+    def answer_prettify(self, question_type: str, answers: List[Tuple[str, List[str]]]) -> str:
+        template = ANSWER_TEMPLATES.get(question_type)
+        if not template or not answers:
             return ""
 
-        # 注意：这里依赖于 Cypher 中的 RETURN m.name, r.name, n.name
-        # Neo4j Python 驱动默认的键名为 'm.name' / 'r.name' / 'n.name'
-
-        # 查询疾病有哪些症状
-        if question_type == "disease_symptom":
-            desc = [i["n.name"] for i in answers if "n.name" in i]
-            if not desc:
-                return ""
-            subject = answers[0].get("m.name", "")
-            if not subject:
-                return ""
-            uniq_desc = list(set(desc))[: self.num_limit]
-            return "{}的症状包括: {}".format(subject, "；".join(uniq_desc))
-
-        # 查询疾病建议吃的东西
-        if question_type == "disease_food":
-            desc = [i["n.name"] for i in answers if "n.name" in i]
-            if not desc:
-                return ""
-            subject = answers[0].get("m.name", "")
-            if not subject:
-                return ""
-            uniq_desc = list(set(desc))[: self.num_limit]
-            return "{}推荐饮食/食谱包括: {}".format(subject, "；".join(uniq_desc))
-
-        # 查询疾病常用药品
-        if question_type == "disease_drug":
-            desc = [i["n.name"] for i in answers if "n.name" in i]
-            if not desc:
-                return ""
-            subject = answers[0].get("m.name", "")
-            if not subject:
-                return ""
-            uniq_desc = list(set(desc))[: self.num_limit]
-            return "{}常用/推荐药品包括: {}".format(subject, "；".join(uniq_desc))
-
-        # 其他类型暂未定义模板
-        return ""
+        lines: List[str] = []
+        for subject, desc in answers:
+            # 去重并保持顺序，最多展示 num_limit 条
+            uniq_desc = [d for d in dict.fromkeys(desc) if d][: self.num_limit]
+            if subject and uniq_desc:
+                lines.append(template.format(subject, "；".join(uniq_desc)))
+        return "\n".join(lines)
 
 
 if __name__ == "__main__":
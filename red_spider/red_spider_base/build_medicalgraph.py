@@ -1,10 +1,68 @@
+import argparse
+import hashlib
 import os
 import json
-from typing import List, Tuple, Set
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Set
 
 from neo4j import GraphDatabase
 
-from config import NEO4J_CONFIG
+from config import GRAPH_BUILD_BATCH_SIZE, NEO4J_CONFIG
+from medical_parser import RELATIONSHIPS, iter_records, parse_medical
+
+# 唯一约束（与 neo4j/cypher/create_schema.cql 一致）：MERGE / MATCH 按 name 走索引而不是标签扫描
+CONSTRAINTS: List[Tuple[str, str]] = [
+    ("disease_name_unique", "Disease"),
+    ("drug_name_unique", "Drug"),
+    ("food_name_unique", "Food"),
+    ("symptom_name_unique", "Symptom"),
+]
+
+# 导入修订号所在的节点：每次写入后递增，GraphMirror 据此发现“计数不变但内容变了”的更新
+REVISION_CYPHER = (
+    "MERGE (g:GraphMeta {name: 'medical'}) "
+    "SET g.revision = coalesce(g.revision, 0) + 1, g.updated_at = datetime()"
+)
+
+# 每个写入线程的待写批次上限：读文件快于写库时阻塞读取，内存占用与文件大小无关
+QUEUE_BATCHES = 4
+
+
+# 疾病记录的内容哈希：只覆盖写入图谱的字段，各字段去重排序后序列化，与列表顺序无关
+def record_hash(record: Dict[str, Any]) -> str:
+    content = {"name": record["name"]}
+    for _rel_type, _label, field, _rel_name in RELATIONSHIPS:
+        content[field] = sorted({name for name in record.get(field) or () if name})
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Progress:
+    """多个写入线程共用的进度：每隔 interval 秒打印已写入行数与速率。"""
+
+    def __init__(self, phase: str, interval: float = 2.0) -> None:
+        self.phase = phase
+        self.interval = interval
+        self.rows = 0
+        self.start = time.perf_counter()
+        self._last = self.start
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            self.rows += n
+            now = time.perf_counter()
+            if now - self._last < self.interval:
+                return
+            self._last = now
+            rows, elapsed = self.rows, now - self.start
+        print(f"[{self.phase}] {rows} rows, {rows / elapsed:.0f} rows/s")
+
+    def finish(self) -> None:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        print(f"[{self.phase}] 完成：{self.rows} rows，耗时 {elapsed:.1f}s，{self.rows / elapsed:.0f} rows/s")
 
 
 class MedicalGraph:
@@ -17,157 +75,352 @@ class MedicalGraph:
         Disease-[:recommand_eat]->Food
     """
 
-    def __init__(self) -> None:
+    def __init__(self, data_path: Optional[str] = None, batch_size: Optional[int] = None) -> None:
         # 当前文件所在目录
         cur_dir = os.path.dirname(os.path.abspath(__file__))
         # 数据文件路径
-        self.data_path = os.path.join(cur_dir, "data", "medical.json")
-        # Neo4j 驱动
-        self.driver = GraphDatabase.driver(**NEO4J_CONFIG)
+        self.data_path = data_path or os.path.join(cur_dir, "data", "medical.json")
+        # Neo4j 驱动（懒加载）：只解析数据（如构建 SQLite 图谱）时不需要 Neo4j
+        self._driver = None
+        # 每个 UNWIND 批次的行数
+        self.batch_size = max(1, batch_size or GRAPH_BUILD_BATCH_SIZE)
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = GraphDatabase.driver(**NEO4J_CONFIG)
+        return self._driver
+
+    # 逐行流式读取 medical.json，跳过空行与没有 name 的记录
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        return iter_records(self.data_path)
 
-    # 读取文件，抽取节点 & 关系列表
+    # 读取文件，抽取节点集合 & 关系元组集合（多进程分块解析，均已去重）
     def read_nodes(
         self,
-    ) -> Tuple[Set[str], Set[str], Set[str], Set[str], List[list], List[list], List[list]]:
-        # 共 4 类节点
-        drugs: List[str] = []     # 药品
-        foods: List[str] = []     # 食物
-        diseases: List[str] = []  # 疾病
-        symptoms: List[str] = []  # 症状
-
-        # 构建节点实体关系
-        rels_recommandeat: List[list] = []   # 疾病-推荐吃食物关系
-        rels_recommanddrug: List[list] = []  # 疾病-推荐药品关系
-        rels_symptom: List[list] = []        # 疾病-症状关系
-
-        count = 0
-        with open(self.data_path, encoding="utf-8") as f:
-            for line in f:
-                count += 1
-                if count % 10 == 0:
-                    print("count =", count)
-
-                if not line.strip():
-                    continue
+        workers: Optional[int] = None,
+    ) -> Tuple[Set[str], Set[str], Set[str], Set[str], Set[Tuple[str, str]], Set[Tuple[str, str]], Set[Tuple[str, str]]]:
+        parsed = parse_medical(self.data_path, workers=workers)
+        return (
+            parsed.nodes["Drug"],
+            parsed.nodes["Food"],
+            parsed.nodes["Symptom"],
+            parsed.nodes["Disease"],
+            parsed.edges["recommand_eat"],
+            parsed.edges["recommand_drug"],
+            parsed.edges["has_symptom"],
+        )
 
-                data_json = json.loads(line)
-                disease = data_json.get("name")
-                if not disease:
-                    continue
+    # 创建唯一约束；必须先于导入，否则每次 MERGE / MATCH 都是标签扫描
+    def create_constraints(self) -> None:
+        with self.driver.session() as session:
+            for name, label in CONSTRAINTS:
+                session.run(
+                    f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.name IS UNIQUE"
+                ).consume()
 
-                diseases.append(disease)
+    # 一个写入线程：独立会话，逐批执行参数化写入；execute_write 会重试瞬时错误（含死锁）
+    def _write_batches(
+        self,
+        cypher: str,
+        batches: "queue.Queue[Optional[list]]",
+        progress: _Progress,
+        errors: List[BaseException],
+        params: Dict[str, Any],
+    ) -> None:
+        with self.driver.session() as session:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                if errors:
+                    # 已有线程失败：继续取出批次直到结束标记，避免读取线程阻塞在 put 上
+                    continue
+                try:
+                    session.execute_write(lambda tx: tx.run(cypher, rows=batch, **params).consume())
+                except BaseException as e:
+                    errors.append(e)
+                    continue
+                progress.add(len(batch))
 
-                # 疾病 - 症状
-                if "symptom" in data_json and data_json["symptom"]:
-                    symptoms += data_json["symptom"]
-                    for symptom in data_json["symptom"]:
-                        rels_symptom.append([disease, symptom])
+    # 流式读取文件一遍，按 key 去重、分批，交给每个 key 各自的写入线程（各用一个会话）并行写入
+    def _parallel_load(
+        self,
+        phase: str,
+        writers: Dict[str, Tuple[str, Dict[str, Any]]],
+        extract: Callable[[Dict[str, Any]], Iterator[Tuple[str, Any]]],
+    ) -> Dict[str, int]:
+        progress = _Progress(phase)
+        errors: List[BaseException] = []
+        queues: Dict[str, "queue.Queue[Optional[list]]"] = {}
+        threads: List[threading.Thread] = []
+        for key, (cypher, params) in writers.items():
+            queues[key] = queue.Queue(maxsize=QUEUE_BATCHES)
+            thread = threading.Thread(
+                target=self._write_batches,
+                args=(cypher, queues[key], progress, errors, params),
+                name=f"graph-load-{key}",
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
 
-                # 疾病 - 推荐药品
-                if "recommand_drug" in data_json and data_json["recommand_drug"]:
-                    recommand_drug = data_json["recommand_drug"]
-                    drugs += recommand_drug
-                    for drug in recommand_drug:
-                        rels_recommanddrug.append([disease, drug])
+        seen: Dict[str, Set[Any]] = {key: set() for key in writers}
+        buffers: Dict[str, list] = {key: [] for key in writers}
+        try:
+            for record in self.iter_records():
+                if errors:
+                    break
+                for key, row in extract(record):
+                    if row in seen[key]:
+                        continue
+                    seen[key].add(row)
+                    buffers[key].append(row)
+                    if len(buffers[key]) >= self.batch_size:
+                        queues[key].put(buffers[key])
+                        buffers[key] = []
+        finally:
+            for key in writers:
+                if buffers[key] and not errors:
+                    queues[key].put(buffers[key])
+                queues[key].put(None)
+            for thread in threads:
+                thread.join()
+        progress.finish()
 
-                # 疾病 - 推荐食物
-                if "recommand_eat" in data_json and data_json["recommand_eat"]:
-                    recommand_eat = data_json["recommand_eat"]
-                    foods += recommand_eat
-                    for food in recommand_eat:
-                        rels_recommandeat.append([disease, food])
+        if errors:
+            raise errors[0]
+        return {key: len(rows) for key, rows in seen.items()}
 
-        return (
-            set(drugs),
-            set(foods),
-            set(symptoms),
-            set(diseases),
-            rels_recommandeat,
-            rels_recommanddrug,
-            rels_symptom,
+    # 第一遍：四类节点，按标签并行 MERGE
+    def load_nodes(self) -> Dict[str, int]:
+        writers = {
+            label: (f"UNWIND $rows AS name MERGE (:{label} {{name: name}})", {})
+            for label in ("Drug", "Food", "Symptom")
+        }
+        # 疾病节点同时写入内容哈希，之后的增量更新据此判断记录是否变化
+        writers["Disease"] = (
+            "UNWIND $rows AS row MERGE (d:Disease {name: row[0]}) SET d.content_hash = row[1]",
+            {},
         )
 
-    # 创建知识图谱疾病相关的节点, 疾病, 症状, 药品, 食品
+        def extract(record: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+            yield "Disease", (record["name"], record_hash(record))
+            for _rel_type, label, field, _rel_name in RELATIONSHIPS:
+                for name in record.get(field) or ():
+                    if name:
+                        yield label, name
+
+        return self._parallel_load("nodes", writers, extract)
+
+    # 第二遍：三类关系，按关系类型并行 MERGE（节点已存在，MATCH 走唯一约束的索引）
+    def load_relationships(self) -> Dict[str, int]:
+        writers = {
+            rel_type: (relationship_cypher("Disease", label, rel_type), {"rel_name": rel_name})
+            for rel_type, label, _field, rel_name in RELATIONSHIPS
+        }
+
+        def extract(record: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+            disease = record["name"]
+            for rel_type, _label, field, _rel_name in RELATIONSHIPS:
+                for name in record.get(field) or ():
+                    if name:
+                        yield rel_type, (disease, name)
+
+        return self._parallel_load("relationships", writers, extract)
+
+    # 创建知识图谱：约束 -> 节点 -> 关系；全程 MERGE，可重复执行而不产生重复的边
     def create_graphnodes_and_graphrels(self) -> None:
-        (
-            Drugs,
-            Foods,
-            Symptoms,
-            Diseases,
-            rels_recommandeat,
-            rels_recommanddrug,
-            rels_symptom,
-        ) = self.read_nodes()
-
-        print("Drugs:", len(Drugs))
-        print("Foods:", len(Foods))
-        print("Symptoms:", len(Symptoms))
-        print("Diseases:", len(Diseases))
-        print("rels_recommandeat:", len(rels_recommandeat))
-        print("rels_recommanddrug:", len(rels_recommanddrug))
-        print("rels_symptom:", len(rels_symptom))
+        start = time.perf_counter()
+        print("创建唯一约束......")
+        self.create_constraints()
+        print(f"开始导入节点（batch_size={self.batch_size}）......")
+        for label, count in self.load_nodes().items():
+            print(f"{label}:", count)
+        print("开始导入关系......")
+        for rel_type, count in self.load_relationships().items():
+            print(f"rels_{rel_type}:", count)
+        self.bump_revision()
+        print(f"知识图谱导入完成，耗时 {time.perf_counter() - start:.1f}s")
+
+    def bump_revision(self) -> None:
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(REVISION_CYPHER).consume())
+
+    # 按疾病名称汇总记录（同名记录合并各字段，保持原始顺序），供增量更新比较哈希
+    def collect_records(self) -> Dict[str, Dict[str, Any]]:
+        records: Dict[str, Dict[str, Any]] = {}
+        for record in self.iter_records():
+            merged = records.setdefault(record["name"], {"name": record["name"]})
+            for _rel_type, _label, field, _rel_name in RELATIONSHIPS:
+                names = merged.setdefault(field, [])
+                names.extend(name for name in record.get(field) or () if name and name not in names)
+        return records
+
+    def fetch_hashes(self) -> Dict[str, Optional[str]]:
+        with self.driver.session() as session:
+            result = session.run("MATCH (d:Disease) RETURN d.name, d.content_hash")
+            return {name: content_hash for name, content_hash in result}
+
+    # 写入一批变化的疾病（一个事务）：补齐目标节点，删除已消失的边，MERGE 现有的边，最后更新哈希
+    def _upsert_diseases(self, tx, records: List[Dict[str, Any]]) -> None:
+        rows = [{"name": r["name"], "hash": record_hash(r)} for r in records]
+        tx.run(
+            "UNWIND $rows AS row MERGE (d:Disease {name: row.name}) SET d.content_hash = row.hash",
+            rows=rows,
+        ).consume()
+        for rel_type, label, field, rel_name in RELATIONSHIPS:
+            targets = sorted({name for r in records for name in r[field]})
+            tx.run(f"UNWIND $rows AS name MERGE (:{label} {{name: name}})", rows=targets).consume()
+            tx.run(
+                "UNWIND $rows AS row "
+                f"MATCH (:Disease {{name: row.name}})-[r:{rel_type}]->(q) "
+                "WHERE NOT q.name IN row.targets "
+                "DELETE r",
+                rows=[{"name": r["name"], "targets": r[field]} for r in records],
+            ).consume()
+            tx.run(
+                relationship_cypher("Disease", label, rel_type),
+                rows=[(r["name"], name) for r in records for name in r[field]],
+                rel_name=rel_name,
+            ).consume()
 
+    # 增量更新：只写入内容哈希变化的疾病，删除文件中已不存在的疾病；返回受影响的疾病名称
+    def update_incremental(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        self.create_constraints()
+        existing = self.fetch_hashes()
+        records = self.collect_records()
+
+        added = [name for name in records if name not in existing]
+        changed = [
+            name for name in records
+            if name in existing and existing[name] != record_hash(records[name])
+        ]
+        removed = [name for name in existing if name not in records]
+        print(
+            f"疾病记录 {len(records)} 条：新增 {len(added)}，变化 {len(changed)}，"
+            f"删除 {len(removed)}，未变化 {len(records) - len(added) - len(changed)}"
+        )
+
+        upserts = [records[name] for name in added + changed]
+        progress = _Progress("incremental")
         with self.driver.session() as session:
-            # 创建中心疾病的知识图谱节点
-            print("开始创建中心疾病节点......")
-            for d in Diseases:
-                cypher = "MERGE (a:Disease{name:%r}) RETURN a" % d
-                session.run(cypher)
-
-            # 创建“药品”、“食品”、“症状”的知识图谱节点
-            print("开始创建药品节点 Drug ......")
-            for n in Drugs:
-                cypher = "MERGE (a:Drug{name:%r}) RETURN a" % n
-                session.run(cypher)
-
-            print("开始创建食品节点 Food ......")
-            for n in Foods:
-                cypher = "MERGE (a:Food{name:%r}) RETURN a" % n
-                session.run(cypher)
-
-            print("开始创建症状节点 Symptom ......")
-            for n in Symptoms:
-                cypher = "MERGE (a:Symptom{name:%r}) RETURN a" % n
-                session.run(cypher)
-
-        # 创建实体关系边
-        self.create_relationship("Disease", "Food", rels_recommandeat, "recommand_eat", "推荐食谱")
-        self.create_relationship("Disease", "Drug", rels_recommanddrug, "recommand_drug", "推荐药品")
-        self.create_relationship("Disease", "Symptom", rels_symptom, "has_symptom", "症状")
-
-    # 创建实体关联边
+            for i in range(0, len(upserts), self.batch_size):
+                batch = upserts[i : i + self.batch_size]
+                session.execute_write(self._upsert_diseases, batch)
+                progress.add(len(batch))
+            for i in range(0, len(removed), self.batch_size):
+                batch = removed[i : i + self.batch_size]
+                session.execute_write(
+                    lambda tx: tx.run(
+                        "UNWIND $rows AS name MATCH (d:Disease {name: name}) DETACH DELETE d",
+                        rows=batch,
+                    ).consume()
+                )
+                progress.add(len(batch))
+        progress.finish()
+
+        if upserts or removed:
+            self.bump_revision()
+        print(f"增量更新完成，耗时 {time.perf_counter() - start:.1f}s")
+        return {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unchanged": len(records) - len(added) - len(changed),
+        }
+
+    # 创建实体关联边（单个关系类型，批量 MERGE）
     def create_relationship(
         self,
         start_node: str,
         end_node: str,
-        edges: List[list],
+        edges: Iterable[Sequence[str]],
         rel_type: str,
         rel_name: str,
     ) -> None:
-        # 去重处理
-        set_edges = ["###".join(edge) for edge in edges if len(edge) == 2]
-        num_edges = len(set(set_edges))
-        print(f"num_edges({rel_type}) =", num_edges)
+        # 去重处理（read_nodes 返回的元组集合已去重，这里兼容列表输入）
+        rows = list(dict.fromkeys(tuple(edge) for edge in edges if len(edge) == 2))
+        print(f"num_edges({rel_type}) =", len(rows))
 
+        cypher = relationship_cypher(start_node, end_node, rel_type)
+        progress = _Progress(rel_type)
         with self.driver.session() as session:
-            for edge_str in set(set_edges):
-                p, q = edge_str.split("###")
-                # 注意：这里直接拼接字符串，假设 medical.json 中 name 字段不会包含单引号
-                cypher = (
-                    "MATCH (p:%s),(q:%s) "
-                    "WHERE p.name='%s' AND q.name='%s' "
-                    "CREATE (p)-[rel:%s{name:'%s'}]->(q)"
-                    % (start_node, end_node, p, q, rel_type, rel_name)
+            for i in range(0, len(rows), self.batch_size):
+                batch = rows[i : i + self.batch_size]
+                session.execute_write(
+                    lambda tx: tx.run(cypher, rows=batch, rel_name=rel_name).consume()
                 )
-                try:
-                    session.run(cypher)
-                except Exception as e:
-                    # 打印出错的关系，便于排查
-                    print("Failed to create relationship:", p, rel_type, q, "error:", e)
+                progress.add(len(batch))
+        progress.finish()
+
+
+# 批量创建关系的 Cypher：rows 为 [起点名称, 终点名称] 列表；MERGE 保证重复执行不产生重复的边
+def relationship_cypher(start_node: str, end_node: str, rel_type: str) -> str:
+    return (
+        "UNWIND $rows AS row "
+        f"MATCH (p:{start_node} {{name: row[0]}}) "
+        f"MATCH (q:{end_node} {{name: row[1]}}) "
+        f"MERGE (p)-[r:{rel_type}]->(q) "
+        "SET r.name = $rel_name"
+    )
+
+
+# 通知后端按疾病失效答案缓存（POST JSON 数组）
+def notify_invalidate(url: str, diseases: List[str], admin_token: str) -> None:
+    import urllib.request
+
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(diseases, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json", "X-Admin-Token": admin_token},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            print("已通知后端失效缓存：", response.read().decode("utf-8"))
+    except OSError as e:
+        print("通知后端失效缓存失败：", e)
 
 
 if __name__ == "__main__":
-    mg = MedicalGraph()
-    print("创建知识图谱中的节点和关系......")
-    mg.create_graphnodes_and_graphrels()
+    parser = argparse.ArgumentParser(description="由 medical.json 构建 Neo4j 医疗知识图谱")
+    parser.add_argument("--data", default=None, help="medical.json 路径（默认 data/medical.json）")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=GRAPH_BUILD_BATCH_SIZE,
+        help=f"每个 UNWIND 批次的行数（默认 {GRAPH_BUILD_BATCH_SIZE}，环境变量 GRAPH_BUILD_BATCH_SIZE）",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量更新：只写入内容哈希变化的疾病，删除已消失的疾病与边",
+    )
+    parser.add_argument(
+        "--notify-url",
+        default=None,
+        help="增量更新后把受影响的疾病 POST 到该地址（如 http://127.0.0.1:8000/api/admin/graph/invalidate）",
+    )
+    parser.add_argument(
+        "--admin-token",
+        default=os.getenv("ADMIN_TOKEN", ""),
+        help="通知后端时的 X-Admin-Token（默认读取环境变量 ADMIN_TOKEN）",
+    )
+    args = parser.parse_args()
 
+    mg = MedicalGraph(data_path=args.data, batch_size=args.batch_size)
+    try:
+        if not args.incremental:
+            print("创建知识图谱中的节点和关系......")
+            mg.create_graphnodes_and_graphrels()
+        else:
+            print("增量更新知识图谱......")
+            summary = mg.update_incremental()
+            diseases = summary["added"] + summary["changed"] + summary["removed"]
+            if args.notify_url and diseases:
+                notify_invalidate(args.notify_url, diseases, args.admin_token)
+    finally:
+        mg.driver.close()
@@ -36,3 +36,38 @@ NEO4J_CONFIG = {
 # 只有非加密URI方案才设置encrypted参数
 if not is_encrypted_uri:
     NEO4J_CONFIG["encrypted"] = False
+
+# 知识图谱答案缓存（AnswerCache）配置
+# - ANSWER_CACHE_SIZE: 最多缓存的条目数（LRU 淘汰）
+# - ANSWER_CACHE_TTL: 条目新鲜期（秒），过期后需要重新查询 Neo4j
+# - ANSWER_CACHE_STALE_TTL: 条目最长保留时间（秒），Neo4j 慢或不可用时可返回过期答案
+# - ANSWER_CACHE_STALE_TIMEOUT: 持有过期答案时，等待重新查询的最长时间（秒）
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_STALE_TTL = float(os.getenv("ANSWER_CACHE_STALE_TTL", "86400"))
+ANSWER_CACHE_STALE_TIMEOUT = float(os.getenv("ANSWER_CACHE_STALE_TIMEOUT", "0.5"))
+
+# 图谱读路径后端（AnswerSearcher）
+# - neo4j: 每次查询都访问 Neo4j（默认）
+# - mirror: 启动时把三类关系加载到内存（GraphMirror），加载完成前回退到 Neo4j
+# - sqlite: 使用由 data/medical.json 构建的嵌入式 SQLite 图谱（graph_sqlite.py），不需要 Neo4j；
+#           文件不存在时回退到 Neo4j。构建：python graph_sqlite.py
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+# SQLite 图谱文件路径（GRAPH_BACKEND=sqlite）
+SQLITE_GRAPH_PATH = os.getenv(
+    "SQLITE_GRAPH_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "medical_graph.sqlite3"),
+)
+# build_medicalgraph 批量导入时每个 UNWIND 批次的行数
+GRAPH_BUILD_BATCH_SIZE = int(os.getenv("GRAPH_BUILD_BATCH_SIZE", "1000"))
+# medical.json 并行解析（medical_parser.py）：进程数（0 表示 CPU 核数）与每个分块的大小（MB）
+MEDICAL_PARSE_WORKERS = int(os.getenv("MEDICAL_PARSE_WORKERS", "0"))
+MEDICAL_PARSE_CHUNK_MB = int(os.getenv("MEDICAL_PARSE_CHUNK_MB", "8"))
+# 内存镜像的全量刷新间隔（秒），以及检查图谱版本是否变化的间隔（秒）
+MIRROR_REFRESH_INTERVAL = float(os.getenv("MIRROR_REFRESH_INTERVAL", "21600"))
+MIRROR_VERSION_CHECK_INTERVAL = float(os.getenv("MIRROR_VERSION_CHECK_INTERVAL", "60"))
+
+# 推测执行（仅异步路径）：问句识别出实体但没有命中任何疑问词（分类置信度低）时，
+# 在查询图谱的同时提前发起 LLM 调用；图谱返回非空答案后立即取消 LLM 调用。
+# 可降低图谱查不到答案时的总耗时，代价是部分被取消的 LLM 调用会产生额外的 token 消耗。
+SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,199 @@
+import logging
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import MIRROR_REFRESH_INTERVAL, MIRROR_VERSION_CHECK_INTERVAL
+from question_parser import QUESTION_TYPE_RELS
+
+logger = logging.getLogger(__name__)
+
+# 镜像只覆盖读路径用到的关系类型
+MIRROR_REL_TYPES: Tuple[str, ...] = tuple(QUESTION_TYPE_RELS.values())
+
+LOAD_QUERY = (
+    "MATCH (m:Disease)-[r]->(n) "
+    "WHERE type(r) IN $rel_types "
+    "RETURN m.name, type(r), collect(n.name)"
+)
+
+# 导入修订号（GraphMeta 节点由 build_medicalgraph 维护；没有时为 null）
+REVISION_QUERY = "OPTIONAL MATCH (g:GraphMeta {name: 'medical'}) RETURN g.revision"
+
+
+class _Snapshot:
+    """
+    一份只读的图谱快照，紧凑存储：
+    - strings：字符串表（所有名称只存一份，并 sys.intern）
+    - disease_ids：疾病名称 -> 行号
+    - 每种关系一组 CSR 数组：offsets[i]..offsets[i+1] 是第 i 个疾病在 targets 中的区间，
+      targets 中存放的是目标名称在字符串表里的下标
+    """
+
+    __slots__ = ("strings", "disease_ids", "csr", "version", "edges")
+
+    def __init__(self, rows: Iterable[Sequence[Any]], version: Any = None) -> None:
+        string_ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+        def intern_id(name: str) -> int:
+            idx = string_ids.get(name)
+            if idx is None:
+                idx = len(self.strings)
+                string_ids[name] = idx
+                self.strings.append(sys.intern(name))
+            return idx
+
+        # 先按关系类型收集邻接表：{rel_type: {disease_row: [target_id, ...]}}
+        self.disease_ids: Dict[str, int] = {}
+        adjacency: Dict[str, Dict[int, List[int]]] = {rel: {} for rel in MIRROR_REL_TYPES}
+        for disease, rel_type, names in rows:
+            if rel_type not in adjacency:
+                continue
+            row = self.disease_ids.setdefault(sys.intern(disease), len(self.disease_ids))
+            adjacency[rel_type].setdefault(row, []).extend(intern_id(n) for n in names)
+
+        # 再压缩成 CSR：offsets 长度为疾病数 + 1
+        n_diseases = len(self.disease_ids)
+        self.csr: Dict[str, Tuple[array, array]] = {}
+        self.edges = 0
+        for rel_type, by_row in adjacency.items():
+            offsets = array("I", [0]) * (n_diseases + 1)
+            targets = array("I")
+            for row in range(n_diseases):
+                targets.extend(by_row.get(row, ()))
+                offsets[row + 1] = len(targets)
+            self.csr[rel_type] = (offsets, targets)
+            self.edges += len(targets)
+
+        self.version = version
+
+    def neighbours(self, disease: str, rel_type: str) -> Optional[List[str]]:
+        row = self.disease_ids.get(disease)
+        arrays = self.csr.get(rel_type)
+        if row is None or arrays is None:
+            return None
+        offsets, targets = arrays
+        start, end = offsets[row], offsets[row + 1]
+        if start == end:
+            return None
+        strings = self.strings
+        return [strings[i] for i in targets[start:end]]
+
+
+class GraphMirror:
+    """
+    知识图谱读路径的内存镜像。
+
+    启动后在后台线程中从 Neo4j 全量加载 has_symptom / recommand_eat / recommand_drug
+    三类关系，之后 AnswerSearcher 的查询直接在内存中完成，不再有网络往返。
+
+    - 定期检查图谱版本（节点/关系计数与导入修订号），变化时或到达全量刷新间隔时重新加载
+    - 新快照构建完成后整体替换，读取方无需加锁
+    - 未加载完成（或加载失败）时 loaded 为 False，调用方应回退到 Neo4j
+    """
+
+    def __init__(
+        self,
+        driver,
+        refresh_interval: float = MIRROR_REFRESH_INTERVAL,
+        version_check_interval: float = MIRROR_VERSION_CHECK_INTERVAL,
+    ) -> None:
+        self.driver = driver
+        self.refresh_interval = refresh_interval
+        self.version_check_interval = version_check_interval
+
+        self._snapshot: Optional[_Snapshot] = None
+        self._loaded_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    # 由查询结果行直接构建快照（也可用于测试或离线数据）
+    def load_rows(self, rows: Iterable[Sequence[Any]], version: Any = None) -> None:
+        start = time.perf_counter()
+        snapshot = _Snapshot(rows, version)
+        self._snapshot = snapshot
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"图谱内存镜像已加载：{len(snapshot.disease_ids)} 个疾病，"
+            f"{snapshot.edges} 条关系，耗时 {time.perf_counter() - start:.2f}s"
+        )
+
+    # 从 Neo4j 全量加载
+    def load(self) -> None:
+        version = self.fetch_version()
+        with self.driver.session() as session:
+            rows = session.run(LOAD_QUERY, rel_types=list(MIRROR_REL_TYPES)).values()
+        self.load_rows(rows, version)
+
+    # 图谱版本指纹：疾病数 + 各关系数（均来自计数存储，开销极小）+ 导入修订号
+    # （增量更新可能只替换边而不改变计数，build_medicalgraph 每次写入后递增修订号）
+    def fetch_version(self) -> Tuple[Any, ...]:
+        with self.driver.session() as session:
+            counts: List[Any] = [session.run("MATCH (m:Disease) RETURN count(m)").single()[0]]
+            for rel_type in MIRROR_REL_TYPES:
+                counts.append(
+                    session.run("MATCH ()-[r:%s]->() RETURN count(r)" % rel_type).single()[0]
+                )
+            counts.append(session.run(REVISION_QUERY).single()[0])
+        return tuple(counts)
+
+    # 与 Neo4j values() 返回的行结构一致：[疾病, 关系类型, 目标名称列表]
+    def lookup(self, diseases: Sequence[str], rel_types: Sequence[str]) -> List[List[Any]]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+
+        rows: List[List[Any]] = []
+        for disease in diseases:
+            for rel_type in rel_types:
+                names = snapshot.neighbours(disease, rel_type)
+                if names:
+                    rows.append([disease, rel_type, names])
+        return rows
+
+    # 启动后台线程：首次加载 + 定期检查版本 / 全量刷新
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="graph-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._needs_reload():
+                    self.load()
+            except Exception as e:
+                logger.warning(f"图谱内存镜像刷新失败，继续使用{'旧快照' if self.loaded else ' Neo4j'}：{e}")
+            self._stop.wait(self.version_check_interval)
+
+    def _needs_reload(self) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return True
+        if time.monotonic() - self._loaded_at >= self.refresh_interval:
+            return True
+        return self.fetch_version() != snapshot.version
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "diseases": len(snapshot.disease_ids),
+            "strings": len(snapshot.strings),
+            "edges": snapshot.edges,
+            "version": snapshot.version,
+            "age_s": round(time.monotonic() - self._loaded_at, 1),
+        }
@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import SQLITE_GRAPH_PATH
+from question_parser import QUESTION_TYPE_RELS
+
+logger = logging.getLogger(__name__)
+
+# 图谱文件的格式版本：表结构变化时递增，旧文件需要重新构建
+SCHEMA_VERSION = 1
+
+# 只收录读路径用到的关系类型
+SQLITE_REL_TYPES: Tuple[str, ...] = tuple(QUESTION_TYPE_RELS.values())
+
+SCHEMA = """
+CREATE TABLE meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE nodes (
+    label TEXT NOT NULL,
+    name  TEXT NOT NULL,
+    PRIMARY KEY (label, name)
+) WITHOUT ROWID;
+
+-- 主键即 (disease, rel_type) 上的聚簇索引，一次查询只做一次索引定位 + 顺序扫描；
+-- seq 为目标名称的排序序号（构建结果与解析顺序无关）
+CREATE TABLE edges (
+    disease  TEXT    NOT NULL,
+    rel_type TEXT    NOT NULL,
+    seq      INTEGER NOT NULL,
+    target   TEXT    NOT NULL,
+    PRIMARY KEY (disease, rel_type, seq)
+) WITHOUT ROWID;
+"""
+
+LOOKUP_SQL = "SELECT target FROM edges WHERE disease = ? AND rel_type = ? ORDER BY seq"
+
+
+class SqliteGraph:
+    """
+    嵌入式只读图谱（GRAPH_BACKEND=sqlite）：由 data/medical.json 构建的 SQLite 文件，
+    (疾病, 关系类型) -> 目标名称，查询为进程内的索引查找，不需要 Neo4j。
+
+    - 文件不存在（或格式版本不符）时 loaded 为 False，调用方应回退到 Neo4j
+    - 每个线程各用一个只读连接（SQLite 连接不能跨线程共享）
+    """
+
+    def __init__(self, path: str = SQLITE_GRAPH_PATH) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._meta: Optional[Dict[str, str]] = None
+        try:
+            self._meta = self._read_meta()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite 图谱不可用（{self.path}），回退到 Neo4j：{e}")
+            return
+        if self._meta.get("schema_version") != str(SCHEMA_VERSION):
+            logger.warning(f"SQLite 图谱格式版本不符（{self.path}），请重新构建；回退到 Neo4j")
+            self._meta = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._meta is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not os.path.exists(self.path):
+                raise sqlite3.OperationalError(f"文件不存在：{self.path}")
+            # 只读打开；immutable 告诉 SQLite 文件不会被修改，省去加锁与变更检测
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def _read_meta(self) -> Dict[str, str]:
+        return dict(self._connect().execute("SELECT key, value FROM meta").fetchall())
+
+    # 与 Neo4j values() 返回的行结构一致：[疾病, 关系类型, 目标名称列表]
+    def lookup(self, diseases: Sequence[str], rel_types: Sequence[str]) -> List[List[Any]]:
+        conn = self._connect()
+        rows: List[List[Any]] = []
+        for disease in diseases:
+            for rel_type in rel_types:
+                names = [name for (name,) in conn.execute(LOOKUP_SQL, (disease, rel_type))]
+                if names:
+                    rows.append([disease, rel_type, names])
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        if self._meta is None:
+            return {"loaded": False, "path": self.path}
+        return {"loaded": True, "path": self.path, **self._meta}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# 按 (疾病, 关系类型) 分组并去重（保持输入顺序），产出 (disease, rel_type, seq, target)
+def _edge_rows(edges_by_rel: Dict[str, Iterable[Sequence[str]]]) -> Iterable[Tuple[str, str, int, str]]:
+    for rel_type, edges in edges_by_rel.items():
+        grouped: Dict[str, Dict[str, None]] = {}
+        for edge in edges:
+            if len(edge) == 2 and edge[0] and edge[1]:
+                grouped.setdefault(edge[0], {})[edge[1]] = None
+        for disease, targets in grouped.items():
+            for seq, target in enumerate(targets):
+                yield disease, rel_type, seq, target
+
+
+# 由 medical.json 构建 SQLite 图谱：先写临时文件再原子替换，运行中的进程不会读到半个文件
+def build_sqlite_graph(data_path: Optional[str] = None, path: str = SQLITE_GRAPH_PATH) -> Dict[str, Any]:
+    from build_medicalgraph import MedicalGraph
+
+    start = time.perf_counter()
+    graph = MedicalGraph(data_path=data_path)
+    (
+        drugs,
+        foods,
+        symptoms,
+        diseases,
+        rels_recommandeat,
+        rels_recommanddrug,
+        rels_symptom,
+    ) = graph.read_nodes()
+    # 解析结果是无序的集合，排序后写入，同一份数据每次构建出相同的 seq
+    edges_by_rel = {
+        "has_symptom": sorted(rels_symptom),
+        "recommand_drug": sorted(rels_recommanddrug),
+        "recommand_eat": sorted(rels_recommandeat),
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            # 构建期间不需要崩溃恢复，关闭日志与同步写盘
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            for label, names in (
+                ("Disease", diseases),
+                ("Drug", drugs),
+                ("Food", foods),
+                ("Symptom", symptoms),
+            ):
+                conn.executemany(
+                    "INSERT INTO nodes (label, name) VALUES (?, ?)",
+                    ((label, name) for name in sorted(names) if name),
+                )
+            conn.executemany(
+                "INSERT INTO edges (disease, rel_type, seq, target) VALUES (?, ?, ?, ?)",
+                _edge_rows(edges_by_rel),
+            )
+
+            counts = {
+                "diseases": len(diseases),
+                "edges": conn.execute("SELECT count(*) FROM edges").fetchone()[0],
+            }
+            meta = {
+                "schema_version": str(SCHEMA_VERSION),
+                "source": os.path.basename(graph.data_path),
+                "source_sha256": _file_sha256(graph.data_path),
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                **{k: str(v) for k, v in counts.items()},
+            }
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta.items())
+            conn.commit()
+            # 重建页面、收紧文件体积，并更新查询规划器的统计信息
+            conn.execute("ANALYZE")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    logger.info(
+        f"SQLite 图谱已生成：{path}，{counts['diseases']} 个疾病，{counts['edges']} 条关系，"
+        f"耗时 {time.perf_counter() - start:.2f}s"
+    )
+    return meta
+
+
+if __name__ == "__main__":
+    # 构建步骤：python graph_sqlite.py [medical.json 路径] [输出路径]
+    args = sys.argv[1:]
+    result = build_sqlite_graph(
+        args[0] if args else None,
+        args[1] if len(args) > 1 else SQLITE_GRAPH_PATH,
+    )
+    print("SQLite 图谱已生成：", args[1] if len(args) > 1 else SQLITE_GRAPH_PATH, result)
@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import sys
+import time
+from array import array
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config import MEDICAL_PARSE_CHUNK_MB, MEDICAL_PARSE_WORKERS
+
+try:
+    # 可选依赖：orjson 解析速度约为标准库的 2~3 倍，未安装时使用 json
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# medical.json 到图谱的映射：(关系类型, 终点标签, 记录中的字段, 关系名称)，起点均为 Disease
+RELATIONSHIPS: List[Tuple[str, str, str, str]] = [
+    ("recommand_eat", "Food", "recommand_eat", "推荐食谱"),
+    ("recommand_drug", "Drug", "recommand_drug", "推荐药品"),
+    ("has_symptom", "Symptom", "symptom", "症状"),
+]
+
+NODE_LABELS: Tuple[str, ...] = ("Disease", "Drug", "Food", "Symptom")
+
+# 进度日志的最小间隔（秒）
+PROGRESS_INTERVAL = 2.0
+
+
+class ParsedGraph:
+    """
+    medical.json 解析结果（均已去重）：
+    - nodes：标签 -> 名称集合
+    - edges：关系类型 -> (疾病, 目标名称) 元组集合
+
+    名称统一 sys.intern，同一个名称在所有集合与元组中只保留一份。
+    """
+
+    __slots__ = ("nodes", "edges", "records", "bytes")
+
+    def __init__(self) -> None:
+        self.nodes: Dict[str, Set[str]] = {label: set() for label in NODE_LABELS}
+        self.edges: Dict[str, Set[Tuple[str, str]]] = {rel_type: set() for rel_type, *_ in RELATIONSHIPS}
+        self.records = 0
+        self.bytes = 0
+
+    # 合并一个工作进程的分块结果：把分块内的字符串下标换回（intern 后的）名称
+    def merge(self, chunk: "_Chunk") -> None:
+        table = [sys.intern(name) for name in chunk.strings]
+        lookup = table.__getitem__
+        for label, ids in chunk.nodes.items():
+            self.nodes[label].update(map(lookup, ids))
+        for rel_type, (sources, targets) in chunk.edges.items():
+            self.edges[rel_type].update(zip(map(lookup, sources), map(lookup, targets)))
+        self.records += chunk.records
+        self.bytes += chunk.bytes
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            **{label: len(names) for label, names in self.nodes.items()},
+            **{rel_type: len(edges) for rel_type, edges in self.edges.items()},
+        }
+
+
+class _Chunk:
+    """
+    工作进程返回的分块结果，紧凑编码以减少进程间传输：
+    - strings：分块内出现过的名称（每个只存一份）
+    - nodes：标签 -> 名称下标数组
+    - edges：关系类型 -> (疾病下标数组, 目标下标数组)，分块内已去重
+    """
+
+    __slots__ = ("strings", "nodes", "edges", "records", "bytes")
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self.nodes: Dict[str, array] = {}
+        self.edges: Dict[str, Tuple[array, array]] = {}
+        self.records = 0
+        self.bytes = 0
+
+
+# 逐行流式读取（单进程），跳过空行与没有 name 的记录
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    return _iter_range(path, 0, os.path.getsize(path))
+
+
+# 逐行读取 [start, end) 内的完整行，产出有 name 的记录
+def _iter_range(path: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            if line.strip():
+                record = loads(line)
+                if record.get("name"):
+                    yield record
+
+
+# 按字节把文件切成若干分块，边界对齐到行首
+def chunk_offsets(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    chunks: List[Tuple[int, int]] = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+# 单进程：把 [start, end) 内的记录直接加入解析结果
+def _parse_into(graph: ParsedGraph, path: str, start: int, end: int) -> None:
+    intern = sys.intern
+    for record in _iter_range(path, start, end):
+        disease = intern(record["name"])
+        graph.records += 1
+        graph.nodes["Disease"].add(disease)
+        for rel_type, label, field, _rel_name in RELATIONSHIPS:
+            nodes, edges = graph.nodes[label], graph.edges[rel_type]
+            for name in record.get(field) or ():
+                if name:
+                    name = intern(name)
+                    nodes.add(name)
+                    edges.add((disease, name))
+    graph.bytes += end - start
+
+
+# 多进程：解析一个分块（在工作进程中执行），名称编码为分块内的下标
+def _parse_chunk(args: Tuple[str, int, int]) -> _Chunk:
+    path, start, end = args
+    chunk = _Chunk()
+    ids: Dict[str, int] = {}
+
+    def intern_id(name: str) -> int:
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(chunk.strings)
+            chunk.strings.append(name)
+        return i
+
+    nodes: Dict[str, Set[int]] = {label: set() for label in NODE_LABELS}
+    edges: Dict[str, Set[Tuple[int, int]]] = {rel_type: set() for rel_type, *_ in RELATIONSHIPS}
+    for record in _iter_range(path, start, end):
+        disease = intern_id(record["name"])
+        chunk.records += 1
+        nodes["Disease"].add(disease)
+        for rel_type, label, field, _rel_name in RELATIONSHIPS:
+            for name in record.get(field) or ():
+                if name:
+                    target = intern_id(name)
+                    nodes[label].add(target)
+                    edges[rel_type].add((disease, target))
+
+    chunk.nodes = {label: array("I", ids_) for label, ids_ in nodes.items()}
+    chunk.edges = {
+        rel_type: (array("I", (p for p, _ in pairs)), array("I", (q for _, q in pairs)))
+        for rel_type, pairs in edges.items()
+    }
+    chunk.bytes = end - start
+    return chunk
+
+
+def _default_workers() -> int:
+    # 容器中按实际可用的 CPU 计算
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _log_progress(done: int, total: int, started: float) -> None:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    mb = 1024 * 1024
+    logger.info(
+        f"medical.json 解析进度：{done / mb:.1f}/{total / mb:.1f} MB"
+        f"（{done / max(total, 1):.0%}），{done / mb / elapsed:.1f} MB/s"
+    )
+
+
+# 解析 medical.json：按字节分块，多进程并行解析，合并为去重后的节点集合与边集合。
+# 内存占用只与去重后的结果有关：分块结果以下标数组传回，在主进程中逐个合并后即释放；
+# 只有一个分块或 workers=1 时在当前进程中逐块解析，省去进程启动与传输开销。
+def parse_medical(
+    path: str,
+    workers: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+) -> ParsedGraph:
+    workers = workers or MEDICAL_PARSE_WORKERS or _default_workers()
+    chunk_bytes = max(1, chunk_bytes or MEDICAL_PARSE_CHUNK_MB * 1024 * 1024)
+    total = os.path.getsize(path)
+    chunks = [(path, start, end) for start, end in chunk_offsets(path, chunk_bytes)]
+    workers = min(workers, len(chunks))
+
+    started = time.perf_counter()
+    last_log = started
+    result = ParsedGraph()
+    logger.info(
+        f"开始解析 {path}（{total / 1024 / 1024:.1f} MB，{len(chunks)} 个分块，"
+        f"{workers} 个进程，{'orjson' if orjson is not None else 'json'}）"
+    )
+
+    def log_progress() -> None:
+        nonlocal last_log
+        now = time.perf_counter()
+        if now - last_log >= PROGRESS_INTERVAL:
+            last_log = now
+            _log_progress(result.bytes, total, started)
+
+    if workers <= 1:
+        for _path, start, end in chunks:
+            _parse_into(result, path, start, end)
+            log_progress()
+    else:
+        with Pool(workers) as pool:
+            for chunk in pool.imap_unordered(_parse_chunk, chunks):
+                result.merge(chunk)
+                log_progress()
+
+    _log_progress(result.bytes, total, started)
+    logger.info(f"解析完成：{result.records} 条记录，{result.counts()}")
+    return result
+
+
+if __name__ == "__main__":
+    # 用法：python medical_parser.py [medical.json 路径] [进程数]
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    argv = sys.argv[1:]
+    data_path = argv[0] if argv else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "medical.json"
+    )
+    parsed = parse_medical(data_path, workers=int(argv[1]) if len(argv) > 1 else None)
+    print(json.dumps(parsed.counts(), ensure_ascii=False, indent=2))
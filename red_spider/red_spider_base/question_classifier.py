@@ -1,8 +1,173 @@
+import hashlib
 import os
-from typing import Dict, List
+import pickle
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
 
 import ahocorasick
 
+from tracing import traced
+
+# 预编译产物的格式版本：产物结构变化时递增，旧产物会被自动重建
+ARTIFACT_VERSION = 2
+
+# 实体类型及其词典文件（顺序决定 wdtype_dict 中类型列表的顺序）
+ENTITY_TYPES = ("disease", "drug", "food", "symptom")
+
+# 问句疑问词，V1.0 仅支持症状、食物、药品的查询
+SYMPTOM_REQUEST: List[str] = [
+    "症状",
+    "表征",
+    "现象",
+    "症候",
+    "表现",
+    # 新增：
+    "不适",
+    "难受",
+    "疼痛",
+    "痛",
+    "酸痛",
+    "胀痛",
+    "反应",
+    "感觉",
+    "迹象",
+    "征兆",
+    "体征",
+    "病症",
+    "病状",
+    "毛病",
+    "问题",
+    "发作",
+    "复发",
+    "恶化",
+    "加重",
+    "并发症",
+    "后遗症",
+    "副作用",
+    "异常",
+    "不正常",
+    "不舒服",
+]
+
+FOOD_REQUEST: List[str] = [
+    "饮食",
+    "饮用",
+    "吃",
+    "食",
+    "伙食",
+    "膳食",
+    "喝",
+    "菜",
+    "忌口",
+    "补品",
+    "保健品",
+    "食谱",
+    "菜谱",
+    "食用",
+    "食物",
+    "补品",
+    # 新增：
+    "营养",
+    "进食",
+    "摄入",
+    "饮食习惯",
+    "餐",
+    "水果",
+    "蔬菜",
+    "肉类",
+    "海鲜",
+    "主食",
+    "零食",
+    "小吃",
+    "点心",
+    "甜点",
+    "禁忌",
+    "宜吃",
+    "能吃",
+    "不能吃",
+    "可以吃",
+    "忌食",
+    "禁食",
+    "戒口",
+    "忌讳",
+    "营养品",
+    "滋补品",
+    "调理",
+    "食补",
+    "药膳",
+    "饮料",
+    "茶",
+    "汤",
+    "粥",
+    "清淡",
+    "辛辣",
+    "油腻",
+    "生冷",
+    "配餐",
+    "搭配",
+    "料理",
+]
+
+DRUG_REQUEST: List[str] = [
+    "药",
+    "药品",
+    "用药",
+    "胶囊",
+    "口服液",
+    "炎片",
+    # 新增：
+    "药物",
+    "medication",
+    "处方",
+    "非处方",
+    "片剂",
+    "颗粒",
+    "冲剂",
+    "糖浆",
+    "喷雾",
+    "注射",
+    "针剂",
+    "输液",
+    "滴剂",
+    "软膏",
+    "贴剂",
+    "中药",
+    "西药",
+    "汤药",
+    "中成药",
+    "消炎药",
+    "止痛药",
+    "退烧药",
+    "抗生素",
+    "服药",
+    "吃药",
+    "用药量",
+    "药量",
+    "剂量",
+    "疗程",
+    "停药",
+    "换药",
+    "配药",
+    "副作用",
+    "禁忌",
+    "相互作用",
+    "OTC",
+    "处方药",
+    "特效药",
+    "常用药",
+    "维生素",
+    "钙片",
+    "营养剂",
+]
+
+# 疑问词 -> 问题类型，与实体词一起编入同一个自动机
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "disease_symptom": SYMPTOM_REQUEST,
+    "disease_food": FOOD_REQUEST,
+    "disease_drug": DRUG_REQUEST,
+}
+
 
 class QuestionClassifier:
     """
@@ -11,274 +176,204 @@ class QuestionClassifier:
       将问句归类到红蜘蛛可支持的若干子类中，方便后续解析与答案搜索。
     """
 
-    def __init__(self) -> None:
+    def __init__(self, artifact_path: Optional[str] = None) -> None:
         cur_dir = os.path.dirname(os.path.abspath(__file__))
 
         # 特征词路径（注意：需要在 red_spider/dict/ 下准备好对应 txt 文件）
-        self.disease_path = os.path.join(cur_dir, "dict", "disease.txt")
-        self.drug_path = os.path.join(cur_dir, "dict", "drug.txt")
-        self.food_path = os.path.join(cur_dir, "dict", "food.txt")
-        self.symptom_path = os.path.join(cur_dir, "dict", "symptom.txt")
-
-        # 加载特征词
-        self.disease_words = [i.strip() for i in open(self.disease_path, encoding="utf-8") if i.strip()]
-        self.drug_words = [i.strip() for i in open(self.drug_path, encoding="utf-8") if i.strip()]
-        self.food_words = [i.strip() for i in open(self.food_path, encoding="utf-8") if i.strip()]
-        self.symptom_words = [i.strip() for i in open(self.symptom_path, encoding="utf-8") if i.strip()]
-
-        self.region_words = set(
-            self.disease_words + self.drug_words + self.food_words + self.symptom_words
+        self.dict_paths = {
+            t: os.path.join(cur_dir, "dict", "%s.txt" % t) for t in ENTITY_TYPES
+        }
+
+        # 预编译产物：AC 自动机 + “词 -> 类型列表”字典，按词典文件哈希校验
+        self.artifact_path = artifact_path or os.getenv(
+            "CLASSIFIER_ARTIFACT", os.path.join(cur_dir, "dict", "classifier.artifact")
         )
+        artifact = self.load_artifact()
+        if artifact is None:
+            artifact = self.build_artifact()
+            self.save_artifact(artifact)
 
-        # 构造领域 actree，加速关键词匹配查找
-        self.region_tree = self.build_actree(list(self.region_words))
-
-        # 构建“词 -> 类型列表”的字典
-        self.wdtype_dict = self.build_wdtype_dict()
-
-        # 问句疑问词，V1.0 仅支持症状、食物、药品的查询
-        self.symptom_request = [
-            "症状",
-            "表征",
-            "现象",
-            "症候",
-            "表现",
-            # 新增：
-            "不适",
-            "难受",
-            "疼痛",
-            "痛",
-            "酸痛",
-            "胀痛",
-            "反应",
-            "感觉",
-            "迹象",
-            "征兆",
-            "体征",
-            "病症",
-            "病状",
-            "毛病",
-            "问题",
-            "发作",
-            "复发",
-            "恶化",
-            "加重",
-            "并发症",
-            "后遗症",
-            "副作用",
-            "异常",
-            "不正常",
-            "不舒服",
-        ]
-        self.food_request = [
-            "饮食",
-            "饮用",
-            "吃",
-            "食",
-            "伙食",
-            "膳食",
-            "喝",
-            "菜",
-            "忌口",
-            "补品",
-            "保健品",
-            "食谱",
-            "菜谱",
-            "食用",
-            "食物",
-            "补品",
-            # 新增：
-            "营养",
-            "进食",
-            "摄入",
-            "饮食习惯",
-            "餐",
-            "水果",
-            "蔬菜",
-            "肉类",
-            "海鲜",
-            "主食",
-            "零食",
-            "小吃",
-            "点心",
-            "甜点",
-            "禁忌",
-            "宜吃",
-            "能吃",
-            "不能吃",
-            "可以吃",
-            "忌食",
-            "禁食",
-            "戒口",
-            "忌讳",
-            "营养品",
-            "滋补品",
-            "调理",
-            "食补",
-            "药膳",
-            "饮料",
-            "茶",
-            "汤",
-            "粥",
-            "清淡",
-            "辛辣",
-            "油腻",
-            "生冷",
-            "配餐",
-            "搭配",
-            "料理",
-        ]
-        self.drug_request = [
-            "药",
-            "药品",
-            "用药",
-            "胶囊",
-            "口服液",
-            "炎片",
-            # 新增：
-            "药物",
-            "medication",
-            "处方",
-            "非处方",
-            "片剂",
-            "颗粒",
-            "冲剂",
-            "糖浆",
-            "喷雾",
-            "注射",
-            "针剂",
-            "输液",
-            "滴剂",
-            "软膏",
-            "贴剂",
-            "中药",
-            "西药",
-            "汤药",
-            "中成药",
-            "消炎药",
-            "止痛药",
-            "退烧药",
-            "抗生素",
-            "服药",
-            "吃药",
-            "用药量",
-            "药量",
-            "剂量",
-            "疗程",
-            "停药",
-            "换药",
-            "配药",
-            "副作用",
-            "禁忌",
-            "相互作用",
-            "OTC",
-            "处方药",
-            "特效药",
-            "常用药",
-            "维生素",
-            "钙片",
-            "营养剂",
-        ]
+        # 领域 actree，加速关键词匹配查找
+        self.region_tree = artifact["automaton"]
+        # “词 -> 类型列表”的字典
+        self.wdtype_dict = artifact["wdtype_dict"]
 
         print("QuestionClassifier model init finished ......")
 
-    # 分类主函数
+    # 分类主函数：一次扫描同时得到实体与疑问词，问句耗时与词表长度无关
+    @traced("classify")
     def classify(self, question: str) -> Dict:
         data: Dict = {}
 
-        medical_dict = self.check_medical(question)
-        if not medical_dict:
+        entity_spans, intent_spans = self.scan(question)
+        if not entity_spans:
             return {}
 
+        medical_dict: Dict[str, List[str]] = {}
+        for span in entity_spans:
+            medical_dict.setdefault(span["word"], span["types"])
         data["args"] = medical_dict
 
         # 收集问句当中所涉及到的实体类型
-        types: List[str] = []
-        for type_list in medical_dict.values():
-            types += type_list
+        types = {t for type_list in medical_dict.values() for t in type_list}
+        intents = {t for span in intent_spans for t in span["types"]}
 
+        # 症状 / 推荐食物 / 推荐药品，均需问句中出现疾病
         question_types: List[str] = []
-
-        # 症状
-        if self.check_words(self.symptom_request, question) and ("disease" in types):
-            question_types.append("disease_symptom")
-
-        # 推荐食物
-        if self.check_words(self.food_request, question) and ("disease" in types):
-            question_types.append("disease_food")
-
-        # 推荐药品
-        if self.check_words(self.drug_request, question) and ("disease" in types):
-            question_types.append("disease_drug")
+        if "disease" in types:
+            question_types = [t for t in INTENT_KEYWORDS if t in intents]
 
         # 若没有查到相关的外部查询信息，那么则将该疾病的描述信息返回
         if question_types == [] and "symptom" in types:
             question_types = ["disease_symptom"]
 
-        # 组装成一个字典
+        # 组装成一个字典；spans 记录实体与疑问词在问句中的位置，供后续环节使用
         data["question_types"] = question_types
+        data["spans"] = sorted(entity_spans + intent_spans, key=lambda x: (x["start"], x["end"]))
         return data
 
-    # 构造关键词对应的节点类型
-    def build_wdtype_dict(self) -> Dict[str, List[str]]:
+    # 词典文件内容哈希，任一文件变化都会使产物失效
+    def dict_hashes(self) -> Dict[str, str]:
+        hashes: Dict[str, str] = {}
+        for t, path in self.dict_paths.items():
+            with open(path, "rb") as f:
+                hashes[t] = hashlib.sha256(f.read()).hexdigest()
+        # 疑问词表写在代码中，同样参与校验
+        intent_repr = repr(sorted((k, v) for k, v in INTENT_KEYWORDS.items()))
+        hashes["intents"] = hashlib.sha256(intent_repr.encode("utf-8")).hexdigest()
+        return hashes
+
+    # 读取预编译产物；不存在、版本不符或词典已变化时返回 None
+    def load_artifact(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.artifact_path, "rb") as f:
+                artifact = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+
+        if not isinstance(artifact, dict) or artifact.get("version") != ARTIFACT_VERSION:
+            return None
+        if artifact.get("dict_hashes") != self.dict_hashes():
+            print("词典文件已变化，重新构建分类器产物 ......")
+            return None
+        return artifact
+
+    # 从词典文件构建产物
+    def build_artifact(self) -> Dict[str, Any]:
+        words_by_type: Dict[str, List[str]] = {}
+        for t, path in self.dict_paths.items():
+            with open(path, encoding="utf-8") as f:
+                words_by_type[t] = [i.strip() for i in f if i.strip()]
+
+        wdtype_dict = self.build_wdtype_dict(words_by_type)
+        return {
+            "version": ARTIFACT_VERSION,
+            "dict_hashes": self.dict_hashes(),
+            "automaton": self.build_actree(wdtype_dict, INTENT_KEYWORDS),
+            "wdtype_dict": wdtype_dict,
+        }
+
+    # 原子写入产物（先写临时文件再替换），多个 worker 同时重建也不会读到半个文件
+    def save_artifact(self, artifact: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.artifact_path)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.artifact_path)
+        except OSError as e:
+            if "tmp_path" in locals() and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # 只读文件系统等情况下无法缓存产物，不影响本次使用
+            print("分类器产物写入失败：", e)
+
+    # 构造关键词对应的节点类型：一次遍历各类词表，O(总词数)
+    def build_wdtype_dict(self, words_by_type: Dict[str, List[str]]) -> Dict[str, List[str]]:
         word_dict: Dict[str, List[str]] = {}
-        for word in self.region_words:
-            word_dict[word] = []
-
-            # 检查是否有疾病关键词
-            if word in self.disease_words:
-                word_dict[word].append("disease")
-
-            # 检查是否有药品关键词
-            if word in self.drug_words:
-                word_dict[word].append("drug")
-
-            # 检查是否有食物关键词
-            if word in self.food_words:
-                word_dict[word].append("food")
-
-            # 检查是否有症状关键词
-            if word in self.symptom_words:
-                word_dict[word].append("symptom")
-
+        for t in ENTITY_TYPES:
+            for word in words_by_type.get(t, []):
+                types = word_dict.setdefault(word, [])
+                if not types or types[-1] != t:
+                    types.append(t)
         return word_dict
 
-    # 构造 actree 加速过滤
-    def build_actree(self, wordlist: List[str]):
+    # 构造 actree：实体词与疑问词编入同一个自动机，值为 (词, 实体类型, 问题类型)
+    def build_actree(
+        self, wdtype_dict: Dict[str, List[str]], intent_keywords: Dict[str, List[str]]
+    ):
+        intents_by_word: Dict[str, List[str]] = {}
+        for question_type, words in intent_keywords.items():
+            for word in words:
+                intents = intents_by_word.setdefault(word, [])
+                if question_type not in intents:
+                    intents.append(question_type)
+
         actree = ahocorasick.Automaton()
-        for index, word in enumerate(wordlist):
-            actree.add_word(word, (index, word))
+        for word in set(wdtype_dict) | set(intents_by_word):
+            actree.add_word(
+                word,
+                (word, tuple(wdtype_dict.get(word, ())), tuple(intents_by_word.get(word, ()))),
+            )
         actree.make_automaton()
         return actree
 
+    # 单次扫描问句：
+    # - 疑问词取全部命中（与原先的子串判断一致）
+    # - 实体按“最左最长、互不重叠”取舍，去掉被更长实体覆盖的子词
+    # 返回的 span 中 end 为开区间下标
+    def scan(self, question: str) -> Tuple[List[Dict], List[Dict]]:
+        # 每个起点只保留最长的实体命中
+        longest: Dict[int, Tuple[int, str, Tuple[str, ...]]] = {}
+        intent_spans: List[Dict] = []
+        for end_idx, (word, entity_types, intents) in self.region_tree.iter(question):
+            start = end_idx - len(word) + 1
+            if intents:
+                intent_spans.append(
+                    {
+                        "kind": "intent",
+                        "word": word,
+                        "start": start,
+                        "end": end_idx + 1,
+                        "types": list(intents),
+                    }
+                )
+            if entity_types and (start not in longest or longest[start][0] <= end_idx):
+                longest[start] = (end_idx + 1, word, entity_types)
+
+        # 线性扫描：从左到右贪心选取不重叠的实体
+        entity_spans: List[Dict] = []
+        cursor = 0
+        for start in sorted(longest):
+            if start < cursor:
+                continue
+            end, word, entity_types = longest[start]
+            entity_spans.append(
+                {
+                    "kind": "entity",
+                    "word": word,
+                    "start": start,
+                    "end": end,
+                    "types": list(entity_types),
+                }
+            )
+            cursor = end
+        return entity_spans, intent_spans
+
     # 问句检查：识别问句里出现了哪些医疗相关实体
     def check_medical(self, question: str) -> Dict[str, List[str]]:
-        region_words: List[str] = []
-
-        # 利用 ac-tree 加速查询关键词
-        for _, (_, word) in self.region_tree.iter(question):
-            region_words.append(word)
-
-        # 子词进入停用词表
-        stop_words: List[str] = []
-        for word1 in region_words:
-            for word2 in region_words:
-                if word1 in word2 and word1 != word2:
-                    stop_words.append(word1)
-
-        final_words = [i for i in region_words if i not in stop_words]
-        final_dict = {i: self.wdtype_dict.get(i, []) for i in final_words}
-        return final_dict
-
-    # 基于特征词进行问句检测，并进行问句类型的规则分类
-    def check_words(self, words: List[str], sent: str) -> bool:
-        for word in words:
-            if word in sent:
-                return True
-        return False
+        entity_spans, _ = self.scan(question)
+        return {span["word"]: span["types"] for span in entity_spans}
 
 
 if __name__ == "__main__":
+    # 构建步骤：python question_classifier.py --build
+    if "--build" in sys.argv[1:]:
+        qc = QuestionClassifier()
+        qc.save_artifact(qc.build_artifact())
+        print("分类器产物已生成：", qc.artifact_path)
+        sys.exit(0)
+
     qc = QuestionClassifier()
     while True:
         question = input("input a question: ")
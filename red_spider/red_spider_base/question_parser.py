@@ -1,5 +1,24 @@
 from typing import Dict, List, Any
 
+from tracing import traced
+
+
+# 问题类型 -> 图谱中的关系类型（目前三类问题都以疾病为起点）
+QUESTION_TYPE_RELS: Dict[str, str] = {
+    "disease_symptom": "has_symptom",
+    "disease_food": "recommand_eat",
+    "disease_drug": "recommand_drug",
+}
+
+# 一次请求只发一条参数化查询：所有疾病 × 所有关系类型，按（疾病, 关系）分组返回。
+# 语句文本固定不变，Neo4j 可以复用执行计划；参数化也避免了拼接字符串带来的注入问题。
+RELATION_QUERY = (
+    "UNWIND $diseases AS name "
+    "MATCH (m:Disease {name: name})-[r]->(n) "
+    "WHERE type(r) IN $rel_types "
+    "RETURN m.name, type(r), collect(n.name)"
+)
+
 
 class QuestionPaser:  # 保持与你提供的类名一致（原版就是 Paser）
     """
@@ -19,19 +38,24 @@ class QuestionPaser:  # 保持与你提供的类名一致（原版就是 Paser
                     entity_dict[t].append(arg)
         return entity_dict
 
-    # 解析主函数：把分类结果转成一组 cypher 语句
+    # 解析主函数：把分类结果转成一条参数化 cypher 查询
+    @traced("parser_main")
     def parser_main(self, res_classify: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         输入示例：
         {
             "args": {"感冒": ["disease"]},
-            "question_types": ["disease_symptom"]
+            "question_types": ["disease_symptom", "disease_drug"]
         }
-        输出示例：
+        输出示例（一次请求只有一条查询）：
         [
             {
-                "question_type": "disease_symptom",
-                "sql": ["MATCH ... RETURN ...", ...]
+                "question_types": ["disease_symptom", "disease_drug"],
+                "sql": RELATION_QUERY,
+                "params": {
+                    "diseases": ["感冒"],
+                    "rel_types": ["has_symptom", "recommand_drug"]
+                }
             }
         ]
         """
@@ -45,67 +69,35 @@ class QuestionPaser:  # 保持与你提供的类名一致（原版就是 Paser
 
         entity_dict = self.build_entitydict(args)
 
-        sqls: List[Dict[str, Any]] = []
-        for question_type in question_types:
-            sql_item: Dict[str, Any] = {"question_type": question_type}
-
-            # 按照不同的分类结果，组装不同的 cypher 查询语句
-            if question_type in ("disease_symptom", "disease_food", "disease_drug"):
-                # 目前这三类都只依赖疾病实体
-                entities = entity_dict.get("disease")
-                sql_list = self.sql_transfer(question_type, entities)
-            else:
-                # 其他类型暂不支持
-                sql_list = []
-
-            if sql_list:
-                sql_item["sql"] = sql_list
-                sqls.append(sql_item)
-
-        return sqls
-
-    # 针对不同的问题，分开进行处理
-    def sql_transfer(self, question_type: str, entities: List[str]) -> List[str]:
-        if not entities:
-            return []
+        # 按照不同的分类结果，组装查询；目前三类都只依赖疾病实体，其他类型暂不支持
+        supported = [qt for qt in question_types if qt in QUESTION_TYPE_RELS]
+        sql_item = self.sql_transfer(supported, entity_dict.get("disease"))
+        return [sql_item] if sql_item else []
+
+    # 组装参数化查询：疾病列表与关系类型列表都作为参数传入
+    def sql_transfer(self, question_types: List[str], entities: List[str]) -> Dict[str, Any]:
+        if not entities or not question_types:
+            return {}
+
+        return {
+            "question_types": question_types,
+            "sql": RELATION_QUERY,
+            "params": {
+                "diseases": list(dict.fromkeys(entities)),
+                "rel_types": [QUESTION_TYPE_RELS[qt] for qt in question_types],
+            },
+        }
 
-        # 查询语句列表
-        sql: List[str] = []
-
-        # 查询疾病有哪些症状
-        if question_type == "disease_symptom":
-            sql = [
-                (
-                    "MATCH (m:Disease)-[r:has_symptom]->(n:Symptom) "
-                    "WHERE m.name = '{0}' "
-                    "RETURN m.name, r.name, n.name"
-                ).format(i)
-                for i in entities
-            ]
-
-        # 查询疾病建议吃的东西
-        elif question_type == "disease_food":
-            sql = [
-                (
-                    "MATCH (m:Disease)-[r:recommand_eat]->(n:Food) "
-                    "WHERE m.name = '{0}' "
-                    "RETURN m.name, r.name, n.name"
-                ).format(i)
-                for i in entities
-            ]
-
-        # 查询疾病常用药品
-        elif question_type == "disease_drug":
-            sql = [
-                (
-                    "MATCH (m:Disease)-[r:recommand_drug]->(n:Drug) "
-                    "WHERE m.name = '{0}' "
-                    "RETURN m.name, r.name, n.name"
-                ).format(i)
-                for i in entities
-            ]
-
-        return sql
+    # 合并多个问句的查询：疾病与关系类型取并集，批量问答时只查一次图谱
+    # 各问句再用自己的 sql_ 从合并结果中取出所需的行（见 AnswerSearcher.answers_from_rows）
+    def merge_sqls(self, sqls_list: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        question_types: Dict[str, None] = {}
+        diseases: Dict[str, None] = {}
+        for sqls in sqls_list:
+            for sql_ in sqls:
+                question_types.update(dict.fromkeys(sql_.get("question_types", [])))
+                diseases.update(dict.fromkeys(sql_.get("params", {}).get("diseases", [])))
+        return self.sql_transfer(list(question_types), list(diseases))
 
 
 if __name__ == "__main__":
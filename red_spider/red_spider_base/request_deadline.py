@@ -0,0 +1,102 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 超时后没有任何可用答案时的提示
+DEADLINE_MESSAGE = "抱歉，本次回答超时，请稍后重试或简化问题。如症状严重，请及时就医。"
+# 流式回答已推送部分内容后超时，追加的截断提示
+TRUNCATED_NOTE = "\n（回答超时，已截断）"
+
+# 当前请求的截止时间（time.monotonic() 绝对值），None 表示不限时；
+# 使用 ContextVar，并发请求各自独立，create_task 派生的任务自动继承
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求的整体时间预算已用完。"""
+
+
+# 设置当前请求的时间预算（秒），退出时恢复；seconds 为 None 或 <= 0 表示不限时
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    deadline = time.monotonic() + seconds if seconds and seconds > 0 else None
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+# 距截止时间的剩余秒数（不小于 0）；未设置截止时间时返回 None
+def remaining(deadline: Optional[float] = None) -> Optional[float]:
+    deadline = deadline if deadline is not None else _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired(deadline: Optional[float] = None) -> bool:
+    left = remaining(deadline)
+    return left is not None and left <= 0
+
+
+# 各阶段自身的超时（Neo4j 事务超时、LLM 请求超时）取默认值与剩余预算中较小者
+def timeout_for(default: Optional[float] = None) -> Optional[float]:
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
+
+
+# 外部调用（如 DeepSeek）单次尝试的超时：取配置的超时与 deadline 剩余时间中较小者
+def attempt_timeout(timeout: float, deadline: Optional[float] = None) -> float:
+    if deadline is None:
+        return timeout
+    return max(0.0, min(timeout, deadline - time.monotonic()))
+
+
+# 单次尝试超时后调用：尝试的超时被请求预算缩短过，或预算已用完时抛出 DeadlineExceeded。
+# 这类超时由客户端给出的预算决定，不说明依赖服务不可用，调用方不应计入熔断
+def raise_if_deadline_limited(timeout: float, limit: float, deadline: Optional[float], exc: BaseException) -> None:
+    if deadline is not None and (limit < timeout or expired(deadline)):
+        raise DeadlineExceeded() from exc
+
+
+# 在剩余预算内等待 aw，超时（或预算已用完）时取消 aw 并抛出 DeadlineExceeded
+async def run_with_deadline(aw: Awaitable[T]) -> T:
+    left = remaining()
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded()
+    try:
+        return await asyncio.wait_for(aw, left)
+    except asyncio.TimeoutError:
+        if expired():
+            raise DeadlineExceeded() from None
+        raise
+
+
+# 逐项迭代异步生成器，每一项都受剩余预算约束；超时时关闭生成器并抛出 DeadlineExceeded
+async def aiter_with_deadline(agen: AsyncIterator[T]) -> AsyncIterator[T]:
+    try:
+        while True:
+            try:
+                item = await run_with_deadline(agen.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        aclose = getattr(agen, "aclose", None)
+        if aclose is not None:
+            await aclose()
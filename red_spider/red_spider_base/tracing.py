@@ -0,0 +1,147 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+# 单个请求的追踪记录：按开始顺序保存各阶段 span
+class Trace:
+    def __init__(self, name: str, **attrs: Any) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs)
+        self.spans: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def finish(self) -> None:
+        if self.duration_ms is None:
+            self.duration_ms = round(self.elapsed_ms(), 3)
+
+    # 各阶段累计耗时（毫秒），同名 span（如批量中的多次 classify）求和
+    def stages(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for span_ in self.spans:
+            if span_["duration_ms"] is not None:
+                totals[span_["name"]] = round(totals.get(span_["name"], 0.0) + span_["duration_ms"], 3)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms if self.duration_ms is not None else round(self.elapsed_ms(), 3),
+            "attrs": self.attrs,
+            "stages": self.stages(),
+            "spans": self.spans,
+        }
+
+
+# 当前请求的 Trace 与当前所在的 span（作为子 span 的 parent）；未开启追踪时为 None，
+# span() 直接跳过，对未追踪的调用几乎没有开销
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+# 开启一次追踪，with 块内（包括派生的异步任务）的 span 都记录到该 Trace
+@contextmanager
+def start_trace(name: str, **attrs: Any) -> Iterator[Trace]:
+    trace = Trace(name, **attrs)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+# 记录一个阶段；异常会记在 span 的 error 字段后继续抛出
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    record: Dict[str, Any] = {
+        "name": name,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": _current_span.get(),
+        "start_ms": round(trace.elapsed_ms(), 3),
+        "duration_ms": None,
+        "attrs": dict(attrs),
+    }
+    trace.spans.append(record)
+    token = _current_span.set(record["span_id"])
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as exc:
+        record["error"] = type(exc).__name__
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # 异步生成器在其他上下文中被关闭时无法复原，忽略即可
+            pass
+
+
+# 装饰器：把整个函数（普通函数或协程函数）记录为一个 span
+def traced(name: str) -> Callable[[Callable], Callable]:
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# 给当前 Trace 附加属性（如最终的答案来源）
+def annotate(**attrs: Any) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+_export_lock = threading.Lock()
+
+
+# 以 JSON Lines 追加写入追踪记录，便于离线分析慢请求
+def export_jsonl(trace: Trace, path: str) -> None:
+    line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+    directory = os.path.dirname(path)
+    with _export_lock:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
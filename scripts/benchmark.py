@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+CPU 热路径基准测试：问题分类、问句解析、高危症状检测、答案格式化
+
+无需 Neo4j 与网络：问句由 red_spider_base/dict/*.txt 按固定随机种子生成
+（单实体 / 多实体 / 疑问词 / 高危症状 / 无实体），答案格式化使用构造的查询结果。
+
+被测函数：
+- QuestionClassifier.classify
+- QuestionPaser.parser_main（输入为预先分类好的结果）
+- detect_emergency_keywords（backend/app/utils/emergency.py）
+- AnswerSearcher.answer_prettify（输入为构造的 (疾病, [名称, ...]) 列表）
+
+每项报告 ops/sec（多轮取中位数与最好值）以及 tracemalloc 统计的
+单次调用平均 / 最大峰值内存，和跑完一轮后仍未释放的内存。
+
+使用方法：
+  python scripts/benchmark.py                                  # 只输出结果
+  python scripts/benchmark.py --save bench/master.json         # 在 master 上保存基线
+  python scripts/benchmark.py --compare bench/master.json      # 在分支上与基线对比
+  python scripts/benchmark.py --compare bench/master.json --max-regression 0.1
+                                                               # 任一项变慢超过 10% 时退出码为 1
+  python scripts/benchmark.py --only classify --only parser_main
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RED_SPIDER_BASE = REPO_ROOT / "red_spider" / "red_spider_base"
+BACKEND_DIR = REPO_ROOT / "backend"
+DICT_DIR = RED_SPIDER_BASE / "dict"
+
+for path in (RED_SPIDER_BASE, BACKEND_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# 基准测试不查询图谱，避免 AnswerSearcher 初始化时启动内存镜像等后台加载
+os.environ["GRAPH_BACKEND"] = "neo4j"
+
+from answer_search import ANSWER_TEMPLATES, AnswerSearcher  # noqa: E402
+from question_classifier import INTENT_KEYWORDS, QuestionClassifier  # noqa: E402
+from question_parser import QuestionPaser  # noqa: E402
+
+from app.utils.emergency import EMERGENCY_KEYWORDS, detect_emergency_keywords  # noqa: E402
+
+# 不含任何实体的日常问句，覆盖分类器“未命中”的路径
+SMALL_TALK = [
+    "你好",
+    "今天天气怎么样",
+    "你是谁",
+    "最近睡不好怎么办",
+    "体检报告怎么看",
+    "医保可以报销吗",
+]
+
+NEGATIONS = ["没有", "不", "并无"]
+
+
+def load_words(name: str) -> List[str]:
+    """读取词典文件，去掉空行。"""
+    with open(DICT_DIR / f"{name}.txt", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+# ---------------------------------------------------------------------------
+# 问句生成
+# ---------------------------------------------------------------------------
+def generate_questions(size: int, seed: int) -> Dict[str, List[str]]:
+    """
+    按类别生成问句，每类 size 条：
+    - single_entity：一个疾病 + 一个疑问词
+    - multi_entity：两到三个疾病 + 一到两个疑问词
+    - symptom_only：只有症状，没有疑问词
+    - emergency：高危症状（含否定句式）
+    - no_entity：日常问句
+    """
+    rng = random.Random(seed)
+    diseases = load_words("disease")
+    symptoms = load_words("symptom")
+    intents = [word for words in INTENT_KEYWORDS.values() for word in words]
+
+    questions: Dict[str, List[str]] = {
+        "single_entity": [],
+        "multi_entity": [],
+        "symptom_only": [],
+        "emergency": [],
+        "no_entity": [],
+    }
+    for _ in range(size):
+        questions["single_entity"].append(
+            f"{rng.choice(diseases)}有哪些{rng.choice(intents)}"
+        )
+
+        picked = rng.sample(diseases, rng.randint(2, 3))
+        asked = rng.sample(intents, rng.randint(1, 2))
+        questions["multi_entity"].append(f"{'和'.join(picked)}的{'、'.join(asked)}是什么")
+
+        questions["symptom_only"].append(f"最近总是{rng.choice(symptoms)}，怎么回事")
+
+        keyword = rng.choice(EMERGENCY_KEYWORDS)
+        if rng.random() < 0.3:
+            questions["emergency"].append(
+                f"{rng.choice(NEGATIONS)}{keyword}，只是{rng.choice(symptoms)}"
+            )
+        else:
+            questions["emergency"].append(f"突然{keyword}，还有点{rng.choice(symptoms)}")
+
+        questions["no_entity"].append(rng.choice(SMALL_TALK))
+    return questions
+
+
+def generate_prettify_inputs(size: int, seed: int) -> List[Tuple[str, List[Tuple[str, List[str]]]]]:
+    """构造 answer_prettify 的输入：(问题类型, [(疾病, [名称, ...]), ...])，名称含重复与空值。"""
+    rng = random.Random(seed)
+    diseases = load_words("disease")
+    targets = {
+        "disease_symptom": load_words("symptom"),
+        "disease_food": load_words("food"),
+        "disease_drug": load_words("drug"),
+    }
+    question_types = list(ANSWER_TEMPLATES)
+
+    inputs = []
+    for _ in range(size):
+        question_type = rng.choice(question_types)
+        answers = []
+        for disease in rng.sample(diseases, rng.randint(1, 3)):
+            names = rng.choices(targets[question_type], k=rng.randint(3, 25))
+            names += rng.sample(names, min(3, len(names))) + [""]
+            answers.append((disease, names))
+        inputs.append((question_type, answers))
+    return inputs
+
+
+# ---------------------------------------------------------------------------
+# 计时与内存统计
+# ---------------------------------------------------------------------------
+def _run_pass(func: Callable[[Any], Any], inputs: Sequence[Any]) -> float:
+    start = time.perf_counter()
+    for item in inputs:
+        func(item)
+    return time.perf_counter() - start
+
+
+def measure(
+    func: Callable[[Any], Any],
+    inputs: Sequence[Any],
+    repeat: int,
+    min_time: float,
+) -> Dict[str, float]:
+    """
+    对 inputs 逐个调用 func，共 repeat 轮，每轮至少运行 min_time 秒。
+    与 timeit 一致，计时期间关闭 GC；内存统计单独再跑一遍，避免 tracemalloc 影响计时。
+    """
+    # 预热：首次调用可能触发懒加载
+    _run_pass(func, inputs)
+
+    rates: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            elapsed = 0.0
+            ops = 0
+            while elapsed < min_time:
+                elapsed += _run_pass(func, inputs)
+                ops += len(inputs)
+            rates.append(ops / elapsed)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # 每次调用单独统计峰值：调用期间相对调用前新增的内存
+    gc.collect()
+    peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for item in inputs:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func(item)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(rates)
+    return {
+        "ops_per_sec": round(median, 1),
+        "ops_per_sec_best": round(max(rates), 1),
+        "us_per_op": round(1e6 / median, 3),
+        "peak_bytes_per_op": round(statistics.mean(peaks), 1),
+        "max_peak_bytes": max(peaks),
+        "retained_bytes": current - baseline,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 基准项
+# ---------------------------------------------------------------------------
+def build_benchmarks(size: int, seed: int) -> Dict[str, Tuple[Callable[[Any], Any], List[Any]]]:
+    """返回 {名称: (被测函数, 输入列表)}。"""
+    questions = generate_questions(size, seed)
+    all_questions = [q for group in questions.values() for q in group]
+
+    classifier = QuestionClassifier()
+    parser = QuestionPaser()
+    searcher = AnswerSearcher()
+    # 只用到格式化，不需要连接
+    searcher.driver.close()
+
+    classified = [classifier.classify(q) for q in all_questions]
+    parsable = [res for res in classified if res]
+
+    benchmarks: Dict[str, Tuple[Callable[[Any], Any], List[Any]]] = {}
+    for group, items in questions.items():
+        benchmarks[f"classify[{group}]"] = (classifier.classify, items)
+    benchmarks["classify"] = (classifier.classify, all_questions)
+    benchmarks["parser_main"] = (parser.parser_main, parsable)
+    benchmarks["detect_emergency[emergency]"] = (detect_emergency_keywords, questions["emergency"])
+    benchmarks["detect_emergency"] = (detect_emergency_keywords, all_questions)
+    benchmarks["answer_prettify"] = (
+        lambda args: searcher.answer_prettify(*args),
+        generate_prettify_inputs(size, seed),
+    )
+    return benchmarks
+
+
+# ---------------------------------------------------------------------------
+# 基线保存与对比
+# ---------------------------------------------------------------------------
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(path: str, meta: Dict[str, Any], results: Dict[str, Dict[str, float]]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"\n基线已保存到 {path}")
+
+
+def compare(
+    baseline: Dict[str, Any],
+    results: Dict[str, Dict[str, float]],
+    max_regression: Optional[float],
+) -> bool:
+    """打印与基线的对比；任一项变慢超过 max_regression 时返回 False。"""
+    meta = baseline.get("meta", {})
+    print(f"\n与基线对比（{meta.get('git_revision') or '未知版本'}，{meta.get('created_at', '')}）：")
+    print(f"{'benchmark':<32}{'baseline ops/s':>16}{'ops/s':>14}{'change':>10}{'peak B/op':>12}")
+
+    ok = True
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<32}{'-':>16}{result['ops_per_sec']:>14,.0f}{'new':>10}")
+            continue
+        change = result["ops_per_sec"] / base["ops_per_sec"] - 1
+        peak_change = result["peak_bytes_per_op"] - base["peak_bytes_per_op"]
+        flag = ""
+        if max_regression is not None and change < -max_regression:
+            flag = "  <- 变慢"
+            ok = False
+        print(
+            f"{name:<32}{base['ops_per_sec']:>16,.0f}{result['ops_per_sec']:>14,.0f}"
+            f"{change:>+10.1%}{peak_change:>+12.0f}{flag}"
+        )
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="红蜘蛛 CPU 热路径基准测试")
+    parser.add_argument("--size", type=int, default=200, help="每类生成的问句数（默认 200）")
+    parser.add_argument("--seed", type=int, default=20240601, help="问句生成的随机种子")
+    parser.add_argument("--repeat", type=int, default=5, help="计时轮数，取中位数（默认 5）")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少运行秒数（默认 0.2）")
+    parser.add_argument("--only", action="append", default=[], help="只运行名称以此开头的基准，可重复")
+    parser.add_argument("--save", metavar="PATH", help="把结果保存为基线 JSON")
+    parser.add_argument("--compare", metavar="PATH", help="与基线 JSON 对比")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="与基线对比时允许的最大变慢比例（如 0.1），超过时退出码为 1",
+    )
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks(args.size, args.seed)
+    if args.only:
+        benchmarks = {
+            name: bench for name, bench in benchmarks.items()
+            if any(name.startswith(prefix) for prefix in args.only)
+        }
+
+    print(f"\n{'benchmark':<32}{'inputs':>8}{'ops/s':>14}{'best ops/s':>14}{'us/op':>10}{'peak B/op':>12}")
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (func, inputs) in benchmarks.items():
+        result = measure(func, inputs, args.repeat, args.min_time)
+        results[name] = result
+        print(
+            f"{name:<32}{len(inputs):>8}{result['ops_per_sec']:>14,.0f}"
+            f"{result['ops_per_sec_best']:>14,.0f}{result['us_per_op']:>10.2f}"
+            f"{result['peak_bytes_per_op']:>12.0f}"
+        )
+
+    meta = {
+        "git_revision": _git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": args.size,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "min_time": args.min_time,
+    }
+    if args.save:
+        save_baseline(args.save, meta, results)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        base_meta = baseline.get("meta", {})
+        if (base_meta.get("size"), base_meta.get("seed")) != (args.size, args.seed):
+            print("⚠️  基线的 --size / --seed 与本次不同，对比结果可能不可比")
+        if not compare(baseline, results, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+内存图谱：代替 Neo4j 回答 AnswerSearcher 的查询。
+
+AnswerSearcher 只发一种查询（question_parser.RELATION_QUERY）：
+参数 diseases / rel_types，返回 [疾病, 关系类型, [目标名称, ...]] 行。
+InMemoryDriver / InMemoryAsyncDriver 实现了 red_spider 与 neo4j_client 用到的驱动接口
+（session / run / values / data / single / consume / close），可直接注入 Red_Spider。
+
+邻居由 red_spider_base/dict/*.txt 按 (种子, 疾病, 关系) 确定性生成，不占用额外内存；
+每次查询按 LatencyModel 采样延迟，模拟 Neo4j 的往返耗时。
+"""
+
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from latency import LatencyModel
+
+DICT_DIR = Path(__file__).resolve().parents[2] / "red_spider" / "red_spider_base" / "dict"
+
+# 关系类型 -> 目标实体词典
+REL_TARGETS: Dict[str, str] = {
+    "has_symptom": "symptom",
+    "recommand_eat": "food",
+    "recommand_drug": "drug",
+}
+
+
+def _load_words(name: str) -> List[str]:
+    with open(DICT_DIR / f"{name}.txt", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class InMemoryGraph:
+    """
+    疾病 -> 关系 -> 目标名称的合成图谱。
+
+    coverage 为有邻居的疾病比例（其余疾病查不到结果，走 LLM 兜底）；
+    每个 (疾病, 关系) 有 min_edges ~ max_edges 个邻居。
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        coverage: float = 1.0,
+        min_edges: int = 3,
+        max_edges: int = 15,
+        latency: Optional[LatencyModel] = None,
+    ) -> None:
+        self.seed = seed
+        self.coverage = coverage
+        self.min_edges = min_edges
+        self.max_edges = max_edges
+        self.latency = latency or LatencyModel()
+        self.diseases = set(_load_words("disease"))
+        self.targets = {rel: _load_words(name) for rel, name in REL_TARGETS.items()}
+        self.queries = 0
+
+    def neighbours(self, disease: str, rel_type: str) -> List[str]:
+        targets = self.targets.get(rel_type)
+        if disease not in self.diseases or not targets:
+            return []
+        rng = random.Random(f"{self.seed}:{disease}:{rel_type}")
+        # 同一疾病的各关系共用覆盖判定，未覆盖的疾病完全查不到
+        if random.Random(f"{self.seed}:{disease}").random() >= self.coverage:
+            return []
+        return rng.sample(targets, rng.randint(self.min_edges, self.max_edges))
+
+    def lookup(self, diseases: Sequence[str], rel_types: Sequence[str]) -> List[List[Any]]:
+        """与 RELATION_QUERY 结构相同的结果行。"""
+        self.queries += 1
+        rows: List[List[Any]] = []
+        for disease in dict.fromkeys(diseases):
+            for rel_type in rel_types:
+                names = self.neighbours(disease, rel_type)
+                if names:
+                    rows.append([disease, rel_type, names])
+        return rows
+
+    def execute(self, query: Any, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[List[Any]]:
+        """按查询的形状给出结果：关系查询、RETURN 1（连通性检查 / 保活）、其余返回空。"""
+        params = {**(params or {}), **kwargs}
+        if "diseases" in params:
+            return self.lookup(params["diseases"], params.get("rel_types", []))
+        text = str(getattr(query, "text", query)).strip().upper()
+        if text == "RETURN 1":
+            return [[1]]
+        return []
+
+
+class _Result:
+    def __init__(self, rows: List[List[Any]]) -> None:
+        self._rows = rows
+
+    def values(self) -> List[List[Any]]:
+        return self._rows
+
+    def data(self) -> List[Dict[str, Any]]:
+        return [{str(i): v for i, v in enumerate(row)} for row in self._rows]
+
+    def single(self) -> Optional[List[Any]]:
+        return self._rows[0] if self._rows else None
+
+    def consume(self) -> None:
+        return None
+
+
+class _AsyncResult(_Result):
+    async def values(self) -> List[List[Any]]:  # type: ignore[override]
+        return self._rows
+
+    async def data(self) -> List[Dict[str, Any]]:  # type: ignore[override]
+        return _Result.data(self)
+
+    async def single(self) -> Optional[List[Any]]:  # type: ignore[override]
+        return _Result.single(self)
+
+    async def consume(self) -> None:  # type: ignore[override]
+        return None
+
+
+class _Session:
+    def __init__(self, graph: InMemoryGraph) -> None:
+        self.graph = graph
+
+    def run(self, query: Any, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> _Result:
+        time.sleep(self.graph.latency.sample())
+        return _Result(self.graph.execute(query, parameters, **kwargs))
+
+    def close(self) -> None:
+        return None
+
+    def __enter__(self) -> "_Session":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+class _AsyncSession:
+    def __init__(self, graph: InMemoryGraph) -> None:
+        self.graph = graph
+
+    async def run(self, query: Any, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> _AsyncResult:
+        await asyncio.sleep(self.graph.latency.sample())
+        return _AsyncResult(self.graph.execute(query, parameters, **kwargs))
+
+    async def close(self) -> None:
+        return None
+
+    async def __aenter__(self) -> "_AsyncSession":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+class InMemoryDriver:
+    """同步驱动替身。"""
+
+    def __init__(self, graph: InMemoryGraph) -> None:
+        self.graph = graph
+
+    def session(self, **kwargs: Any) -> _Session:
+        return _Session(self.graph)
+
+    def verify_connectivity(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+class InMemoryAsyncDriver:
+    """异步驱动替身。"""
+
+    def __init__(self, graph: InMemoryGraph) -> None:
+        self.graph = graph
+
+    def session(self, **kwargs: Any) -> _AsyncSession:
+        return _AsyncSession(self.graph)
+
+    async def verify_connectivity(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
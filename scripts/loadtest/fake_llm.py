@@ -0,0 +1,155 @@
+"""
+假的 OpenAI 兼容服务：代替 DeepSeek，供压测使用。
+
+实现 AsyncDeepSeekClient 用到的两个接口（同时挂在 / 与 /v1 下）：
+- POST /chat/completions：普通与流式（stream=true，SSE）两种返回
+- GET  /models：启动预热时调用
+
+通过环境变量配置（多 worker 启动时每个进程读取同一份配置）：
+- FAKE_LLM_LATENCY     延迟分布，见 latency.py（默认 "lognormal:800:0.5"，流式为首个片段前的延迟）
+- FAKE_LLM_TOKEN_MS    流式时相邻片段的间隔（毫秒，默认 20）
+- FAKE_LLM_TOKENS      每个回答的片段数（默认 40）
+- FAKE_LLM_429_RATE    返回 429 的概率（0 ~ 1，默认 0）
+- FAKE_LLM_RETRY_AFTER 429 响应的 Retry-After（秒，默认 1）
+- FAKE_LLM_SEED        随机种子
+
+单独启动：
+  uvicorn --app-dir scripts/loadtest fake_llm:create_fake_llm_app --factory --port 9100
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from latency import LatencyModel
+
+ANSWER_PIECES = [
+    "根据您的描述，", "这种情况", "可能与", "作息不规律", "或", "精神压力", "有关。",
+    "建议", "保持", "规律作息，", "清淡饮食，", "适量运动。", "如症状", "持续或加重，",
+    "请及时", "就医。",
+]
+
+
+class FakeLLMConfig:
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        token_ms: float = 20.0,
+        tokens: int = 40,
+        error_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency or LatencyModel()
+        self.token_ms = token_ms
+        self.tokens = max(1, tokens)
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        seed = os.getenv("FAKE_LLM_SEED")
+        seed_value = int(seed) if seed else None
+        return cls(
+            latency=LatencyModel.parse(os.getenv("FAKE_LLM_LATENCY", "lognormal:800:0.5"), seed_value),
+            token_ms=float(os.getenv("FAKE_LLM_TOKEN_MS", "20")),
+            tokens=int(os.getenv("FAKE_LLM_TOKENS", "40")),
+            error_rate=float(os.getenv("FAKE_LLM_429_RATE", "0")),
+            retry_after=float(os.getenv("FAKE_LLM_RETRY_AFTER", "1")),
+            seed=seed_value,
+        )
+
+
+def create_fake_llm_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    config = config or FakeLLMConfig.from_env()
+    app = FastAPI(title="Fake OpenAI-compatible LLM")
+    stats: Dict[str, int] = {"requests": 0, "rate_limited": 0, "streams": 0}
+
+    def pieces() -> list:
+        return [ANSWER_PIECES[i % len(ANSWER_PIECES)] for i in range(config.tokens)]
+
+    async def completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        stats["requests"] += 1
+        model = body.get("model", "deepseek-chat")
+
+        if config.rng.random() < config.error_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": f"{config.retry_after:g}"},
+                content={
+                    "error": {
+                        "message": "Rate limit reached (injected by fake LLM)",
+                        "type": "rate_limit_error",
+                        "code": "rate_limit_exceeded",
+                    }
+                },
+            )
+
+        await asyncio.sleep(config.latency.sample())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            stats["streams"] += 1
+
+            async def chunks() -> AsyncIterator[str]:
+                for i, piece in enumerate(pieces()):
+                    if i:
+                        await asyncio.sleep(config.token_ms / 1000)
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        content = "".join(pieces())
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 32, "completion_tokens": config.tokens, "total_tokens": 32 + config.tokens},
+        }
+
+    async def models():
+        return {"object": "list", "data": [{"id": "deepseek-chat", "object": "model", "owned_by": "fake"}]}
+
+    async def health():
+        return stats
+
+    for prefix in ("", "/v1"):
+        app.add_api_route(f"{prefix}/chat/completions", completions, methods=["POST"])
+        app.add_api_route(f"{prefix}/models", models, methods=["GET"])
+    app.add_api_route("/health", health, methods=["GET"])
+    return app
@@ -0,0 +1,61 @@
+"""
+延迟分布：供假图谱与假 DeepSeek 服务模拟依赖的响应时间。
+
+规格字符串（单位毫秒）：
+- "0" / "none"               不加延迟
+- "fixed:200"                固定 200ms
+- "uniform:100:900"          100 ~ 900ms 均匀分布
+- "lognormal:800:0.5"        中位数 800ms、sigma 0.5 的对数正态分布（长尾，接近真实 LLM）
+- "normal:300:50"            均值 300ms、标准差 50ms 的正态分布（截断到 >= 0）
+"""
+
+import math
+import random
+from typing import Optional
+
+
+class LatencyModel:
+    """按规格字符串采样延迟（秒）。"""
+
+    KINDS = ("fixed", "uniform", "lognormal", "normal")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: Optional[int] = None) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的延迟分布：{kind}（可选 {', '.join(self.KINDS)}）")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        spec = (spec or "").strip().lower()
+        if spec in ("", "0", "none"):
+            return cls("fixed", 0.0, seed=seed)
+        kind, _, rest = spec.partition(":")
+        if not rest:
+            # 只写数字时视为固定延迟
+            return cls("fixed", float(kind), seed=seed)
+        args = [float(x) for x in rest.split(":")]
+        if kind == "fixed":
+            return cls("fixed", args[0], seed=seed)
+        if len(args) != 2:
+            raise ValueError(f"延迟分布 {kind} 需要两个参数：{spec}")
+        return cls(kind, args[0], args[1], seed=seed)
+
+    def sample(self) -> float:
+        """采样一次延迟（秒）。"""
+        if self.kind == "fixed":
+            ms = self.a
+        elif self.kind == "uniform":
+            ms = self._rng.uniform(self.a, self.b)
+        elif self.kind == "lognormal":
+            ms = self._rng.lognormvariate(math.log(max(self.a, 1e-3)), self.b)
+        else:
+            ms = self._rng.gauss(self.a, self.b)
+        return max(0.0, ms) / 1000
+
+    def __repr__(self) -> str:
+        if self.kind == "fixed":
+            return f"fixed:{self.a:g}"
+        return f"{self.kind}:{self.a:g}:{self.b:g}"
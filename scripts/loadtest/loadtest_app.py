@@ -0,0 +1,65 @@
+"""
+压测用的应用工厂：create_app() + 内存图谱替身。
+
+Neo4j 驱动替换为 fake_graph 的内存驱动（注入 neo4j_client 的全局单例，
+Red_Spider 与 /api/admin 等都使用它）；DeepSeek 通过 DEEPSEEK_BASE_URL
+指向 fake_llm 服务，走真实的 AsyncDeepSeekClient（连接池、重试、断路器）。
+Red_Spider 在启动时初始化，压测不包含首个请求的词典加载耗时。
+
+环境变量：
+- LOADTEST_GRAPH_LATENCY   图谱查询延迟分布，见 latency.py（默认 "fixed:2"）
+- LOADTEST_GRAPH_COVERAGE  有邻居的疾病比例（默认 1.0）
+- LOADTEST_SEED            随机种子（默认 0）
+
+多 worker 启动（run.py 会自动完成，并设置好 DEEPSEEK_BASE_URL 等变量）：
+  uvicorn --app-dir scripts/loadtest loadtest_app:create_loadtest_app --factory --workers 4
+"""
+
+import os
+import sys
+from pathlib import Path
+
+LOADTEST_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = LOADTEST_DIR.parents[1] / "backend"
+for path in (LOADTEST_DIR, BACKEND_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# 压测默认不访问真实依赖；显式设置的环境变量优先
+os.environ.setdefault("DEEPSEEK_API_KEY", "loadtest")
+os.environ.setdefault("GRAPH_BACKEND", "neo4j")
+os.environ.setdefault("NEO4J_KEEPALIVE_INTERVAL", "0")
+
+from fastapi import FastAPI  # noqa: E402
+
+from fake_graph import InMemoryAsyncDriver, InMemoryDriver, InMemoryGraph  # noqa: E402
+from latency import LatencyModel  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.services import neo4j_client  # noqa: E402
+
+
+def install_graph_stand_in() -> InMemoryGraph:
+    """把 neo4j_client 的驱动单例替换为内存图谱。"""
+    seed = int(os.getenv("LOADTEST_SEED", "0"))
+    graph = InMemoryGraph(
+        seed=seed,
+        coverage=float(os.getenv("LOADTEST_GRAPH_COVERAGE", "1.0")),
+        latency=LatencyModel.parse(os.getenv("LOADTEST_GRAPH_LATENCY", "fixed:2"), seed),
+    )
+    neo4j_client._neo4j_driver = InMemoryDriver(graph)
+    neo4j_client._async_neo4j_driver = InMemoryAsyncDriver(graph)
+    return graph
+
+
+def create_loadtest_app() -> FastAPI:
+    install_graph_stand_in()
+    app = create_app()
+
+    @app.on_event("startup")
+    async def init_red_spider() -> None:
+        from app.services.red_spider_service import aget_red_spider
+
+        await aget_red_spider()
+
+    return app
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+后端压测：用 asyncio + httpx 以固定并发压 /api/chat、/api/emergency/check、/api/emergency/batch-check，
+报告吞吐、p50 / p95 / p99 延迟与错误率，用于找出每种 worker 数下的饱和点。
+
+默认自动启动两个本地进程，不访问 Neo4j 与 DeepSeek：
+- 假 DeepSeek（fake_llm.py）：可配置延迟分布与 429 注入
+- 后端（loadtest_app.py）：create_app() + 内存图谱，uvicorn --workers N
+也可以用 --target 压一个已经在运行的服务（此时不启动替身）。
+
+使用方法：
+  python scripts/loadtest/run.py --workers 1 --concurrency 8,16,32,64 --duration 20
+  python scripts/loadtest/run.py --workers 4 --concurrency 32,64,128 \\
+      --llm-latency lognormal:1200:0.6 --llm-429-rate 0.05
+  python scripts/loadtest/run.py --endpoint-mix chat=1 --question-mix kg=0.8,llm=0.2
+  python scripts/loadtest/run.py --target http://127.0.0.1:8000 --concurrency 16 --json result.json
+
+问句类型（--question-mix）：
+- kg：疾病 + 疑问词，知识图谱可回答
+- symptom：只有症状，多数回退到 DeepSeek
+- llm：日常问句，回退到 DeepSeek
+- emergency：含高危症状，/api/chat 在预检中直接拦截
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+LOADTEST_DIR = Path(__file__).resolve().parent
+REPO_ROOT = LOADTEST_DIR.parents[1]
+BACKEND_DIR = REPO_ROOT / "backend"
+DICT_DIR = REPO_ROOT / "red_spider" / "red_spider_base" / "dict"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.utils.emergency import EMERGENCY_KEYWORDS  # noqa: E402
+
+ENDPOINTS = {
+    "chat": "/api/chat",
+    "emergency": "/api/emergency/check",
+    "batch": "/api/emergency/batch-check",
+}
+
+INTENT_WORDS = ["症状", "表现", "吃什么", "饮食", "用什么药", "吃什么药", "治疗"]
+SMALL_TALK = [
+    "最近{n}天睡不好怎么办",
+    "体检报告第{n}项偏高要紧吗",
+    "每天走{n}千步对身体好吗",
+    "孩子{n}岁了经常咳嗽怎么办",
+    "连续加班{n}天总觉得累",
+]
+
+
+def _load_words(name: str) -> List[str]:
+    with open(DICT_DIR / f"{name}.txt", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def parse_mix(spec: str, allowed: List[str]) -> Dict[str, float]:
+    """解析 "a=0.6,b=0.4" 形式的权重。"""
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in allowed:
+            raise ValueError(f"未知的类型 {name}（可选 {', '.join(allowed)}）")
+        weights[name] = float(value or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError(f"权重无效：{spec}")
+    return weights
+
+
+class QuestionGenerator:
+    """按 --question-mix 的权重生成问句。"""
+
+    KINDS = ["kg", "symptom", "llm", "emergency"]
+
+    def __init__(self, mix: Dict[str, float], seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self.diseases = _load_words("disease")
+        self.symptoms = _load_words("symptom")
+
+    def next(self) -> Tuple[str, str]:
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        rng = self.rng
+        if kind == "kg":
+            question = f"{rng.choice(self.diseases)}有什么{rng.choice(INTENT_WORDS)}"
+        elif kind == "symptom":
+            question = f"最近总是{rng.choice(self.symptoms)}，怎么回事"
+        elif kind == "llm":
+            question = rng.choice(SMALL_TALK).format(n=rng.randint(1, 50))
+        else:
+            question = f"突然{rng.choice(EMERGENCY_KEYWORDS)}，还有点{rng.choice(self.symptoms)}"
+        return kind, question
+
+
+# ---------------------------------------------------------------------------
+# 本地替身进程
+# ---------------------------------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_uvicorn(
+    target: str, port: int, workers: int, env: Dict[str, str], log_file: Any
+) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "uvicorn",
+        "--app-dir", str(LOADTEST_DIR),
+        target, "--factory",
+        "--host", "127.0.0.1",
+        "--port", str(port),
+        "--workers", str(workers),
+        "--log-level", "warning",
+        "--no-access-log",
+    ]
+    # 服务端日志写入文件，不与压测报告混在一起
+    return subprocess.Popen(
+        cmd,
+        cwd=str(BACKEND_DIR),
+        env={**os.environ, **env},
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def _wait_ready(base_url: str, proc: Optional[subprocess.Popen], timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if proc is not None and proc.poll() is not None:
+                raise RuntimeError(f"进程已退出（返回码 {proc.returncode}）：{base_url}")
+            try:
+                response = await client.get(f"{base_url}/health")
+                if response.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.3)
+    raise RuntimeError(f"等待服务就绪超时：{base_url}")
+
+
+def _stop(proc: Optional[subprocess.Popen]) -> None:
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ---------------------------------------------------------------------------
+# 压测
+# ---------------------------------------------------------------------------
+class Recorder:
+    def __init__(self) -> None:
+        # (接口, 耗时秒, 结果)：结果为 ok / degraded / http_<状态码> / app_error / timeout / transport_error
+        self.samples: List[Tuple[str, float, str]] = []
+
+    def add(self, endpoint: str, seconds: float, outcome: str) -> None:
+        self.samples.append((endpoint, seconds, outcome))
+
+
+def _classify_response(endpoint: str, response: httpx.Response) -> str:
+    if response.status_code != 200:
+        return f"http_{response.status_code}"
+    if endpoint == "batch":
+        return "ok"
+    body = response.json()
+    if body.get("status") == "error":
+        return "app_error"
+    data = body.get("data") or {}
+    # /api/chat 的降级或超时答案（非紧急提示）单独统计
+    if endpoint == "chat" and body.get("status") == "ok" and data.get("source") == "system":
+        return "degraded"
+    return "ok"
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    generator: QuestionGenerator,
+    endpoints: Dict[str, float],
+    batch_size: int,
+    stop_at: float,
+    record_after: float,
+    recorder: Recorder,
+    rng: random.Random,
+) -> None:
+    names = list(endpoints)
+    weights = [endpoints[n] for n in names]
+    while time.monotonic() < stop_at:
+        endpoint = rng.choices(names, weights)[0]
+        if endpoint == "batch":
+            payload: Any = [generator.next()[1] for _ in range(batch_size)]
+        else:
+            payload = {"question": generator.next()[1]}
+
+        start = time.monotonic()
+        try:
+            response = await client.post(ENDPOINTS[endpoint], json=payload)
+            outcome = _classify_response(endpoint, response)
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError:
+            outcome = "transport_error"
+        if start >= record_after:
+            recorder.add(endpoint, time.monotonic() - start, outcome)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位数。"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Tuple[str, float, str]], seconds: float) -> Dict[str, Any]:
+    latencies = sorted(s for _, s, _ in samples)
+    outcomes: Dict[str, int] = {}
+    for _, _, outcome in samples:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    errors = sum(n for o, n in outcomes.items() if o not in ("ok", "degraded"))
+    total = len(samples)
+    return {
+        "requests": total,
+        "throughput_rps": round(total / seconds, 2) if seconds > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "degraded_rate": round(outcomes.get("degraded", 0) / total, 4) if total else 0.0,
+        "outcomes": outcomes,
+    }
+
+
+async def run_level(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    timeout: float,
+    generator: QuestionGenerator,
+    endpoints: Dict[str, float],
+    batch_size: int,
+    seed: int,
+) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        now = time.monotonic()
+        record_after = now + warmup
+        stop_at = record_after + duration
+        await asyncio.gather(
+            *[
+                _worker(
+                    client, generator, endpoints, batch_size, stop_at, record_after,
+                    recorder, random.Random(seed * 1000 + i),
+                )
+                for i in range(concurrency)
+            ]
+        )
+        # 最后一批请求可能在 stop_at 之后才返回，按实际记录窗口计算吞吐
+        measured = max(time.monotonic() - record_after, 1e-9)
+
+    result = {"concurrency": concurrency, **summarize(recorder.samples, measured)}
+    result["endpoints"] = {
+        name: summarize([s for s in recorder.samples if s[0] == name], measured)
+        for name in endpoints
+    }
+    return result
+
+
+def print_level(result: Dict[str, Any]) -> None:
+    print(
+        f"{result['concurrency']:>11}{result['requests']:>10}{result['throughput_rps']:>10.1f}"
+        f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+        f"{result['error_rate']:>9.2%}{result['degraded_rate']:>10.2%}"
+    )
+    for name, summary in result["endpoints"].items():
+        if not summary["requests"]:
+            continue
+        print(
+            f"{'  ' + name:>11}{summary['requests']:>10}{summary['throughput_rps']:>10.1f}"
+            f"{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}{summary['p99_ms']:>10.1f}"
+            f"{summary['error_rate']:>9.2%}{summary['degraded_rate']:>10.2%}"
+        )
+    unusual = {o: n for o, n in result["outcomes"].items() if o != "ok"}
+    if unusual:
+        print(f"{'':>11}非正常结果：{unusual}")
+
+
+def find_saturation(results: List[Dict[str, Any]], gain: float = 0.1) -> Optional[Dict[str, Any]]:
+    """吞吐相对上一档提升不足 gain 的第一档（再加并发只会增加排队延迟）。"""
+    for previous, current in zip(results, results[1:]):
+        if previous["throughput_rps"] <= 0:
+            continue
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 + gain):
+            return previous
+    return None
+
+
+async def run(args: argparse.Namespace) -> int:
+    endpoints = parse_mix(args.endpoint_mix, list(ENDPOINTS))
+    question_mix = parse_mix(args.question_mix, QuestionGenerator.KINDS)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    generator = QuestionGenerator(question_mix, args.seed)
+
+    llm_proc: Optional[subprocess.Popen] = None
+    app_proc: Optional[subprocess.Popen] = None
+    base_url = args.target.rstrip("/") if args.target else None
+    log_path = args.server_log or os.path.join(tempfile.gettempdir(), "redspider-loadtest-server.log")
+    log_file = None if args.target else open(log_path, "w", encoding="utf-8")
+    try:
+        if base_url is None:
+            llm_port = _free_port()
+            llm_proc = _start_uvicorn(
+                "fake_llm:create_fake_llm_app", llm_port, 1,
+                {
+                    "FAKE_LLM_LATENCY": args.llm_latency,
+                    "FAKE_LLM_TOKEN_MS": str(args.llm_token_ms),
+                    "FAKE_LLM_429_RATE": str(args.llm_429_rate),
+                    "FAKE_LLM_SEED": str(args.seed),
+                },
+                log_file,
+            )
+            await _wait_ready(f"http://127.0.0.1:{llm_port}", llm_proc)
+
+            app_port = _free_port()
+            app_env = {
+                "DEEPSEEK_API_KEY": "loadtest",
+                "DEEPSEEK_BASE_URL": f"http://127.0.0.1:{llm_port}",
+                "LOADTEST_GRAPH_LATENCY": args.graph_latency,
+                "LOADTEST_GRAPH_COVERAGE": str(args.graph_coverage),
+                "LOADTEST_SEED": str(args.seed),
+                "GRAPH_BACKEND": "neo4j",
+                "NEO4J_KEEPALIVE_INTERVAL": "0",
+            }
+            if not args.llm_cache:
+                app_env["LLM_CACHE_ENABLED"] = "false"
+            app_proc = _start_uvicorn(
+                "loadtest_app:create_loadtest_app", app_port, args.workers, app_env, log_file
+            )
+            base_url = f"http://127.0.0.1:{app_port}"
+            await _wait_ready(base_url, app_proc)
+
+        print(f"\n目标：{base_url}  workers={args.workers if not args.target else '-'}")
+        print(f"接口权重：{endpoints}  问句权重：{question_mix}")
+        if not args.target:
+            print(
+                f"替身：LLM 延迟 {args.llm_latency}，429 比例 {args.llm_429_rate:g}；"
+                f"图谱延迟 {args.graph_latency}，覆盖率 {args.graph_coverage:g}"
+            )
+            print(f"服务端日志：{log_path}")
+        print(
+            f"\n{'concurrency':>11}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'errors':>9}{'degraded':>10}"
+        )
+
+        results: List[Dict[str, Any]] = []
+        for level in levels:
+            result = await run_level(
+                base_url, level, args.duration, args.warmup, args.timeout,
+                generator, endpoints, args.batch_size, args.seed,
+            )
+            results.append(result)
+            print_level(result)
+
+        saturated = find_saturation(results)
+        if saturated is not None:
+            print(
+                f"\n吞吐在并发 {saturated['concurrency']} 左右饱和："
+                f"{saturated['throughput_rps']:.1f} rps，p95 {saturated['p95_ms']:.0f} ms"
+            )
+        elif len(results) > 1:
+            print("\n在测试的并发范围内吞吐仍在增长，可继续加大并发")
+
+        if args.json:
+            report = {
+                "target": base_url,
+                "workers": None if args.target else args.workers,
+                "endpoint_mix": endpoints,
+                "question_mix": question_mix,
+                "stand_ins": None if args.target else {
+                    "llm_latency": args.llm_latency,
+                    "llm_token_ms": args.llm_token_ms,
+                    "llm_429_rate": args.llm_429_rate,
+                    "graph_latency": args.graph_latency,
+                    "graph_coverage": args.graph_coverage,
+                },
+                "duration": args.duration,
+                "warmup": args.warmup,
+                "levels": results,
+                "saturation_concurrency": saturated["concurrency"] if saturated else None,
+            }
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"结果已写入 {args.json}")
+    finally:
+        _stop(app_proc)
+        _stop(llm_proc)
+        if log_file is not None:
+            log_file.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="红蜘蛛后端压测")
+    parser.add_argument("--target", help="压测已运行的服务（如 http://127.0.0.1:8000），不启动本地替身")
+    parser.add_argument("--workers", type=int, default=1, help="后端 uvicorn worker 数（默认 1）")
+    parser.add_argument("--concurrency", default="8,16,32,64", help="并发档位，逗号分隔（默认 8,16,32,64）")
+    parser.add_argument("--duration", type=float, default=15.0, help="每档计入统计的秒数（默认 15）")
+    parser.add_argument("--warmup", type=float, default=3.0, help="每档开始时不计入统计的秒数（默认 3）")
+    parser.add_argument("--timeout", type=float, default=60.0, help="客户端请求超时（秒，默认 60）")
+    parser.add_argument(
+        "--endpoint-mix", default="chat=0.7,emergency=0.2,batch=0.1",
+        help="接口权重：chat / emergency / batch（默认 chat=0.7,emergency=0.2,batch=0.1）",
+    )
+    parser.add_argument(
+        "--question-mix", default="kg=0.5,symptom=0.15,llm=0.25,emergency=0.1",
+        help="问句权重：kg / symptom / llm / emergency",
+    )
+    parser.add_argument("--batch-size", type=int, default=20, help="batch-check 每次的问句数（默认 20）")
+    parser.add_argument("--llm-latency", default="lognormal:800:0.5", help="假 DeepSeek 的延迟分布（见 latency.py）")
+    parser.add_argument("--llm-token-ms", type=float, default=20.0, help="假 DeepSeek 流式片段间隔（毫秒）")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="假 DeepSeek 返回 429 的概率")
+    parser.add_argument("--graph-latency", default="fixed:2", help="内存图谱每次查询的延迟分布")
+    parser.add_argument("--graph-coverage", type=float, default=1.0, help="内存图谱中有邻居的疾病比例")
+    parser.add_argument("--llm-cache", action="store_true", help="保留 LLM 持久化缓存（默认关闭，避免重复问句命中缓存）")
+    parser.add_argument("--server-log", metavar="PATH", help="本地替身与后端的日志文件（默认写到临时目录）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())